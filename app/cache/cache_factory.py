@@ -0,0 +1,28 @@
+"""
+Selects the answer cache backend configured in `Config`.
+"""
+
+from typing import Optional
+
+from app.cache.memory_cache import SimpleCache
+from app.cache.sqlite_cache import SQLiteCache
+from app.config_loader import Config
+from app.exceptions import ConfigError
+
+
+def create_cache(backend: Optional[str] = None):
+    """
+    Build a cache for `backend` ("memory" or "sqlite"), defaulting to Config.CACHE_BACKEND.
+    All backends expose get/lookup/set/clear/close and len().
+    """
+    backend = (backend or Config.CACHE_BACKEND).lower()
+    if backend == "memory":
+        return SimpleCache(ttl_seconds=Config.CACHE_TTL_SECONDS, stale_seconds=Config.CACHE_STALE_SECONDS)
+    if backend == "sqlite":
+        return SQLiteCache(
+            path=Config.CACHE_PATH,
+            ttl_seconds=Config.CACHE_TTL_SECONDS,
+            max_bytes=Config.CACHE_MAX_BYTES,
+            stale_seconds=Config.CACHE_STALE_SECONDS,
+        )
+    raise ConfigError(f"Unknown cache backend: {backend!r} (expected 'memory' or 'sqlite')")
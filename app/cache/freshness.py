@@ -0,0 +1,29 @@
+"""
+Soft/hard TTL policy shared by the answer cache backends.
+
+    age < ttl * refresh_ahead            fresh
+    ttl * refresh_ahead <= age < ttl     fresh, but hot entries are refreshed ahead of expiry
+    ttl <= age < ttl + stale_seconds     stale: served at once while one refresh rebuilds it
+    age >= ttl + stale_seconds           expired (a hard miss)
+"""
+
+from typing import Any, NamedTuple
+
+FRESH = "fresh"
+REFRESH_AHEAD = "refresh_ahead"
+STALE = "stale"
+
+
+class CacheEntry(NamedTuple):
+    value: Any
+    age: float  # seconds since the value was stored
+    hits: int  # lookups since the value was stored, including this one
+
+
+def freshness(entry: CacheEntry, ttl_seconds: float, refresh_ahead: float = 0.9, hot_hits: int = 3) -> str:
+    """Classify a cache entry found within its hard TTL."""
+    if entry.age >= ttl_seconds:
+        return STALE
+    if entry.age >= ttl_seconds * refresh_ahead and entry.hits >= hot_hits:
+        return REFRESH_AHEAD
+    return FRESH
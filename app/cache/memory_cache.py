@@ -0,0 +1,64 @@
+"""
+Thread-safe in-memory cache with soft and hard TTLs (per-process).
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Any
+
+from app.cache.freshness import CacheEntry
+from app.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class SimpleCache:
+    def __init__(self, ttl_seconds: int = 3600, stale_seconds: int = 0, clock: Callable[[], float] = time.monotonic):
+        # key -> [value, stored_at (clock), hits]
+        self.cache: Dict[str, List[Any]] = {}
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.clock = clock
+        self.lock = threading.Lock()
+
+    def lookup(self, key: str) -> Optional[CacheEntry]:
+        """The entry with its age and hit count, or None once past the hard TTL (ttl + stale)."""
+        with self.lock:
+            entry = self.cache.get(key)
+            if not entry:
+                logger.debug("[CACHE] MISS for %s", key[:12])
+                return None
+            value, stored_at, hits = entry
+            age = self.clock() - stored_at
+            if age >= self.ttl_seconds + self.stale_seconds:
+                logger.debug("[CACHE] EXPIRED for %s", key[:12])
+                metrics.inc("cache.expired")
+                del self.cache[key]
+                return None
+            entry[2] = hits + 1
+            logger.debug("[CACHE] HIT for %s (age %.0fs)", key[:12], age)
+            return CacheEntry(value, age, hits + 1)
+
+    def get(self, key: str) -> Optional[Any]:
+        """The value while it is fresh (within the soft TTL)."""
+        entry = self.lookup(key)
+        if entry is None or entry.age >= self.ttl_seconds:
+            return None
+        return entry.value
+
+    def set(self, key: str, value: Any):
+        with self.lock:
+            self.cache[key] = [value, self.clock(), 0]
+
+    def clear(self):
+        with self.lock:
+            self.cache.clear()
+        logger.info("[CACHE] Cleared all entries.")
+
+    def __len__(self) -> int:
+        return len(self.cache)
+
+    def close(self):
+        # Nothing outlives the process, so closing just drops the entries
+        self.clear()
@@ -0,0 +1,260 @@
+"""
+Persistent answer cache backed by an embedded SQLite database.
+
+The database runs in WAL mode so several processes on one host (Streamlit
+workers, CLI runs) can read and write the same file concurrently. Values are
+stored as zlib-compressed JSON with soft and hard TTLs, and the file is kept
+under a size cap by evicting the least recently used entries.
+
+Writes stay cheap as the table grows: expired and least recently used entries
+are swept every `evict_every` writes, or sooner once this process's running
+size estimate passes the cap. Reads do not write; hit counts and access times
+are buffered and flushed in one transaction every `touch_interval` seconds.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, Optional
+
+from app.cache.freshness import CacheEntry
+from app.exceptions import CacheError
+from app.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Bump when the table layout or value encoding changes; older files are rebuilt.
+SCHEMA_VERSION = 2
+
+
+def _json_default(obj: Any):
+    """Serialize records and SDK response objects (e.g. Pinecone matches) stored in results."""
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    raise TypeError(f"Cannot cache value of type {type(obj).__name__}")
+
+
+class SQLiteCache:
+    """Process-shared TTL cache with compressed values and size-capped LRU eviction."""
+
+    def __init__(
+        self,
+        path: str,
+        ttl_seconds: int = 3600,
+        max_bytes: int = 256 * 1024 * 1024,
+        compress_level: int = 6,
+        stale_seconds: int = 0,
+        evict_every: int = 50,
+        touch_interval: float = 5.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.max_bytes = max_bytes
+        self.compress_level = compress_level
+        self.evict_every = evict_every
+        self.touch_interval = touch_interval
+        # Wall clock shared by every process using the file (injectable for tests)
+        self.clock = clock
+        # Running size estimate and writes since the last sweep (this process only)
+        self._approx_bytes = 0
+        self._writes = 0
+        # key -> [accessed_at, hits since the last flush], written back in batches
+        self._touches: Dict[str, list] = {}
+        self._touched_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        try:
+            self._init_schema()
+            self._approx_bytes = self._total_bytes(self._conn())
+        except sqlite3.Error as e:
+            logger.exception("Failed to open SQLite cache.")
+            raise CacheError(f"Could not open cache at {path}: {e}")
+        logger.info(
+            f"SQLiteCache ready at {path} (ttl={ttl_seconds}s + {stale_seconds}s stale, max={max_bytes} bytes)."
+        )
+
+    # --------------------- CONNECTIONS ---------------------
+    def _conn(self) -> sqlite3.Connection:
+        """SQLite connections are not shareable across threads, so keep one per thread."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def _init_schema(self):
+        conn = self._conn()
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, SCHEMA_VERSION):
+            logger.warning(f"[CACHE] Schema v{version} is outdated, rebuilding as v{SCHEMA_VERSION}.")
+            conn.execute("DROP TABLE IF EXISTS entries")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY,"
+            " value BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL,"
+            " hits INTEGER NOT NULL DEFAULT 0)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries(accessed_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_created ON entries(created_at)")
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    # --------------------- ENCODING ---------------------
+    def _encode(self, value: Any) -> bytes:
+        raw = json.dumps(value, default=_json_default, separators=(",", ":")).encode("utf-8")
+        return zlib.compress(raw, self.compress_level)
+
+    @staticmethod
+    def _decode(blob: bytes) -> Any:
+        return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+    # --------------------- API ---------------------
+    def lookup(self, key: str) -> Optional[CacheEntry]:
+        """The entry with its age and hit count, or None once past the hard TTL (ttl + stale)."""
+        conn = self._conn()
+        row = conn.execute("SELECT value, created_at, hits FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            logger.debug("[CACHE] MISS for %s", key[:12])
+            return None
+        blob, created_at, hits = row
+        now = self.clock()
+        age = now - created_at
+        if age >= self.ttl_seconds + self.stale_seconds:
+            logger.debug("[CACHE] EXPIRED for %s", key[:12])
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            return None
+        with self._lock:
+            touch = self._touches.setdefault(key, [now, 0])
+            touch[0] = now
+            touch[1] += 1
+            hits += touch[1]
+            due = time.monotonic() - self._touched_at >= self.touch_interval
+        if due:
+            self._flush_touches(conn)
+        logger.debug("[CACHE] HIT for %s (age %.0fs)", key[:12], age)
+        return CacheEntry(self._decode(blob), age, hits)
+
+    def _flush_touches(self, conn: sqlite3.Connection):
+        """Write buffered access times and hit counts in one transaction."""
+        with self._lock:
+            touches, self._touches = self._touches, {}
+            self._touched_at = time.monotonic()
+        if not touches:
+            return
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(
+                "UPDATE entries SET accessed_at = MAX(accessed_at, ?), hits = hits + ? WHERE key = ?",
+                [(accessed_at, hits, key) for key, (accessed_at, hits) in touches.items()],
+            )
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get(self, key: str) -> Optional[Any]:
+        """The value while it is fresh (within the soft TTL)."""
+        entry = self.lookup(key)
+        if entry is None or entry.age >= self.ttl_seconds:
+            return None
+        return entry.value
+
+    def set(self, key: str, value: Any):
+        blob = self._encode(value)
+        now = self.clock()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO entries (key, value, size, created_at, accessed_at, hits) "
+            "VALUES (?, ?, ?, ?, ?, 0)",
+            (key, blob, len(blob), now, now),
+        )
+        with self._lock:
+            # A replaced entry is counted twice until the next sweep re-reads the total
+            self._approx_bytes += len(blob)
+            self._writes += 1
+            due = self._writes >= self.evict_every or self._approx_bytes > self.max_bytes
+            if due:
+                self._writes = 0
+        if due:
+            self._evict(conn)
+
+    @staticmethod
+    def _total_bytes(conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Drop expired entries, then the least recently used ones until under the size cap."""
+        # Eviction order depends on access times, so write the buffered ones first
+        self._flush_touches(conn)
+        hard_ttl = self.ttl_seconds + self.stale_seconds
+        expired = conn.execute("DELETE FROM entries WHERE created_at <= ?", (self.clock() - hard_ttl,)).rowcount
+        if expired > 0:
+            metrics.inc("cache.expired", expired)
+        total = self._total_bytes(conn)
+        with self._lock:
+            self._approx_bytes = total
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed_at"):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+        with self._lock:
+            self._approx_bytes = total - freed
+        metrics.inc("cache.evictions", len(victims))
+        logger.debug(f"[CACHE] Evicted {len(victims)} entries ({freed} bytes).")
+
+    def clear(self):
+        with self._lock:
+            self._touches.clear()
+            self._approx_bytes = 0
+        self._conn().execute("DELETE FROM entries")
+        logger.info("[CACHE] Cleared all entries.")
+
+    def stats(self) -> Dict[str, int]:
+        count, size = self._conn().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+        return {"entries": count, "bytes": size, "max_bytes": self.max_bytes}
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def close(self):
+        """Close this process's connections; the shared file and its entries stay."""
+        try:
+            self._flush_touches(self._conn())
+        except sqlite3.Error as e:
+            logger.warning(f"Could not write cache access times: {e}")
+        with self._connections_lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except sqlite3.Error as e:
+                    logger.warning(f"Error closing cache connection: {e}")
+            self._connections.clear()
+        self._local = threading.local()
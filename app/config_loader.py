@@ -14,14 +14,110 @@ class Config:
 
     # OpenAI
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+    # Process-wide OpenAI budgets used by the request scheduler
+    OPENAI_CHAT_RPM = int(os.getenv("OPENAI_CHAT_RPM", 500))
+    OPENAI_CHAT_TPM = int(os.getenv("OPENAI_CHAT_TPM", 200_000))
+    OPENAI_EMBED_RPM = int(os.getenv("OPENAI_EMBED_RPM", 3000))
+    OPENAI_EMBED_TPM = int(os.getenv("OPENAI_EMBED_TPM", 1_000_000))
 
     # Pinecone
     PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
     PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME")
-    PINECONE_VECTOR_DIM = int(os.getenv("PINECONE_VECTOR_DIM"))
+    # text-embedding-3-small vectors
+    PINECONE_VECTOR_DIM = int(os.getenv("PINECONE_VECTOR_DIM", 1536))
+
+    # Semantic retrieval backend ("pinecone" or "local" memory-mapped snapshot)
+    VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone")
+    LOCAL_VECTOR_PATH = os.getenv("LOCAL_VECTOR_PATH", "data/vector_snapshot")
+    # Shortlist size (x top_k) rescored at full precision after the int8 first pass
+    LOCAL_VECTOR_RESCORE_FACTOR = int(os.getenv("LOCAL_VECTOR_RESCORE_FACTOR", 10))
+    # IVF lists probed per query when the snapshot has an ANN index (higher = better recall, slower)
+    LOCAL_VECTOR_NPROBE = int(os.getenv("LOCAL_VECTOR_NPROBE", 8))
 
     # Retrieval settings
     TOP_K = int(os.getenv("TOP_K", 5))
+    # Neighbours fetched per matched node; facts are ranked and cut to FACT_BUDGET before prompting
+    GRAPH_NEIGHBORS_PER_NODE = int(os.getenv("GRAPH_NEIGHBORS_PER_NODE", 25))
+    FACT_BUDGET = int(os.getenv("FACT_BUDGET", 15))
+    FACT_PER_SOURCE = int(os.getenv("FACT_PER_SOURCE", 3))
+    # Query embeddings kept in memory (the same text is embedded for search and fact ranking)
+    EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", 1024))
+    # Node embeddings kept for fact ranking (~6 KB each at 1536 dims)
+    NODE_VECTOR_CACHE_SIZE = int(os.getenv("NODE_VECTOR_CACHE_SIZE", 4096))
+    # Seconds an id missing from the index is remembered before it is fetched again (e.g. after an upload)
+    NODE_VECTOR_MISS_TTL = int(os.getenv("NODE_VECTOR_MISS_TTL", 300))
+
+    # Structured lookups ("best time to visit Hue") answered from the dataset without the LLM
+    FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() in ("1", "true", "yes")
+    DATASET_PATH = os.getenv("DATASET_PATH", "data/vietnam_travel_dataset.json")
+    FAST_PATH_MAX_ITEMS = int(os.getenv("FAST_PATH_MAX_ITEMS", 10))
+
+    # Ingest run budgets (replace the embedding scheduler's limits in that process) and concurrency
+    INGEST_RPM = int(os.getenv("INGEST_RPM", 3000))
+    INGEST_TPM = int(os.getenv("INGEST_TPM", 1_000_000))
+    INGEST_EMBED_WORKERS = int(os.getenv("INGEST_EMBED_WORKERS", 4))
+    INGEST_UPSERT_WORKERS = int(os.getenv("INGEST_UPSERT_WORKERS", 2))
+
+    # Answer cache ("memory" is per-process, "sqlite" is shared on disk across processes)
+    CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+    CACHE_PATH = os.getenv("CACHE_PATH", "cache/answers.sqlite3")
+    CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", 3600))
+    CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", 256 * 1024 * 1024))
+    # After CACHE_TTL_SECONDS answers are served stale for this long while one refresh rebuilds them
+    CACHE_STALE_SECONDS = int(os.getenv("CACHE_STALE_SECONDS", 1800))
+    # Entries hit CACHE_HOT_HITS times are refreshed once this fraction of the TTL has passed
+    CACHE_REFRESH_AHEAD = float(os.getenv("CACHE_REFRESH_AHEAD", 0.9))
+    CACHE_HOT_HITS = int(os.getenv("CACHE_HOT_HITS", 3))
+
+    # Cache warm-up at startup: "off", "log" (most frequent user queries, counted into the
+    # metrics snapshots at METRICS_PATH) or the path of a curated query file
+    WARMUP_SOURCE = os.getenv("WARMUP_SOURCE", "off")
+    WARMUP_LIMIT = int(os.getenv("WARMUP_LIMIT", 50))
+    WARMUP_CONCURRENCY = int(os.getenv("WARMUP_CONCURRENCY", 2))
+    # Precompute full answers (LLM calls) instead of embeddings + retrieval only
+    WARMUP_ANSWERS = os.getenv("WARMUP_ANSWERS", "false").lower() in ("1", "true", "yes")
+    # Re-run warm-up every N seconds (0 = once at startup)
+    WARMUP_INTERVAL = float(os.getenv("WARMUP_INTERVAL", 0))
+
+    # Daily token cap per process (0 = none). Past BUDGET_ECONOMY_RATIO of it answers are shortened;
+    # once it is spent, answers come only from the fast path, the cache or retrieval without the LLM
+    DAILY_TOKEN_BUDGET = int(os.getenv("DAILY_TOKEN_BUDGET", 0))
+    BUDGET_ECONOMY_RATIO = float(os.getenv("BUDGET_ECONOMY_RATIO", 0.8))
+    BUDGET_ECONOMY_MAX_TOKENS = int(os.getenv("BUDGET_ECONOMY_MAX_TOKENS", 400))
+
+    # Conversation sessions
+    SESSION_MAX = int(os.getenv("SESSION_MAX", 256))
+    SESSION_IDLE_TIMEOUT = int(os.getenv("SESSION_IDLE_TIMEOUT", 1800))
+    # Upper bound a UI request waits for an answer from the shared chat service
+    CHAT_TIMEOUT_SECONDS = float(os.getenv("CHAT_TIMEOUT_SECONDS", 120))
+
+    # Metrics snapshot written by the running chat service and read by the dashboard
+    METRICS_PATH = os.getenv("METRICS_PATH", "logs/metrics.json")
+    METRICS_EXPORT_INTERVAL = float(os.getenv("METRICS_EXPORT_INTERVAL", 2))
+
+    # Application log (logs/app.log); LOG_FORMAT "json" or "text"
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+    # Share of requests whose INFO/DEBUG lines are kept
+    LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", 1.0))
+
+    # One JSON line per query (stage timings, cache status, tokens) for scripts/analyze_perf_log.py
+    PERF_LOG_ENABLED = os.getenv("PERF_LOG_ENABLED", "true").lower() in ("1", "true", "yes")
+    PERF_LOG_PATH = os.getenv("PERF_LOG_PATH", "logs/perf.jsonl")
+    PERF_LOG_MAX_BYTES = int(os.getenv("PERF_LOG_MAX_BYTES", 64 * 1024 * 1024))
+    PERF_LOG_BACKUPS = int(os.getenv("PERF_LOG_BACKUPS", 5))
+
+    # Share of requests profiled (cProfile, tracemalloc, sampled stacks) into PROFILE_DIR; 0 = off
+    PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+    PROFILE_DIR = os.getenv("PROFILE_DIR", "outputs/profiles")
+    PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", 25))
+    PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", 5))
+
+    # Record/replay of backend calls ("off", "record" or "replay")
+    CASSETTE_MODE = os.getenv("CASSETTE_MODE", "off")
+    CASSETTE_PATH = os.getenv("CASSETTE_PATH", "data/cassettes/default.jsonl.gz")
+    # 1.0 replays with the recorded latencies, 0 answers instantly
+    CASSETTE_LATENCY_SCALE = float(os.getenv("CASSETTE_LATENCY_SCALE", 1.0))
 
     @classmethod
     def sanity_check(cls):
@@ -21,3 +21,18 @@ class LLMError(AppError):
 class GraphError(AppError):
     """Raised for Neo4j graph-related issues."""
     pass
+
+
+class CacheError(AppError):
+    """Raised when a cache backend cannot be opened or used."""
+    pass
+
+
+class DatasetError(AppError):
+    """Raised when an ingest dataset is malformed or fails validation."""
+    pass
+
+
+class ReplayError(AppError):
+    """Raised when a recorded backend call cannot be replayed from a cassette."""
+    pass
@@ -0,0 +1,103 @@
+"""
+app/hybrid/chat_service.py
+Process-wide chat service shared by every user of a server process.
+
+One AsyncHybridChat (one Neo4j driver pool, one Pinecone client, one answer
+cache) runs on its own background event loop. Each user only holds a session id;
+their conversation state lives in the chat's SessionStore.
+"""
+
+import logging
+import threading
+from typing import Dict, Optional
+
+from app.config_loader import Config
+from app.hybrid.hybrid_chat import AsyncHybridChat
+from app.hybrid.warmup import CacheWarmer
+from app.logger import configure_logging
+from app.retrievers.records import to_plain
+from app.utils.metrics import register_gauges, start_exporter
+
+logger = logging.getLogger(__name__)
+
+
+class ChatService:
+    """Thread-safe facade that many sessions borrow concurrently."""
+
+    def __init__(self, enable_cache: bool = True, timeout: Optional[float] = None):
+        configure_logging()
+        self.chat = AsyncHybridChat(enable_cache=enable_cache)
+        self.timeout = timeout if timeout is not None else Config.CHAT_TIMEOUT_SECONDS
+        register_gauges({
+            "chat.sessions": lambda: len(self.chat.sessions),
+            "cache.entries": lambda: len(self.chat.cache) if self.chat.cache is not None else 0,
+            "budget.tokens_today": lambda: self.chat.budget.used_today(),
+            "budget.used_ratio": lambda: self.chat.budget.status()["used_ratio"],
+        })
+        self.exporter = start_exporter(Config.METRICS_PATH, Config.METRICS_EXPORT_INTERVAL)
+        self.warmer = None
+        if Config.WARMUP_SOURCE != "off":
+            # Runs in the background; the service answers requests meanwhile
+            self.warmer = CacheWarmer(
+                self.chat,
+                Config.WARMUP_SOURCE,
+                metrics_path=Config.METRICS_PATH,
+                limit=Config.WARMUP_LIMIT,
+                concurrency=Config.WARMUP_CONCURRENCY,
+                full_answers=Config.WARMUP_ANSWERS,
+                top_k=Config.TOP_K,
+                interval=Config.WARMUP_INTERVAL,
+            )
+            register_gauges({"warmup.coverage": lambda: self.warmer.coverage() or 0})
+            self.warmer.start()
+        logger.info("ChatService started.")
+
+    def ask(self, query: str, session_id: Optional[str] = None, top_k: int = 5) -> Dict:
+        """Answer `query` within the given conversation; blocks the calling thread only."""
+        # Records are shared with the cache and sessions; callers get plain dicts
+        return to_plain(self.chat.handle_query(query, top_k, session_id, timeout=self.timeout))
+
+    def new_session(self) -> str:
+        return self.chat.new_session()
+
+    def end_session(self, session_id: str):
+        self.chat.end_session(session_id)
+
+    def stats(self) -> Dict:
+        return {
+            "sessions": len(self.chat.sessions),
+            "cache": self.chat.get_cache_stats(),
+            "warmup": self.warmer.status() if self.warmer else {"state": "off"},
+            "usage": self.chat.get_usage_stats(),
+        }
+
+    def clear_cache(self):
+        self.chat.clear_cache()
+
+    def close(self):
+        if self.warmer is not None:
+            self.warmer.stop()
+        self.exporter.stop()
+        self.chat.close()
+        logger.info("ChatService closed.")
+
+
+_service: Optional[ChatService] = None
+_service_lock = threading.Lock()
+
+
+def get_chat_service() -> ChatService:
+    """Return the process-wide ChatService, creating it on first use."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = ChatService(enable_cache=True)
+        return _service
+
+
+def shutdown_chat_service():
+    global _service
+    with _service_lock:
+        if _service is not None:
+            _service.close()
+            _service = None
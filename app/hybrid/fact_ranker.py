@@ -0,0 +1,120 @@
+"""
+app/hybrid/fact_ranker.py
+Query-relevance ranking and pruning of graph facts before prompting.
+
+Each candidate fact is scored by the cosine similarity between the query
+embedding and the stored embedding of its target node (one matrix product for
+all candidates), plus a weight for its relation type. Facts whose target has
+no stored embedding fall back to word overlap with the target's name; that
+score is on a different scale, so those facts rank after every fact scored by
+embedding. The best facts, at most `per_source` per matched node, are kept up
+to `budget`.
+"""
+
+import logging
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.config_loader import Config
+
+logger = logging.getLogger(__name__)
+
+# Added to the similarity score; city-to-city links help route planning the most
+DEFAULT_RELATION_WEIGHTS = {
+    "Connected_To": 0.15,
+    "Available_In": 0.10,
+    "Located_In": 0.05,
+}
+DEFAULT_RELATION_WEIGHT = 0.0
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _words(text: str) -> set:
+    return set(_WORD.findall((text or "").lower()))
+
+
+class FactRanker:
+    """Scores graph facts against a query and keeps the most relevant ones."""
+
+    def __init__(
+        self,
+        node_vectors: Optional[Callable[[List[str]], Dict[str, np.ndarray]]] = None,
+        relation_weights: Optional[Dict[str, float]] = None,
+        budget: int = Config.FACT_BUDGET,
+        per_source: int = Config.FACT_PER_SOURCE,
+    ):
+        self.node_vectors = node_vectors
+        self.relation_weights = dict(DEFAULT_RELATION_WEIGHTS, **(relation_weights or {}))
+        self.budget = budget
+        self.per_source = per_source
+
+    def _similarities(
+        self, query: str, facts: List[Dict], query_vector: Optional[Iterable[float]]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Cosine(query, target) per fact, or word overlap with the target name where
+        no vector is stored; also returns which facts were scored by cosine.
+        """
+        target_ids = [f.get("target_id") for f in facts]
+        sims = np.full(len(facts), np.nan, dtype=np.float32)
+
+        if query_vector is not None and self.node_vectors is not None:
+            unique = sorted({tid for tid in target_ids if tid})
+            try:
+                vectors = self.node_vectors(unique)
+            except Exception as e:
+                logger.warning(f"Node vectors unavailable, ranking facts by word overlap: {e}")
+                vectors = {}
+            if vectors:
+                ids = list(vectors)
+                matrix = np.stack([np.asarray(vectors[i], dtype=np.float32) for i in ids])
+                q = np.asarray(query_vector, dtype=np.float32)
+                norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(q) or 1.0)
+                scores = (matrix @ q) / np.where(norms > 0, norms, 1.0)
+                position = {tid: i for i, tid in enumerate(ids)}
+                rows = np.array([position.get(tid, -1) for tid in target_ids])
+                hit = rows >= 0
+                sims[hit] = scores[rows[hit]]
+
+        missing = np.isnan(sims)
+        if missing.any():
+            query_words = _words(query)
+            for i in np.flatnonzero(missing):
+                name_words = _words(facts[i].get("target_name"))
+                sims[i] = len(query_words & name_words) / len(name_words) if name_words else 0.0
+        return sims, ~missing
+
+    def rank(self, query: str, facts: List[Dict], query_vector: Optional[Iterable[float]] = None) -> List[Dict]:
+        """Return the facts worth prompting, most relevant first."""
+        if not facts:
+            return []
+        # Drop duplicates (the same edge reached from both ends or from earlier turns)
+        seen, unique = set(), []
+        for f in facts:
+            key = (f.get("source"), f.get("rel"), f.get("target_id") or f.get("target_name"))
+            if key not in seen:
+                seen.add(key)
+                unique.append(f)
+
+        weights = np.array(
+            [self.relation_weights.get(f.get("rel"), DEFAULT_RELATION_WEIGHT) for f in unique], dtype=np.float32
+        )
+        sims, by_vector = self._similarities(query, unique, query_vector)
+        scores = sims + weights
+        # Embedding-scored facts first, each group by score (lexsort is stable, last key primary)
+        order = np.lexsort((-scores, ~by_vector))
+
+        kept, per_source = [], {}
+        for i in order:
+            source = unique[i].get("source")
+            if per_source.get(source, 0) >= self.per_source:
+                continue
+            per_source[source] = per_source.get(source, 0) + 1
+            kept.append(unique[i])
+            if len(kept) >= self.budget:
+                break
+        logger.debug(f"Kept {len(kept)} of {len(facts)} graph facts for the prompt.")
+        return kept
@@ -0,0 +1,251 @@
+"""
+app/hybrid/fast_path.py
+Deterministic answers for simple structured lookups, without an LLM call.
+
+Queries such as "best time to visit Hue", "which attractions are in Da Nang"
+or "tags for Hoi An" are recognized by a small set of patterns over the
+dataset's own vocabulary (entity names and types). They are answered from
+node attributes and the dataset's relationships with fixed templates. The
+whole query must match a pattern and name a known entity. Anything else
+returns None and goes through the full retrieval + LLM pipeline.
+"""
+
+import logging
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from app.ingest.dataset_reader import iter_nodes
+from app.retrievers.records import FactRecord, MatchRecord, intern_node
+
+logger = logging.getLogger(__name__)
+
+# Phrases mapped onto the entity types used in the dataset
+_TYPE_WORDS = {
+    "Attraction": ("attractions", "attraction", "sights", "sightseeing", "places to see", "things to see", "landmarks"),
+    "Hotel": ("hotels", "hotel", "places to stay", "accommodation", "accommodations", "stays"),
+    "Activity": ("activities", "activity", "things to do", "experiences"),
+}
+
+_TYPE_ALT = "|".join(sorted((re.escape(w) for words in _TYPE_WORDS.values() for w in words), key=len, reverse=True))
+
+# Courtesy words stripped before matching; they never change the intent
+_FILLER = re.compile(r"^(please |hi |hey |tell me |can you tell me |do you know |i want to know )+|( please| thanks| thank you)+$")
+
+_INTENTS: List[Tuple[str, re.Pattern]] = [
+    ("best_time", re.compile(
+        r"(what is |whats )?(the )?best (time|season|months?) (of (the )?year )?(to (visit|go to|travel to)|for visiting|for) (?P<entity>.+)"
+        r"|when (is the best time to|should i|to|is it best to) (visit|go to|travel to) (?P<entity2>.+)"
+    )),
+    ("list_type", re.compile(
+        rf"((which|what) |list (the |all )?|show me (the |all )?)?(?P<type>{_TYPE_ALT}) "
+        r"(are |can i find |to visit |to try |)(there |available )?(in|at|around) (?P<entity>.+)"
+    )),
+    ("tags", re.compile(
+        r"(what are (the )?)?tags (for|of) (?P<entity>.+)"
+        r"|what (is|are) (?P<entity2>.+) (known|famous) for"
+    )),
+    ("region", re.compile(
+        r"(what|which) region is (?P<entity>.+?)( in)?"
+        r"|where is (?P<entity2>.+?)( located)?"
+    )),
+    ("connections", re.compile(
+        r"(what|which) (cities|places|destinations) (are )?(connected|linked) (to|with) (?P<entity>.+)"
+    )),
+]
+
+
+def normalize(text: str) -> str:
+    """Lowercase, strip accents and punctuation, collapse spaces."""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii").lower()
+    text = re.sub(r"[^a-z0-9 ]+", " ", text.replace("'", ""))
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _type_for(word: str) -> Optional[str]:
+    for etype, words in _TYPE_WORDS.items():
+        if word in words:
+            return etype
+    return None
+
+
+def _join(names: List[str]) -> str:
+    if len(names) <= 1:
+        return "".join(names)
+    return ", ".join(names[:-1]) + " and " + names[-1]
+
+
+class FastPathIndex:
+    """Entity aliases, attributes and relationships of the dataset, held in memory."""
+
+    def __init__(self, nodes: List[Dict], max_items: int = 10):
+        self.max_items = max_items
+        self.nodes: Dict[str, Dict] = {}
+        self.aliases: Dict[str, str] = {}
+        self.outgoing: Dict[str, List[Tuple[str, str]]] = defaultdict(list)
+        self.incoming: Dict[str, List[Tuple[str, str]]] = defaultdict(list)
+
+        for node in nodes:
+            self.nodes[node["id"]] = node
+            for conn in node.get("connections", []):
+                rel = conn.get("relation", "RELATED_TO")
+                self.outgoing[node["id"]].append((rel, conn["target"]))
+                self.incoming[conn["target"]].append((rel, node["id"]))
+
+        for node in self.nodes.values():
+            for alias in self._aliases_of(node):
+                # City names win over POIs that happen to share an alias
+                if alias not in self.aliases or node["type"] == "City":
+                    self.aliases[alias] = node["id"]
+        logger.info(f"Fast path index ready: {len(self.nodes)} nodes, {len(self.aliases)} aliases.")
+
+    @classmethod
+    def from_dataset(cls, path: str, max_items: int = 10) -> "FastPathIndex":
+        return cls(list(iter_nodes(path, strict=False)), max_items=max_items)
+
+    @staticmethod
+    def _aliases_of(node: Dict) -> List[str]:
+        name = normalize(node["name"])
+        aliases = {name}
+        if node["type"] == "City":
+            # "Ha Long Bay" -> "ha long", "Ho Chi Minh City" -> "ho chi minh", "city_mekong" -> "mekong"
+            short = re.sub(r" (city|bay|delta)$", "", name)
+            aliases.update((short, short.replace(" ", ""), name.replace(" ", "")))
+            aliases.add(normalize(node["id"].split("_", 1)[-1].replace("_", " ")))
+            words = name.split()
+            if len(words) >= 3:
+                # "Ho Chi Minh City" -> "hcmc"
+                aliases.add("".join(w[0] for w in words))
+        return [a for a in aliases if a]
+
+    # --------------------- CLASSIFICATION ---------------------
+    def resolve(self, phrase: str) -> Optional[Dict]:
+        """Map the entity part of a query onto a node, or None if it is not exactly one known entity."""
+        phrase = re.sub(r"^(the )", "", phrase)
+        phrase = re.sub(r" (vietnam|in vietnam)$", "", phrase).strip()
+        node_id = self.aliases.get(phrase)
+        return self.nodes.get(node_id) if node_id else None
+
+    def classify(self, query: str) -> Optional[Tuple[str, Dict, Optional[str]]]:
+        """Return (intent, entity node, entity type asked for) when the whole query is a known lookup."""
+        text = _FILLER.sub("", normalize(query)).strip()
+        for intent, pattern in _INTENTS:
+            m = pattern.fullmatch(text)
+            if not m:
+                continue
+            groups = m.groupdict()
+            phrase = next(groups[g] for g in ("entity", "entity2") if groups.get(g))
+            node = self.resolve(phrase)
+            if node is None:
+                return None
+            return intent, node, _type_for(groups["type"]) if groups.get("type") else None
+        return None
+
+    # --------------------- ANSWERS ---------------------
+    def city_of(self, node: Dict) -> Optional[Dict]:
+        if node["type"] == "City":
+            return node
+        for rel, target in self.outgoing.get(node["id"], []):
+            if rel in ("Located_In", "Available_In") and self.nodes.get(target, {}).get("type") == "City":
+                return self.nodes[target]
+        return None
+
+    def _fact(self, source: Dict, rel: str, target: Dict) -> FactRecord:
+        """A fact like the Neo4j retriever's, sharing the interned target node."""
+        node = intern_node(target["id"], target["name"], target["type"], target.get("description"),
+                           ("Entity", target["type"]))
+        return FactRecord(source["id"], rel, node)
+
+    def answer(self, query: str) -> Optional[Dict]:
+        """
+        Answer a structured lookup from the dataset. Returns None when the query
+        is not one, so the caller falls through to the LLM pipeline.
+        """
+        classified = self.classify(query)
+        if classified is None:
+            return None
+        intent, node, etype = classified
+        handler = getattr(self, f"_answer_{intent}")
+        answered = handler(node, etype)
+        if answered is None:
+            return None
+        text, related, facts = answered
+        return {
+            "intent": intent,
+            "entity": node["id"],
+            "answer": text,
+            "matches": [self._match(n) for n in [node] + related],
+            "graph_facts": facts,
+        }
+
+    @staticmethod
+    def _match(node: Dict) -> MatchRecord:
+        """A match like a vector search hit (metadata as stored at ingest)."""
+        return MatchRecord(node["id"], 1.0, {
+            "id": node["id"],
+            "type": node["type"],
+            "name": node["name"],
+            "city": node.get("city", node.get("region", "")),
+            "tags": node.get("tags", []),
+        })
+
+    def _answer_best_time(self, node: Dict, _etype):
+        city = self.city_of(node)
+        if city is None or not city.get("best_time_to_visit"):
+            return None
+        when = city["best_time_to_visit"]
+        if city is node:
+            text = f"The best time to visit {city['name']} is {when}."
+            return text, [], []
+        text = f"{node['name']} is in {city['name']}; the best time to visit {city['name']} is {when}."
+        rel = next((r for r, t in self.outgoing[node["id"]] if t == city["id"]), None)
+        if rel is None:
+            return None
+        return text, [city], [self._fact(node, rel, city)]
+
+    def _answer_list_type(self, node: Dict, etype: str):
+        city = self.city_of(node)
+        if city is not node:
+            return None
+        found = [(rel, self.nodes[src]) for rel, src in self.incoming.get(city["id"], [])
+                 if self.nodes.get(src, {}).get("type") == etype]
+        label = next(words[0] for t, words in _TYPE_WORDS.items() if t == etype)
+        if not found:
+            return f"I don't have any {label} listed in {city['name']}.", [], []
+        shown = found[:self.max_items]
+        names = [n["name"] for _, n in shown]
+        more = f", plus {len(found) - len(shown)} more" if len(found) > len(shown) else ""
+        text = f"{label.capitalize()} in {city['name']} ({len(found)}): {', '.join(names)}{more}."
+        return text, [n for _, n in shown], [self._fact(n, rel, city) for rel, n in shown]
+
+    def _answer_tags(self, node: Dict, _etype):
+        tags = node.get("tags") or []
+        if not tags:
+            return None
+        return f"{node['name']} is known for: {_join(tags)}.", [], []
+
+    def _answer_region(self, node: Dict, _etype):
+        city = self.city_of(node)
+        if city is None or not city.get("region"):
+            return None
+        if city is node:
+            return f"{city['name']} is in {city['region']}.", [], []
+        rel = next((r for r, t in self.outgoing[node["id"]] if t == city["id"]), None)
+        if rel is None:
+            return None
+        text = f"{node['name']} is in {city['name']}, {city['region']}."
+        return text, [city], [self._fact(node, rel, city)]
+
+    def _answer_connections(self, node: Dict, _etype):
+        if node["type"] != "City":
+            return None
+        linked = []
+        for rel, other in self.outgoing.get(node["id"], []) + self.incoming.get(node["id"], []):
+            target = self.nodes.get(other)
+            if rel == "Connected_To" and target and target not in linked:
+                linked.append(target)
+        if not linked:
+            return f"{node['name']} has no listed connections to other cities.", [], []
+        text = f"{node['name']} is connected to {_join([c['name'] for c in linked])}."
+        return text, linked, [self._fact(node, "Connected_To", c) for c in linked]
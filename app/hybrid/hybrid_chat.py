@@ -274,68 +274,118 @@ Enhanced HybridChat with async operations, caching, retry, and graceful fallback
 import logging
 import asyncio
 import hashlib
+import sqlite3
 import threading
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Any
-
+import time
+import weakref
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Callable, List, Dict, Optional, Tuple
+
+from app.cache.cache_factory import create_cache
+from app.cache.freshness import FRESH, STALE, CacheEntry, freshness
+from app.cache.memory_cache import SimpleCache  # noqa: F401  (re-exported for existing imports)
+from app.config_loader import Config
+from app.hybrid.fact_ranker import FactRanker
+from app.hybrid.fast_path import FastPathIndex
+from app.hybrid.session import ChatSession, SessionStore
 from app.retrievers.pinecone_retriever import PineconeRetriever
+from app.retrievers.local_retriever import LocalVectorRetriever
 from app.retrievers.neo4j_retriever import Neo4jRetriever
 from app.llm.llm_client import chat_completion
+from app.logger import request_context
 from app.llm.prompt_builder import PromptBuilder
+from app.llm.scheduler import Priority, priority_scope
+from app.llm.usage import ECONOMY, EXHAUSTED, NORMAL, TokenBudget, budget as token_budget, request_usage
+from app.utils.background_loop import BackgroundLoop
+from app.utils.metrics import RequestTrace, metrics, request_trace
+from app.utils.perf_log import PerfLog, open_perf_log, query_hash
+from app.utils.profiler import RequestProfiler
 from app.exceptions import RetrievalError, LLMError
 
 logger = logging.getLogger(__name__)
 
-
-# ============================================================
-# Thread-safe in-memory cache with TTL
-# ============================================================
-class SimpleCache:
-    def __init__(self, ttl_seconds: int = 3600):
-        self.cache: Dict[str, Any] = {}
-        self.ttl_seconds = ttl_seconds
-        self.lock = threading.Lock()
-
-    def get(self, key: str) -> Optional[Any]:
-        with self.lock:
-            entry = self.cache.get(key)
-            if not entry:
-                logger.debug(f"[CACHE] MISS for {key[:12]}")
-                return None
-            value, timestamp = entry
-            if datetime.now() - timestamp < timedelta(seconds=self.ttl_seconds):
-                logger.debug(f"[CACHE] HIT for {key[:12]}")
-                return value
-            else:
-                logger.debug(f"[CACHE] EXPIRED for {key[:12]}")
-                del self.cache[key]
-                return None
-
-    def set(self, key: str, value: Any):
-        with self.lock:
-            self.cache[key] = (value, datetime.now())
-
-    def clear(self):
-        with self.lock:
-            self.cache.clear()
-        logger.info("[CACHE] Cleared all entries.")
+# Cache backend failures (unserializable values, a locked or corrupt SQLite file, bad
+# entries): the request is served without the cache rather than failed
+CACHE_ERRORS = (TypeError, ValueError, sqlite3.Error)
 
 
 # ============================================================
 # Async Hybrid Chat
 # ============================================================
 class AsyncHybridChat:
-    def __init__(self, enable_cache: bool = True):
-        self.pinecone = PineconeRetriever()
-        self.neo4j = Neo4jRetriever()
+    def __init__(
+        self,
+        enable_cache: bool = True,
+        vector_retriever=None,
+        graph_retriever=None,
+        completion_fn: Optional[Callable[[List[Dict]], str]] = None,
+        fast_path: Optional[FastPathIndex] = None,
+        fact_ranker: Optional[FactRanker] = None,
+        perf_log: Optional[PerfLog] = None,
+        profiler: Optional[RequestProfiler] = None,
+        budget: Optional[TokenBudget] = None,
+    ):
+        # Backends can be injected (load tests, replay); by default they come from Config.
+        # Semantic retriever: Pinecone, or the shared memory-mapped local snapshot
+        if vector_retriever is not None:
+            self.pinecone = vector_retriever
+        elif Config.VECTOR_BACKEND == "local":
+            self.pinecone = LocalVectorRetriever()
+        else:
+            self.pinecone = PineconeRetriever()
+        self.neo4j = graph_retriever if graph_retriever is not None else Neo4jRetriever()
+        # Called as complete(messages), plus max_tokens=... while the token budget is in economy mode
+        self.complete = completion_fn or chat_completion
+        self.budget = budget if budget is not None else token_budget
         self.prompt_builder = PromptBuilder()
+        # Graph facts are ranked against the query; stored node embeddings come from the vector backend
+        self.fact_ranker = fact_ranker or FactRanker(getattr(self.pinecone, "node_vectors", None))
         self.enable_cache = enable_cache
-        self.cache = SimpleCache(ttl_seconds=3600) if enable_cache else None
+        self.cache = create_cache() if enable_cache else None
+        self.fast_path = fast_path if fast_path is not None else self._load_fast_path()
+        # Retrievals precomputed by cache warm-up, reused by the first real request
+        self.warm_retrievals = SimpleCache(ttl_seconds=Config.CACHE_TTL_SECONDS)
+        self.sessions = SessionStore(
+            max_sessions=Config.SESSION_MAX,
+            idle_timeout=Config.SESSION_IDLE_TIMEOUT,
+        )
+        # Event-loop thread for synchronous callers, started on first handle_query()
+        self._loop: Optional[BackgroundLoop] = None
+        self._loop_lock = threading.Lock()
+        # Identical in-flight queries share one task (per event loop)
+        self._inflight: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        # Background refreshes of stale / soon-to-expire answers, at most one per key
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        # One record per query for offline analysis, written by a background thread
+        if perf_log is None and Config.PERF_LOG_ENABLED:
+            perf_log = open_perf_log(Config.PERF_LOG_PATH, Config.PERF_LOG_MAX_BYTES, Config.PERF_LOG_BACKUPS)
+        self.perf_log = perf_log
+        # cProfile / tracemalloc / stack samples for a share of requests (off unless PROFILE_SAMPLE_RATE > 0)
+        if profiler is None and Config.PROFILE_SAMPLE_RATE > 0:
+            profiler = RequestProfiler(
+                Config.PROFILE_DIR,
+                Config.PROFILE_SAMPLE_RATE,
+                top_n=Config.PROFILE_TOP_N,
+                interval_ms=Config.PROFILE_INTERVAL_MS,
+            )
+        self.profiler = profiler
         logger.info(f"AsyncHybridChat initialized (cache: {enable_cache}).")
 
     # --------------------- UTILITIES ---------------------
-    def _generate_cache_key(self, query: str, top_k: int) -> str:
-        return hashlib.md5(f"{query}:{top_k}".encode()).hexdigest()
+    @staticmethod
+    def _load_fast_path() -> Optional[FastPathIndex]:
+        if not Config.FAST_PATH_ENABLED:
+            return None
+        try:
+            return FastPathIndex.from_dataset(Config.DATASET_PATH, max_items=Config.FAST_PATH_MAX_ITEMS)
+        except Exception as e:
+            logger.warning(f"Fast path disabled — could not load {Config.DATASET_PATH}: {e}")
+            return None
+
+    def _generate_cache_key(self, query: str, top_k: int, context: str = "") -> str:
+        key = f"{query}:{top_k}:{context}" if context else f"{query}:{top_k}"
+        return hashlib.md5(key.encode()).hexdigest()
 
     async def _retry_async(self, func, *args, retries=3, delay=2, **kwargs):
         """Retry wrapper for transient errors."""
@@ -344,86 +394,464 @@ class AsyncHybridChat:
                 return await asyncio.to_thread(func, *args, **kwargs)
             except Exception as e:
                 logger.warning(f"[Retry {attempt}/{retries}] {func.__name__} failed: {e}")
+                metrics.inc(f"retries.{func.__name__}")
                 if attempt < retries:
                     await asyncio.sleep(delay)
         raise RetrievalError(f"{func.__name__} failed after {retries} retries")
 
+    async def _fetch_graph_facts(self, node_ids: List[str]) -> Tuple[List[Dict], List[str]]:
+        """Fetch graph facts, falling back to none; returns the facts and the ids actually looked up."""
+        if not node_ids:
+            return [], []
+        try:
+            with metrics.timer("stage.graph"):
+                graph_facts = await self._retry_async(self.neo4j.fetch_graph_context, node_ids)
+            logger.info(f"[ASYNC] Retrieved {len(graph_facts)} Neo4j facts.")
+            return graph_facts, list(node_ids)
+        except Exception as e:
+            logger.warning(f"[FALLBACK] Neo4j retrieval failed — continuing with semantic data only: {e}")
+            metrics.inc("fallback.graph")
+            return [], []
+
+    def _answer_fast_path(self, query: str, session: Optional[ChatSession]) -> Optional[Dict]:
+        """Template answer for structured lookups, or None to use the full pipeline."""
+        with metrics.timer("stage.fast_path"):
+            fast = self.fast_path.answer(query)
+        if fast is None:
+            metrics.inc("fast_path.miss")
+            return None
+        metrics.inc("fast_path.hit")
+        logger.info(f"[FAST PATH] Answered '{fast['intent']}' lookup for {fast['entity']} without the LLM.")
+        result = {
+            "query": query,
+            "matches": fast["matches"],
+            "graph_facts": fast["graph_facts"],
+            "answer": fast["answer"],
+            "cached": False,
+            "stale": False,
+            "source": "fast_path",
+            "retrieval": {"followup": False, "intent": fast["intent"], "graph_lookups": 0},
+            "usage": request_usage(),
+            "timestamp": datetime.now().isoformat()
+        }
+        if session:
+            # Facts cover only the lookup, so follow-ups still expand these nodes in Neo4j
+            session.remember(query, fast["answer"], fast["matches"], fast["graph_facts"], fetched_ids=[])
+            result["session_id"] = session.session_id
+        return result
+
+    async def _retrieve_followup(self, session: ChatSession, query: str, top_k: int):
+        """
+        Retrieve only what a follow-up adds: a filtered semantic search for the new
+        entities, and graph lookups for matches the session has not expanded yet.
+        """
+        known_ids = set(session.match_ids)
+        metadata_filter = session.build_filter(query)
+        with metrics.timer("stage.vector_search"):
+            new_matches = await self._retry_async(self.pinecone.query, query, top_k, metadata_filter)
+        matches = session.merge_matches(new_matches, limit=top_k * 2)
+        match_ids = [m["id"] for m in matches]
+
+        fetched = session.fact_sources
+        missing = [mid for mid in match_ids if mid not in fetched]
+        new_facts, fetched_ids = await self._fetch_graph_facts(missing)
+        graph_facts = session.facts_for(match_ids) + new_facts
+
+        stats = {
+            "followup": True,
+            "filter": metadata_filter,
+            "new_matches": len([m for m in new_matches if m["id"] not in known_ids]),
+            "reused_matches": len([mid for mid in match_ids if mid in known_ids]),
+            "graph_lookups": len(missing),
+        }
+        logger.info(
+            f"[SESSION] Follow-up reused {stats['reused_matches']} matches, "
+            f"looked up {len(missing)} of {len(match_ids)} nodes in Neo4j."
+        )
+        return matches, graph_facts, fetched_ids, stats
+
+    async def _coalesce(self, key: str, factory, priority: Optional[Priority] = None):
+        """
+        Run factory() once for concurrent callers with the same key. shield() keeps
+        one caller's timeout from cancelling the work the others are waiting on.
+        `priority` applies only if this caller starts the work; joining an in-flight
+        task leaves it at the priority of the caller that started it.
+        """
+        inflight = self._inflight.setdefault(asyncio.get_running_loop(), {})
+        task = inflight.get(key)
+        if task is None:
+            # The task copies the current context, and with it the OpenAI request priority
+            with priority_scope(priority) if priority is not None else nullcontext():
+                task = asyncio.ensure_future(factory())
+            inflight[key] = task
+            task.add_done_callback(lambda _: inflight.pop(key, None))
+        else:
+            logger.info("[ASYNC] Joining in-flight request for identical query.")
+            metrics.inc("requests.coalesced")
+        return await asyncio.shield(task)
+
+    async def _retrieve(self, query: str, top_k: int):
+        """Semantic search plus graph context for a fresh query."""
+        # Step 1 – Semantic search (async)
+        with metrics.timer("stage.vector_search"):
+            matches = await self._retry_async(self.pinecone.query, query, top_k)
+        match_ids = [m["id"] for m in matches]
+        logger.info(f"[ASYNC] Retrieved {len(matches)} Pinecone matches.")
+
+        # Step 2 – Graph context
+        graph_facts, fetched_ids = await self._fetch_graph_facts(match_ids)
+        return matches, graph_facts, fetched_ids
+
+    async def _answer_fresh(self, query: str, top_k: int, history: str):
+        """Full retrieval + generation; depends only on (query, top_k, history)."""
+        warm = self.warm_retrievals.get(self._generate_cache_key(query, top_k))
+        if warm is not None:
+            metrics.inc("warmup.used")
+            matches, graph_facts, fetched_ids = warm
+        else:
+            matches, graph_facts, fetched_ids = await self._retrieve(query, top_k)
+        retrieval = {
+            "followup": False,
+            # A warm hit reuses the facts fetched during warm-up: no graph lookups in this request
+            "graph_lookups": 0 if warm is not None else len(matches),
+            "warm": warm is not None,
+        }
+        answer, prompt_facts = await self._generate(query, matches, graph_facts, history)
+        return matches, graph_facts, prompt_facts, fetched_ids, retrieval, answer
+
+    async def warm_query_async(self, query: str, top_k: int = 5, full_answer: bool = False) -> str:
+        """
+        Precompute a likely query ahead of real traffic. Returns what was done:
+        "fast_path" / "cached" (nothing needed), "answer" or "retrieval".
+        """
+        if self.fast_path is not None and self.fast_path.classify(query) is not None:
+            return "fast_path"
+        # Fresh answers need nothing; stale ones are rebuilt below like a miss
+        if self.enable_cache:
+            entry = await self._cache_lookup(self._generate_cache_key(query, top_k))
+            if entry is not None and entry.age < self.cache.ttl_seconds:
+                return "cached"
+        if full_answer and self.enable_cache:
+            await self._handle_query(query, top_k, None)
+            return "answer"
+        key = self._generate_cache_key(query, top_k)
+        if self.warm_retrievals.get(key) is None:
+            matches, graph_facts, fetched_ids = await self._retrieve(query, top_k)
+            # Also fetches the target nodes' vectors the ranker will need
+            await self._rank_facts(query, graph_facts)
+            self.warm_retrievals.set(key, (matches, graph_facts, fetched_ids))
+        return "retrieval"
+
+    async def _rank_facts(self, query: str, graph_facts: List[Dict]) -> List[Dict]:
+        """Keep the graph facts most relevant to the query, within the prompt budget."""
+        if not graph_facts:
+            return []
+        with metrics.timer("stage.rank_facts"):
+            query_vector = None
+            embed = getattr(self.pinecone, "get_embedding", None)
+            if embed is not None and self.fact_ranker.node_vectors is not None:
+                try:
+                    # Already embedded for the vector search, so this is served from memory
+                    query_vector = await asyncio.to_thread(embed, query)
+                except Exception as e:
+                    logger.warning(f"Query embedding unavailable for fact ranking: {e}")
+            ranked = await asyncio.to_thread(self.fact_ranker.rank, query, graph_facts, query_vector)
+        metrics.inc("facts.candidates", len(graph_facts))
+        metrics.inc("facts.prompted", len(ranked))
+        return ranked
+
+    async def _generate(
+        self, query: str, matches: List[Dict], graph_facts: List[Dict], history: str
+    ) -> Tuple[str, List[Dict]]:
+        """The answer and the facts it was prompted with (what results and the cache keep)."""
+        # Step 3 – Prompt creation, with only the facts that matter for this query
+        prompt_facts = await self._rank_facts(query, graph_facts)
+        # Close to the daily token cap: half the facts and a shorter answer
+        economy = self.budget.mode() != NORMAL
+        if economy:
+            prompt_facts = prompt_facts[: max(1, len(prompt_facts) // 2)]
+        messages = self.prompt_builder.build_prompt(query, matches, prompt_facts, history=history)
+
+        # Step 4 – LLM reasoning (retry-safe)
+        with metrics.timer("stage.llm"):
+            if economy:
+                answer = await self._retry_async(self.complete, messages, max_tokens=Config.BUDGET_ECONOMY_MAX_TOKENS)
+            else:
+                answer = await self._retry_async(self.complete, messages)
+        return answer, prompt_facts
+
+    async def _answer_degraded(self, query: str, top_k: int, session: Optional[ChatSession]) -> Dict:
+        """Retrieval-only answer once the daily token budget is spent: no chat completion, not cached."""
+        with metrics.timer("stage.vector_search"):
+            matches = await self._retry_async(self.pinecone.query, query, top_k)
+        lines = ["The daily limit for generated answers has been reached. The closest matches are:", ""]
+        for m in matches:
+            meta = m.get("metadata") or {}
+            # Index metadata carries no description; the dataset nodes behind the fast path do
+            node = self.fast_path.nodes.get(m["id"]) if self.fast_path is not None else None
+            description = ((node or meta).get("description") or "").strip()
+            line = f"- **{meta.get('name', m['id'])}** ({meta.get('type', 'place')})"
+            lines.append(f"{line}: {description[:160]}" if description else line)
+        if not matches:
+            lines.append("- No matching places were found.")
+        answer = "\n".join(lines)
+        logger.info(f"[BUDGET] Answered without the LLM ({len(matches)} matches): {query[:30]}...")
+        result = self._result(query, matches, [], answer, {"followup": False, "graph_lookups": 0})
+        result["source"] = "degraded"
+        if session:
+            session.remember(query, answer, matches, [], fetched_ids=[])
+            result["session_id"] = session.session_id
+        return result
+
+    def _result(self, query: str, matches, graph_facts, answer: str, retrieval: Dict) -> Dict:
+        return {
+            "query": query,
+            "matches": matches,
+            "graph_facts": graph_facts,
+            "answer": answer,
+            "cached": False,
+            "stale": False,
+            "source": "llm",
+            "retrieval": retrieval,
+            # Tokens this request (or refresh) spent; coalesced callers spent none
+            "usage": request_usage(),
+            "timestamp": datetime.now().isoformat()
+        }
+
+    async def _cache_lookup(self, cache_key: str) -> Optional[CacheEntry]:
+        """Cache lookup off the event loop; a failing cache backend is treated as a miss."""
+        try:
+            return await asyncio.to_thread(self.cache.lookup, cache_key)
+        except CACHE_ERRORS as e:
+            metrics.inc("cache.errors")
+            logger.warning(f"[CACHE] Lookup failed, treating it as a miss: {e}")
+            return None
+
+    async def _cache_set(self, cache_key: str, result: Dict):
+        """Store a result off the event loop; a failing cache backend only loses the entry."""
+        try:
+            await asyncio.to_thread(self.cache.set, cache_key, result)
+        except CACHE_ERRORS as e:
+            metrics.inc("cache.errors")
+            logger.warning(f"[CACHE] Could not store the result: {e}")
+
+    def _schedule_refresh(self, cache_key: str, query: str, top_k: int, history: str):
+        """Rebuild a cached answer in the background; concurrent callers keep the old one meanwhile."""
+        if cache_key in self._refreshing:
+            return
+
+        async def refresh():
+            try:
+                # Its own trace, so the refresh is not counted against the request that triggered it.
+                # BACKGROUND only if the refresh starts the work: a user request already building
+                # this answer keeps its own priority.
+                with request_trace():
+                    matches, _, prompt_facts, _, retrieval, answer = await self._coalesce(
+                        cache_key, lambda: self._answer_fresh(query, top_k, history), Priority.BACKGROUND
+                    )
+                await self._cache_set(cache_key, self._result(query, matches, prompt_facts, answer, retrieval))
+                metrics.inc("cache.refreshed")
+                logger.info(f"[CACHE] Refreshed cached answer for query: {query[:30]}...")
+            except Exception as e:
+                metrics.inc("cache.refresh_failed")
+                logger.warning(f"[CACHE] Background refresh failed for '{query[:30]}': {e}")
+            finally:
+                self._refreshing.pop(cache_key, None)
+
+        self._refreshing[cache_key] = asyncio.ensure_future(refresh())
+
     # --------------------- CORE PIPELINE ---------------------
-    async def handle_query_async(self, query: str, top_k: int = 5) -> Dict:
+    async def handle_query_async(self, query: str, top_k: int = 5, session_id: Optional[str] = None) -> Dict:
+        # Log lines of this request (including its worker threads) share one id and one sampling decision
+        with request_context() as request_id, request_trace() as trace, (
+            self.profiler.profile(request_id, f"top_k={top_k} query={query[:80]!r}") if self.profiler else nullcontext()
+        ):
+            metrics.inc("requests.total")
+            # Popular user queries, replayed by cache warm-up (warm-up itself does not come through here)
+            metrics.count_top("queries", " ".join(query.split()))
+            result, error = None, None
+            try:
+                with metrics.timer("stage.total"):
+                    result = await self._handle_query(query, top_k, session_id)
+                return result
+            except BaseException as e:  # includes cancellation on timeout
+                error = e
+                raise
+            finally:
+                if self.perf_log is not None:
+                    self.perf_log.record(self._perf_record(request_id, query, top_k, session_id, trace, result, error))
+
+    @staticmethod
+    def _perf_record(
+        request_id: str,
+        query: str,
+        top_k: int,
+        session_id: Optional[str],
+        trace: RequestTrace,
+        result: Optional[Dict],
+        error: Optional[BaseException],
+    ) -> Dict:
+        """Compact summary of one request for the perf log (the query itself is only hashed)."""
+        counters = trace.counters
+        if result is not None and result.get("source") == "fast_path":
+            cache = "bypass"
+        elif counters.get("cache.hit"):
+            cache = "stale" if counters.get("cache.stale") else (
+                "refresh_ahead" if counters.get("cache.refresh_ahead") else "hit"
+            )
+        elif counters.get("cache.miss"):
+            cache = "miss"
+        else:
+            cache = None
+        return {
+            "ts": round(time.time(), 3),
+            "request_id": request_id,
+            "query_hash": query_hash(query),
+            "top_k": top_k,
+            "session": session_id is not None,
+            "source": result.get("source") if result else None,
+            "cache": cache,
+            "coalesced": bool(counters.get("requests.coalesced")),
+            "stages_ms": {
+                name[len("stage."):]: round(ms, 2) for name, ms in trace.timings.items() if name.startswith("stage.")
+            },
+            "match_ids": [m["id"] for m in result["matches"]] if result else [],
+            "facts": {
+                "candidates": int(counters.get("facts.candidates", 0)),
+                "prompted": int(counters.get("facts.prompted", 0)),
+                "returned": len(result["graph_facts"]) if result else 0,
+            },
+            "tokens": {name[len("tokens."):]: int(n) for name, n in counters.items() if name.startswith("tokens.")},
+            "cost_usd": round(counters.get("cost.usd", 0.0), 6),
+            "retries": int(sum(
+                n for name, n in counters.items() if name.startswith("retries.") or name == "openai.retries"
+            )),
+            "fallbacks": sorted(name[len("fallback."):] for name in counters if name.startswith("fallback.")),
+            "error": type(error).__name__ if error is not None else None,
+        }
+
+    async def _handle_query(self, query: str, top_k: int, session_id: Optional[str]) -> Dict:
         try:
-            logger.info(f"[ASYNC] Handling user query: {query}")
+            # The text stays out of INFO logs; scripts/analyze_perf_log.py reads it from DEBUG lines
+            logger.info(f"[ASYNC] Handling query {query_hash(query)}")
+            logger.debug(f"Handling user query: {query}")
+
+            session = self.sessions.get_or_create(session_id) if session_id else None
+            history = session.summary if session else ""
+
+            # Structured lookups are answered from the dataset in milliseconds
+            if self.fast_path is not None:
+                fast = self._answer_fast_path(query, session)
+                if fast is not None:
+                    return fast
+
+            budget_mode = self.budget.mode()
+            if budget_mode != NORMAL:
+                metrics.inc(f"budget.{budget_mode}")
 
             # Check cache
-            cache_key = self._generate_cache_key(query, top_k)
+            cache_key = self._generate_cache_key(query, top_k, history)
             if self.enable_cache:
-                cached = self.cache.get(cache_key)
-                if cached:
-                    cached["cached"] = True
-                    logger.info(f"[CACHE] Returning cached result for query: {query[:30]}...")
+                entry = await self._cache_lookup(cache_key)
+                metrics.inc("cache.hit" if entry else "cache.miss")
+                if entry:
+                    state = freshness(entry, self.cache.ttl_seconds, Config.CACHE_REFRESH_AHEAD, Config.CACHE_HOT_HITS)
+                    if state != FRESH:
+                        # Stale: served now, rebuilt once in the background. Hot: rebuilt before expiry.
+                        # Near the token cap only stale answers are rebuilt; past it, none are.
+                        metrics.inc(f"cache.{state}")
+                        if budget_mode == NORMAL or (budget_mode == ECONOMY and state == STALE):
+                            self._schedule_refresh(cache_key, query, top_k, history)
+                    # The cache is shared between users: copy before tagging it for this caller
+                    cached = dict(entry.value, cached=True, stale=state == STALE)
+                    cached.pop("session_id", None)
+                    # What building the answer cost is what serving it from the cache saved
+                    metrics.inc("cost.saved_usd", (cached.get("usage") or {}).get("cost_usd", 0.0))
+                    cached["usage"] = request_usage()
+                    logger.info(f"[CACHE] Returning {state} cached result for query: {query[:30]}...")
+                    if session:
+                        session.remember(
+                            query, cached["answer"], cached["matches"], cached["graph_facts"],
+                            fetched_ids=[m["id"] for m in cached["matches"]],
+                        )
+                        cached["session_id"] = session.session_id
                     return cached
 
-            # Step 1 – Semantic search (async)
-            matches = await self._retry_async(self.pinecone.query, query, top_k)
-            match_ids = [m["id"] for m in matches]
-            logger.info(f"[ASYNC] Retrieved {len(matches)} Pinecone matches.")
-
-            # Step 2 – Graph context (parallel)
-            graph_facts = []
-            try:
-                graph_facts = await self._retry_async(self.neo4j.fetch_graph_context, match_ids)
-                logger.info(f"[ASYNC] Retrieved {len(graph_facts)} Neo4j facts.")
-            except Exception as e:
-                logger.warning(f"[FALLBACK] Neo4j retrieval failed — continuing with semantic data only: {e}")
+            if budget_mode == EXHAUSTED:
+                return await self._answer_degraded(query, top_k, session)
 
-            # Step 3 – Prompt creation
-            messages = self.prompt_builder.build_prompt(query, matches, graph_facts)
+            if session and session.is_followup(query):
+                # Step 1+2 – Incremental retrieval reusing the session context
+                matches, graph_facts, fetched_ids, retrieval = await self._retrieve_followup(
+                    session, query, top_k
+                )
+                answer, prompt_facts = await self._generate(query, matches, graph_facts, history)
+            else:
+                matches, graph_facts, prompt_facts, fetched_ids, retrieval, answer = await self._coalesce(
+                    cache_key, lambda: self._answer_fresh(query, top_k, history)
+                )
 
-            # Step 4 – LLM reasoning (retry-safe)
-            answer = await self._retry_async(chat_completion, messages)
+            # Step 5 – Structure output: the result (and cache entry) keeps only the prompted facts;
+            # the session keeps every fetched fact for follow-ups
+            result = self._result(query, matches, prompt_facts, answer, retrieval)
 
-            # Step 5 – Structure output
-            result = {
-                "query": query,
-                "matches": matches,
-                "graph_facts": graph_facts,
-                "answer": answer,
-                "cached": False,
-                "timestamp": datetime.now().isoformat()
-            }
+            if session:
+                session.remember(query, answer, matches, graph_facts, fetched_ids)
+                result["session_id"] = session.session_id
 
             if self.enable_cache:
-                self.cache.set(cache_key, result)
+                await self._cache_set(cache_key, result)
 
             return result
 
         except (RetrievalError, LLMError) as e:
             logger.error(f"[ASYNC] Known error: {e}")
+            metrics.inc("requests.errors")
             raise
         except Exception as e:
             logger.exception("[ASYNC] Hybrid reasoning failed.")
+            metrics.inc("requests.errors")
             raise RetrievalError(f"Async hybrid reasoning failed: {e}")
 
     # --------------------- SYNC WRAPPER ---------------------
-    def handle_query(self, query: str, top_k: int = 5) -> Dict:
-        """Safe synchronous wrapper for Streamlit or CLI use."""
+    @property
+    def loop(self) -> BackgroundLoop:
+        """The chat's own event-loop thread; long-lived async state lives here."""
+        with self._loop_lock:
+            if self._loop is None or not self._loop.running:
+                self._loop = BackgroundLoop(name="hybrid-chat-loop")
+            return self._loop
+
+    def handle_query(
+        self,
+        query: str,
+        top_k: int = 5,
+        session_id: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict:
+        """
+        Synchronous entry point for Streamlit and the CLI. The query runs on the
+        chat's background loop; on timeout it is cancelled and TimeoutError raised.
+        """
+        loop = self.loop
+        if threading.current_thread() is loop.thread:
+            raise RuntimeError("handle_query() called from the chat's own event loop; await handle_query_async()")
         try:
-            try:
-                loop = asyncio.get_event_loop()
-            except RuntimeError:
-                # Streamlit thread has no default loop - create one
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-
-            if loop.is_running():
-                # Running inside another async loop
-                future = asyncio.ensure_future(self.handle_query_async(query, top_k))
-                return loop.run_until_complete(future)
-            else:
-                return loop.run_until_complete(self.handle_query_async(query, top_k))
+            return loop.run(self.handle_query_async(query, top_k, session_id), timeout=timeout)
+        except TimeoutError:
+            logger.warning(f"Query timed out after {timeout}s and was cancelled: {query[:50]}")
+            raise
         except Exception as e:
             logger.exception("Error during handle_query execution")
             raise RetrievalError(f"Error executing hybrid query: {e}")
 
+    # --------------------- SESSIONS ---------------------
+    def new_session(self) -> str:
+        """Start a conversation and return its session id."""
+        return self.sessions.get_or_create().session_id
+
+    def end_session(self, session_id: str):
+        self.sessions.drop(session_id)
 
     # --------------------- MAINTENANCE ---------------------
     def get_cache_stats(self) -> Dict:
@@ -431,18 +859,37 @@ class AsyncHybridChat:
             return {"enabled": False}
         return {
             "enabled": True,
-            "size": len(self.cache.cache),
-            "ttl_seconds": self.cache.ttl_seconds
+            "backend": type(self.cache).__name__,
+            "size": len(self.cache),
+            "ttl_seconds": self.cache.ttl_seconds,
+            "stale_seconds": self.cache.stale_seconds,
+            "refreshing": len(self._refreshing),
+        }
+
+    def get_usage_stats(self) -> Dict:
+        """Process totals: tokens, estimated cost, cost saved by the cache, and the daily budget."""
+        counters = metrics.snapshot()["counters"]
+        return {
+            "tokens": {name[len("tokens."):]: int(n) for name, n in counters.items() if name.startswith("tokens.")},
+            "cost_usd": round(counters.get("cost.usd", 0.0), 4),
+            "saved_usd": round(counters.get("cost.saved_usd", 0.0), 4),
+            "budget": self.budget.status(),
         }
 
     def clear_cache(self):
         if self.enable_cache:
             self.cache.clear()
+        self.warm_retrievals.clear()
 
     def close(self):
+        with self._loop_lock:
+            if self._loop is not None:
+                self._loop.stop()
+                self._loop = None
         self.neo4j.close()
         if self.enable_cache:
-            self.cache.clear()
+            self.cache.close()
+        self.sessions.clear()
         logger.info("AsyncHybridChat closed.")
 
 
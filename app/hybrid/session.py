@@ -0,0 +1,240 @@
+"""
+Conversation sessions for multi-turn chat.
+
+A session keeps the matches, graph facts and a rolling summary of earlier
+turns so follow-up questions only retrieve what changed. Facts are kept for
+the most recently used `max_fact_nodes` nodes and only the last `max_turns`
+turns are kept, so a long conversation stays bounded.
+"""
+
+import logging
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Unambiguous references back to something said earlier in the conversation. Words
+# like "it", "that" or "also" appear in too many standalone questions to count.
+_REFERENTIAL = re.compile(r"\b(there|those|same|what about|how about)\b", re.IGNORECASE)
+
+# Follow-up keywords mapped onto the entity types stored in Pinecone metadata
+_TYPE_KEYWORDS = {
+    "Hotel": ("hotel", "hotels", "stay", "stays", "accommodation", "lodging", "resort"),
+    "Attraction": ("attraction", "attractions", "sight", "sights", "sightseeing", "landmark"),
+    "Activity": ("activity", "activities", "things to do", "experience", "experiences"),
+    "City": ("city", "cities", "town", "towns", "destination", "destinations"),
+}
+# Whole words only: "stay" must not match "stayed", nor "town" match "downtown"
+_TYPE_PATTERNS = {
+    entity_type: re.compile(r"\b(" + "|".join(map(re.escape, words)) + r")\b", re.IGNORECASE)
+    for entity_type, words in _TYPE_KEYWORDS.items()
+}
+
+
+def _mentions(text: str, name: str) -> bool:
+    return re.search(rf"\b{re.escape(name.lower())}\b", text) is not None
+
+
+class ChatSession:
+    """State carried between the turns of one conversation."""
+
+    def __init__(self, session_id: str, max_summary_chars: int = 1200, max_fact_nodes: int = 50, max_turns: int = 20):
+        self.session_id = session_id
+        self.max_summary_chars = max_summary_chars
+        self.max_fact_nodes = max_fact_nodes
+        self.max_turns = max_turns
+        self.matches: List[Dict] = []
+        # source node id -> {"facts": [...], "fetched": whether its neighbours were looked up}, LRU order
+        self._nodes: "OrderedDict[str, Dict]" = OrderedDict()
+        self.turns: List[Dict[str, str]] = []
+        self.summary = ""
+        self.last_active = time.monotonic()
+
+    # --------------------- CONTEXT ---------------------
+    @property
+    def match_ids(self) -> List[str]:
+        return [m["id"] for m in self.matches]
+
+    @property
+    def graph_facts(self) -> List[Dict]:
+        return [f for node in self._nodes.values() for f in node["facts"]]
+
+    @property
+    def fact_sources(self) -> Set[str]:
+        """Nodes whose neighbours are already held (follow-ups skip their graph lookup)."""
+        return {source for source, node in self._nodes.items() if node["fetched"]}
+
+    @property
+    def cities(self) -> List[str]:
+        """Cities the conversation is currently about, from the cached matches."""
+        cities = []
+        for m in self.matches:
+            meta = m.get("metadata") or {}
+            city = meta.get("name") if meta.get("type") == "City" else meta.get("city")
+            if city and city not in cities:
+                cities.append(city)
+        return cities
+
+    def mentions_context(self, query: str) -> bool:
+        """Whether the query names a city or place already under discussion."""
+        lowered = query.lower()
+        names = set(self.cities)
+        names.update((m.get("metadata") or {}).get("name") for m in self.matches)
+        return any(_mentions(lowered, name) for name in names if name)
+
+    def is_followup(self, query: str) -> bool:
+        """
+        A query is a follow-up if there is history and it refers back to it, either
+        with a referential word ("there", "what about") or by naming something
+        already under discussion. Short standalone questions start afresh.
+        """
+        if not self.turns:
+            return False
+        return bool(_REFERENTIAL.search(query)) or self.mentions_context(query)
+
+    def build_filter(self, query: str) -> Optional[Dict]:
+        """
+        Build a Pinecone metadata filter for the part of a follow-up that changed:
+        the requested entity type, scoped to the cities already under discussion.
+        """
+        lowered = query.lower()
+        types = [t for t, pattern in _TYPE_PATTERNS.items() if pattern.search(query)]
+        conditions = []
+        if types:
+            conditions.append({"type": {"$in": types}})
+        cities = self.cities
+        if cities and not any(_mentions(lowered, c) for c in cities) and _REFERENTIAL.search(query):
+            conditions.append({"city": {"$in": cities}})
+        if not conditions:
+            return None
+        return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+    def merge_matches(self, new_matches: List[Dict], limit: int) -> List[Dict]:
+        """Put the fresh matches first and keep earlier ones as supporting context."""
+        seen = set()
+        merged = []
+        for m in list(new_matches) + self.matches:
+            if m["id"] in seen:
+                continue
+            seen.add(m["id"])
+            merged.append(m)
+        return merged[:limit]
+
+    def facts_for(self, node_ids: List[str]) -> List[Dict]:
+        facts = []
+        for node_id in dict.fromkeys(node_ids):
+            node = self._nodes.get(node_id)
+            if node is not None:
+                facts.extend(node["facts"])
+        return facts
+
+    # --------------------- UPDATE ---------------------
+    def remember(
+        self,
+        query: str,
+        answer: str,
+        matches: List[Dict],
+        graph_facts: List[Dict],
+        fetched_ids: List[str],
+    ):
+        """
+        Record a finished turn and roll the conversation summary forward.
+        `fetched_ids` are the nodes whose neighbors were looked up this turn.
+        """
+        self.matches = list(matches)
+        for f in graph_facts:
+            node = self._node(f.get("source"))
+            key = (f.get("rel"), f.get("target_id"))
+            if all((k.get("rel"), k.get("target_id")) != key for k in node["facts"]):
+                node["facts"].append(f)
+        for node_id in fetched_ids:
+            self._node(node_id)["fetched"] = True
+        # Nodes of this turn are the most recent; the least recently used ones are forgotten
+        while len(self._nodes) > self.max_fact_nodes:
+            self._nodes.popitem(last=False)
+
+        self.turns.append({"query": query, "answer": answer})
+        del self.turns[: -self.max_turns]
+        self.summary = self._summarize()
+        self.touch()
+
+    def _node(self, node_id: str) -> Dict:
+        node = self._nodes.get(node_id)
+        if node is None:
+            node = self._nodes[node_id] = {"facts": [], "fetched": False}
+        else:
+            self._nodes.move_to_end(node_id)
+        return node
+
+    def _summarize(self) -> str:
+        """Keep the most recent turns that fit in the summary budget."""
+        lines: List[str] = []
+        used = 0
+        for turn in reversed(self.turns):
+            answer = " ".join((turn["answer"] or "").split())[:200]
+            line = f"- User asked: {turn['query']}\n  Assistant: {answer}"
+            if used + len(line) > self.max_summary_chars:
+                break
+            lines.insert(0, line)
+            used += len(line)
+        return "\n".join(lines)
+
+    def touch(self):
+        self.last_active = time.monotonic()
+
+
+class SessionStore:
+    """Bounded LRU of chat sessions with an idle timeout."""
+
+    def __init__(self, max_sessions: int = 256, idle_timeout: int = 1800):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_or_create(self, session_id: Optional[str] = None) -> ChatSession:
+        with self.lock:
+            self._expire_idle()
+            session_id = session_id or uuid.uuid4().hex
+            session = self.sessions.get(session_id)
+            if session is None:
+                session = ChatSession(session_id)
+                self.sessions[session_id] = session
+                while len(self.sessions) > self.max_sessions:
+                    evicted, _ = self.sessions.popitem(last=False)
+                    logger.debug(f"[SESSION] Evicted least recently used session {evicted[:8]}")
+            else:
+                self.sessions.move_to_end(session_id)
+            session.touch()
+            return session
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        with self.lock:
+            self._expire_idle()
+            session = self.sessions.get(session_id)
+            if session is not None:
+                self.sessions.move_to_end(session_id)
+            return session
+
+    def drop(self, session_id: str):
+        with self.lock:
+            self.sessions.pop(session_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.sessions.clear()
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    def _expire_idle(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        expired = [sid for sid, s in self.sessions.items() if s.last_active < cutoff]
+        for sid in expired:
+            del self.sessions[sid]
+        if expired:
+            logger.debug(f"[SESSION] Expired {len(expired)} idle sessions.")
@@ -0,0 +1,218 @@
+"""
+app/hybrid/warmup.py
+Background cache warm-up from recorded user traffic or a curated query file.
+
+At startup (and optionally every WARMUP_INTERVAL seconds) the most frequent
+queries are replayed through the chat at BACKGROUND priority with bounded
+concurrency. By default this precomputes query embeddings, vector matches and
+graph facts. With WARMUP_ANSWERS it precomputes full answers into the answer
+cache. Warm-up runs on the chat's event loop and never blocks readiness; its
+progress and coverage are reported by status().
+
+Traffic is counted by AsyncHybridChat for every user request (unsampled, unlike
+the application log) into the "queries" top-N table of the metrics registry,
+which each process exports with its metrics snapshot. Warm-up sums the tables of
+all snapshots, so counts from earlier runs of the service carry over. Warm-up
+requests do not go through that counter, and their log lines are marked (see
+app/logger.py). Warm-up spends tokens, so it is skipped unless the daily token
+budget is in normal mode.
+"""
+
+import asyncio
+import json
+import logging
+import re
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from app.llm.scheduler import Priority, priority_scope
+from app.llm.usage import NORMAL
+from app.logger import request_context
+from app.utils.metrics import metrics, read_snapshots
+
+logger = logging.getLogger(__name__)
+
+# Written by AsyncHybridChat for every (sampled) query it handles
+_LOGGED_QUERY = re.compile(r"Handling user query: (?P<query>.+?)\s*$")
+# Request id column of the plain-text log format for warm-up requests
+_WARMUP_REQUEST = re.compile(r"\| warmup-\w+ \|")
+
+
+def logged_query(line: str) -> Optional[str]:
+    """The query in a JSON or plain-text log line, if it is a query line of a user request (not warm-up)."""
+    if line.startswith("{"):
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            return None
+        if entry.get("warmup"):
+            return None
+        line = entry.get("msg", "")
+    elif _WARMUP_REQUEST.search(line):
+        return None
+    m = _LOGGED_QUERY.search(line)
+    return m.group("query") if m else None
+
+
+def queries_from_metrics(path: str) -> Counter:
+    """Sum the "queries" top-N tables of every process's metrics snapshot for METRICS_PATH `path`."""
+    counts: Counter = Counter()
+    for snapshot in read_snapshots(path):
+        for query, count in (snapshot.get("top") or {}).get("queries", []):
+            counts[query] += int(count)
+    return counts
+
+
+def queries_from_file(path: str) -> Counter:
+    """
+    Curated queries: a JSON list of strings or {"query", "count"} objects, or a
+    text file with one query per line (blank lines and # comments ignored).
+    Earlier entries rank higher when no counts are given.
+    """
+    counts: Counter = Counter()
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".json"):
+            entries = json.load(f)
+        else:
+            entries = [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+    for rank, entry in enumerate(entries):
+        if isinstance(entry, dict):
+            counts[entry["query"]] += int(entry.get("count", 1))
+        else:
+            counts[entry] += len(entries) - rank
+    return counts
+
+
+def load_query_counts(source: str, metrics_path: str) -> Counter:
+    """`source` is "log" (recorded user traffic, from the metrics snapshots) or the path of a curated file."""
+    if source == "log":
+        return queries_from_metrics(metrics_path)
+    return queries_from_file(source)
+
+
+class CacheWarmer:
+    """Replays popular queries through an AsyncHybridChat in the background."""
+
+    def __init__(
+        self,
+        chat,
+        source: str,
+        metrics_path: str = "logs/metrics.json",
+        limit: int = 50,
+        concurrency: int = 2,
+        full_answers: bool = False,
+        top_k: int = 5,
+        interval: float = 0,
+    ):
+        self.chat = chat
+        self.source = source
+        self.metrics_path = metrics_path
+        self.limit = limit
+        self.concurrency = max(1, concurrency)
+        self.full_answers = full_answers
+        self.top_k = top_k
+        self.interval = interval
+        self._future = None
+        self._status: Dict = {"state": "idle", "runs": 0}
+
+    # --------------------- LIFECYCLE ---------------------
+    def start(self):
+        """Schedule warm-up on the chat's loop and return immediately."""
+        if self._future is None or self._future.done():
+            self._future = self.chat.loop.submit(self._run())
+        return self._future
+
+    def stop(self):
+        if self._future is not None:
+            self._future.cancel()
+            self._future = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.warm_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception("Cache warm-up failed.")
+                self._status.update(state="failed", error=str(e))
+            if self.interval <= 0:
+                return
+            await asyncio.sleep(self.interval)
+
+    # --------------------- WARM-UP ---------------------
+    def select(self, counts: Counter) -> List[Tuple[str, int]]:
+        return counts.most_common(self.limit)
+
+    def _budget_allows(self) -> bool:
+        budget = getattr(self.chat, "budget", None)
+        return budget is None or budget.mode() == NORMAL
+
+    async def warm_once(self) -> Dict:
+        if not self._budget_allows():
+            self._status.update(state="skipped", reason=f"token budget in {self.chat.budget.mode()} mode")
+            logger.info(f"[WARMUP] Skipped: {self._status['reason']}.")
+            return self.status()
+        counts = await asyncio.to_thread(load_query_counts, self.source, self.metrics_path)
+        selected = self.select(counts)
+        total = sum(counts.values())
+        started = time.monotonic()
+        outcomes: Counter = Counter()
+        warmed_traffic = 0
+        self._status.update(
+            state="running", planned=len(selected), done=0, failed=0,
+            started_at=time.time(), error=None, reason=None,
+        )
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def warm(query: str, count: int):
+            nonlocal warmed_traffic
+            async with semaphore:
+                if not self._budget_allows():
+                    # The budget left normal mode during this run
+                    outcomes["skipped_budget"] += 1
+                    return
+                try:
+                    # Real users keep their place ahead of warm-up in the OpenAI queue
+                    with priority_scope(Priority.BACKGROUND), request_context(warmup=True):
+                        outcome = await self.chat.warm_query_async(query, self.top_k, self.full_answers)
+                    outcomes[outcome] += 1
+                    warmed_traffic += count
+                    self._status["done"] += 1
+                    metrics.inc("warmup.done")
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning(f"[WARMUP] Could not warm '{query[:50]}': {e}")
+                    self._status["failed"] += 1
+                    metrics.inc("warmup.failed")
+
+        await asyncio.gather(*(warm(q, c) for q, c in selected))
+
+        planned = len(selected)
+        self._status.update(
+            state="done",
+            runs=self._status["runs"] + 1,
+            seconds=round(time.monotonic() - started, 2),
+            outcomes=dict(outcomes),
+            coverage=round(self._status["done"] / planned, 4) if planned else 1.0,
+            traffic_coverage=round(warmed_traffic / total, 4) if total else 0.0,
+        )
+        logger.info(
+            f"[WARMUP] Warmed {self._status['done']}/{planned} queries from {self.source} "
+            f"({self._status['traffic_coverage']:.0%} of recorded traffic) in {self._status['seconds']}s: "
+            f"{dict(outcomes)}"
+        )
+        return self.status()
+
+    def status(self) -> Dict:
+        """Progress of the current or last run: planned/done/failed, coverage and outcomes."""
+        status = dict(self._status)
+        planned = status.get("planned") or 0
+        if status["state"] == "running":
+            status["coverage"] = round(status["done"] / planned, 4) if planned else 0.0
+        return status
+
+    def coverage(self) -> Optional[float]:
+        return self.status().get("coverage")
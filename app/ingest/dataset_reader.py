@@ -0,0 +1,154 @@
+"""
+Streaming reader for the travel dataset.
+
+Yields validated nodes one at a time from either a top-level JSON array or a
+JSONL file, so ingest memory stays flat regardless of the dataset size.
+"""
+
+import json
+import logging
+import re
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List
+
+from app.exceptions import DatasetError
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1 << 16
+
+# Relation names are interpolated into Cypher as relationship types, so keep them to identifiers
+_RELATION = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+# JSON whitespace (str.isspace() also accepts characters json.load rejects)
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def validate_node(node, position: str) -> Dict:
+    """Check the fields the ingest scripts rely on; raise DatasetError on the first problem."""
+    if not isinstance(node, dict):
+        raise DatasetError(f"{position}: expected an object, got {type(node).__name__}")
+    for field in ("id", "type", "name"):
+        value = node.get(field)
+        if not isinstance(value, str) or not value.strip():
+            raise DatasetError(f"{position}: missing or empty '{field}'")
+    if not _RELATION.match(node["type"]):
+        raise DatasetError(f"{position}: type {node['type']!r} is not a valid label")
+    if "tags" in node and not isinstance(node["tags"], list):
+        raise DatasetError(f"{position} ({node['id']}): 'tags' must be a list")
+    connections = node.get("connections", [])
+    if not isinstance(connections, list):
+        raise DatasetError(f"{position} ({node['id']}): 'connections' must be a list")
+    for conn in connections:
+        if not isinstance(conn, dict) or not isinstance(conn.get("target"), str):
+            raise DatasetError(f"{position} ({node['id']}): each connection needs a string 'target'")
+        if not _RELATION.match(conn.get("relation", "RELATED_TO")):
+            raise DatasetError(f"{position} ({node['id']}): invalid relation {conn.get('relation')!r}")
+    return node
+
+
+def _number_cut(obj, following: str) -> bool:
+    """Whether a decoded number may continue past where the buffer was cut."""
+    return isinstance(obj, (int, float)) and not isinstance(obj, bool) and following in "0123456789.eE+-"
+
+
+def _iter_json_array(f) -> Iterator:
+    """
+    Incrementally decode the elements of a top-level JSON array. Accepts exactly
+    what json.load accepts: one comma between elements, no trailing comma and
+    nothing but whitespace after the closing bracket.
+    """
+    decoder = json.JSONDecoder()
+    buf = f.read(CHUNK_SIZE)
+    eof = not buf
+    pos = 0
+    expect = "["  # then "first" (value or "]"), "value" (after a comma), "sep" ("," or "]")
+    while True:
+        pos = _WHITESPACE.match(buf, pos).end()
+        if pos >= len(buf):
+            if eof:
+                raise DatasetError("Expected a JSON array" if expect == "[" else "Truncated JSON array")
+            chunk = f.read(CHUNK_SIZE)
+            eof = not chunk
+            buf, pos = buf[pos:] + chunk, 0
+            continue
+        ch = buf[pos]
+        if expect == "[":
+            if ch != "[":
+                raise DatasetError("Expected a JSON array")
+            pos, expect = pos + 1, "first"
+            continue
+        if expect == "sep" or (expect == "first" and ch == "]"):
+            if ch == "]":
+                pos += 1
+                break
+            if ch != "," or expect == "first":
+                raise DatasetError(f"Malformed JSON array: expected ',' or ']' but found {ch!r}")
+            pos, expect = pos + 1, "value"
+            continue
+        try:
+            obj, end = decoder.raw_decode(buf, pos)
+            complete = eof or (end < len(buf) and not _number_cut(obj, buf[end]))
+        except json.JSONDecodeError:
+            complete = False
+        # Element incomplete (or a number cut at the buffer edge, "2." + "5e3"): read more input
+        if not complete:
+            if eof:
+                raise DatasetError("Malformed or truncated JSON array")
+            chunk = f.read(CHUNK_SIZE)
+            eof = not chunk
+            buf, pos = buf[pos:] + chunk, 0
+            continue
+        yield obj
+        pos, expect = end, "sep"
+
+    # Trailing input is checked chunk by chunk, like the array itself
+    rest = buf[pos:]
+    while True:
+        if not _WHITESPACE.fullmatch(rest):
+            raise DatasetError("Unexpected data after the JSON array")
+        rest = f.read(CHUNK_SIZE)
+        if not rest:
+            break
+
+
+def _iter_jsonl(f) -> Iterator:
+    for lineno, line in enumerate(f, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise DatasetError(f"line {lineno}: invalid JSON ({e})")
+
+
+def iter_nodes(path: str, strict: bool = True) -> Iterator[Dict]:
+    """
+    Yield validated nodes from a JSON array or JSONL file.
+    With strict=False invalid nodes are logged and skipped instead of aborting the load.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        head = f.read(CHUNK_SIZE).lstrip()
+        f.seek(0)
+        records = _iter_json_array(f) if head.startswith("[") else _iter_jsonl(f)
+        skipped = 0
+        for i, record in enumerate(records):
+            try:
+                yield validate_node(record, f"{path}[{i}]")
+            except DatasetError as e:
+                if strict:
+                    raise
+                skipped += 1
+                logger.warning(f"Skipping invalid node: {e}")
+        if skipped:
+            logger.warning(f"Skipped {skipped} invalid nodes in {path}.")
+
+
+def iter_batches(items: Iterable, size: int) -> Iterator[List]:
+    """Group any iterable into lists of at most `size` items without materializing it."""
+    it = iter(items)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
@@ -0,0 +1,154 @@
+"""
+Ingest manifest: content hashes from the last successful load into one store.
+
+Each ingest script keeps its own manifest. Comparing the dataset against it
+tells the script which nodes are new, changed or removed, and which nodes'
+connection lists changed, so a refresh only touches what actually moved.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+
+def _digest(obj) -> str:
+    raw = json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def node_hash(node: Dict) -> str:
+    """Hash of a node's own properties (everything except its connections)."""
+    return _digest({k: v for k, v in node.items() if k != "connections"})
+
+
+def connections_hash(node: Dict) -> str:
+    """Hash of a node's outgoing connection list, independent of list order."""
+    conns = sorted(
+        (c.get("relation", "RELATED_TO"), c.get("target") or "") for c in node.get("connections", [])
+    )
+    return _digest(conns)
+
+
+class IngestDiff:
+    """What changed between the manifest and the dataset being loaded."""
+
+    def __init__(self):
+        self.added: List[str] = []
+        self.changed: List[str] = []
+        self.removed: List[str] = []
+        self.relinked: List[str] = []
+        self.unchanged = 0
+
+    def changed_ids(self) -> List[str]:
+        """Every id whose cached answers may now be stale."""
+        return sorted(set(self.added) | set(self.changed) | set(self.removed) | set(self.relinked))
+
+    def summary(self) -> str:
+        return (
+            f"{len(self.added)} new, {len(self.changed)} changed, {len(self.removed)} removed, "
+            f"{len(self.relinked)} with changed connections, {self.unchanged} unchanged"
+        )
+
+    def write_report(self, path: str):
+        """Write the changed ids so downstream caches can invalidate them."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        report = {
+            "added": self.added,
+            "changed": self.changed,
+            "removed": self.removed,
+            "relinked": self.relinked,
+            "changed_ids": self.changed_ids(),
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+class IngestManifest:
+    """
+    Per-store record of node and connection-list hashes.
+
+    Call inspect() for every node in the dataset, apply the changes to the store,
+    record() each node once it is written, then save(). Nodes never inspected are
+    reported by removed_ids().
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.nodes: Dict[str, str] = {}
+        self.edges: Dict[str, str] = {}
+        self.diff = IngestDiff()
+        self._seen: set = set()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            logger.info(f"No ingest manifest at {self.path}; every node will be loaded.")
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != MANIFEST_VERSION:
+            logger.warning(f"Ingest manifest {self.path} has an old format; doing a full load.")
+            return
+        self.nodes = data.get("nodes", {})
+        self.edges = data.get("edges", {})
+
+    def reset(self):
+        """Forget previous loads so the next run processes every node."""
+        self.nodes.clear()
+        self.edges.clear()
+
+    def inspect(self, node: Dict) -> Tuple[str, bool]:
+        """
+        Compare a dataset node with the manifest.
+        Returns ("new" | "changed" | "unchanged", connections_changed).
+        """
+        nid = node["id"]
+        self._seen.add(nid)
+        previous = self.nodes.get(nid)
+        if previous is None:
+            status = "new"
+            self.diff.added.append(nid)
+        elif previous != node_hash(node):
+            status = "changed"
+            self.diff.changed.append(nid)
+        else:
+            status = "unchanged"
+            self.diff.unchanged += 1
+
+        edges_changed = self.edges.get(nid) != connections_hash(node)
+        if edges_changed and status != "new":
+            self.diff.relinked.append(nid)
+        return status, edges_changed
+
+    def removed_ids(self) -> List[str]:
+        """Ids recorded by a previous load that were not seen in this one."""
+        removed = sorted(nid for nid in self.nodes if nid not in self._seen)
+        self.diff.removed = removed
+        return removed
+
+    def record(self, node: Dict, connections: bool = True):
+        """Mark a node as written; pass connections=False if its edges are written separately."""
+        self.nodes[node["id"]] = node_hash(node)
+        if connections:
+            self.record_connections(node)
+
+    def record_connections(self, node: Dict):
+        self.edges[node["id"]] = connections_hash(node)
+
+    def forget(self, node_id: str):
+        self.nodes.pop(node_id, None)
+        self.edges.pop(node_id, None)
+
+    def save(self):
+        """Write the manifest atomically so an interrupted run never leaves it half-written."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "nodes": self.nodes, "edges": self.edges}, f)
+        os.replace(tmp, self.path)
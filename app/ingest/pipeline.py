@@ -0,0 +1,206 @@
+"""
+Pipelined ingest engine: concurrent embedding workers and concurrent upsert
+workers connected by bounded queues.
+
+Throttling belongs to embed_fn: LLMClient admits every embedding request
+through its process-wide scheduler at BATCH priority and backs off there on
+429s. A RateLimiter is only needed for an embed_fn that bypasses the scheduler.
+
+    batches --> [embed queue] --> embed workers --> [upsert queue] --> upsert workers --> on_batch_done
+
+The bounded queues keep memory flat: a slow stage makes the producer wait
+instead of piling up batches.
+"""
+
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Iterable, List, Optional, Sequence
+
+from app.utils.rate_limiter import RateLimiter, is_rate_limited, retry_after_seconds
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+def estimate_tokens(texts: Sequence[str]) -> int:
+    """Rough OpenAI token estimate (~4 characters per token)."""
+    return sum(len(t) for t in texts) // 4 + len(texts)
+
+
+class IngestStats:
+    """Progress and throughput counters, updated by the pipeline as batches complete."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.batches = 0
+        self.items = 0
+        self.tokens = 0
+        self.retries = 0
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def summary(self) -> str:
+        elapsed = max(self.elapsed, 1e-9)
+        return (
+            f"{self.items} items in {self.batches} batches, {elapsed:.1f}s "
+            f"({self.items / elapsed:.1f} items/s, {self.tokens / elapsed * 60:.0f} tokens/min, "
+            f"{self.retries} rate-limit retries)"
+        )
+
+
+class IngestPipeline:
+    """
+    Run `embed_fn(texts) -> vectors` and `upsert_fn(batch, vectors)` concurrently.
+
+    Each batch is a list of items; `text_of(item)` gives the text to embed.
+    `on_batch_done(batch, vectors)` runs under a lock once a batch is stored, which
+    is where callers record progress and write checkpoints. A rate-limited batch is
+    retried up to `max_retries` times; `limiter`, if given, throttles and backs off
+    locally, otherwise the wait happens in embed_fn's own scheduler.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[List[str]], List[List[float]]],
+        upsert_fn: Optional[Callable[[List, List[List[float]]], None]],
+        text_of: Callable,
+        limiter: Optional[RateLimiter] = None,
+        embed_workers: int = 4,
+        upsert_workers: int = 2,
+        queue_size: int = 8,
+        max_retries: int = 8,
+        on_batch_done: Optional[Callable[[List, List[List[float]]], None]] = None,
+    ):
+        self.embed_fn = embed_fn
+        self.upsert_fn = upsert_fn
+        self.text_of = text_of
+        self.limiter = limiter
+        self.embed_workers = embed_workers
+        self.upsert_workers = upsert_workers
+        self.max_retries = max_retries
+        self.on_batch_done = on_batch_done
+        self.stats = IngestStats()
+        self._embed_q: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._upsert_q: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._done_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+
+    # --------------------- QUEUES ---------------------
+    def _put(self, q: queue.Queue, item) -> bool:
+        """Put without blocking forever, so a failed stage cannot deadlock the others."""
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: queue.Queue):
+        """Get the next item, or _DONE once the pipeline has been stopped."""
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.5)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _fail(self, exc: BaseException):
+        if self._error is None:
+            self._error = exc
+        self._stop.set()
+
+    # --------------------- STAGES ---------------------
+    def _embed_with_backoff(self, texts: List[str]) -> List[List[float]]:
+        tokens = estimate_tokens(texts)
+        for attempt in range(1, self.max_retries + 1):
+            if self.limiter is not None:
+                self.limiter.acquire(tokens)
+            try:
+                vectors = self.embed_fn(texts)
+                if self.limiter is not None:
+                    self.limiter.on_success()
+                return vectors
+            except Exception as e:
+                if not is_rate_limited(e) or attempt == self.max_retries:
+                    raise
+                logger.warning(f"[INGEST] Rate limited (attempt {attempt}/{self.max_retries}); backing off.")
+                with self._done_lock:
+                    self.stats.retries += 1
+                if self.limiter is not None:
+                    self.limiter.on_rate_limited(retry_after_seconds(e))
+        raise RuntimeError("unreachable")
+
+    def _embed_worker(self):
+        try:
+            while True:
+                batch = self._get(self._embed_q)
+                if batch is _DONE:
+                    return
+                texts = [self.text_of(item) for item in batch]
+                vectors = self._embed_with_backoff(texts)
+                if not self._put(self._upsert_q, (batch, vectors, estimate_tokens(texts))):
+                    return
+        except BaseException as e:
+            logger.exception("[INGEST] Embedding worker failed.")
+            self._fail(e)
+
+    def _upsert_worker(self):
+        try:
+            while True:
+                work = self._get(self._upsert_q)
+                if work is _DONE:
+                    return
+                batch, vectors, tokens = work
+                if self.upsert_fn is not None:
+                    self.upsert_fn(batch, vectors)
+                with self._done_lock:
+                    if self.on_batch_done is not None:
+                        self.on_batch_done(batch, vectors)
+                    self.stats.batches += 1
+                    self.stats.items += len(batch)
+                    self.stats.tokens += tokens
+        except BaseException as e:
+            logger.exception("[INGEST] Upsert worker failed.")
+            self._fail(e)
+
+    # --------------------- RUN ---------------------
+    def run(self, batches: Iterable[List]) -> IngestStats:
+        """Feed `batches` through the pipeline; re-raises the first worker error."""
+        embedders = [
+            threading.Thread(target=self._embed_worker, name=f"ingest-embed-{i}", daemon=True)
+            for i in range(self.embed_workers)
+        ]
+        upserters = [
+            threading.Thread(target=self._upsert_worker, name=f"ingest-upsert-{i}", daemon=True)
+            for i in range(self.upsert_workers)
+        ]
+        for t in embedders + upserters:
+            t.start()
+
+        try:
+            for batch in batches:
+                if not self._put(self._embed_q, batch):
+                    break
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            for _ in embedders:
+                self._put(self._embed_q, _DONE)
+            for t in embedders:
+                t.join()
+            for _ in upserters:
+                self._put(self._upsert_q, _DONE)
+            for t in upserters:
+                t.join()
+
+        if self._error is not None:
+            raise self._error
+        logger.info(f"[INGEST] {self.stats.summary()}")
+        return self.stats
@@ -1,15 +1,24 @@
 """
 app/llm/llm_client.py
 Handles all OpenAI API interactions: embeddings + chat completions.
-Includes retry, timeout, and unified error handling.
+Includes retry, timeout, and unified error handling. Every request is admitted
+through a process-wide RequestScheduler (RPM/TPM budgets, priority queue).
 """
 
 import logging
+import threading
 import time
+from collections import OrderedDict
 from typing import List, Dict, Optional
-from openai import OpenAI, APIError, RateLimitError, APITimeoutError
+from openai import APIError, RateLimitError, APITimeoutError
+from app import resources
 from app.config_loader import Config
 from app.exceptions import LLMError
+from app.replay import cassette
+from app.llm.scheduler import Priority, RequestScheduler, current_priority, estimate_message_tokens
+from app.llm.usage import record_usage
+from app.utils.metrics import metrics
+from app.utils.rate_limiter import retry_after_seconds
 
 logger = logging.getLogger(__name__)
 
@@ -17,73 +26,187 @@ logger = logging.getLogger(__name__)
 class LLMClient:
     """
     Wrapper around OpenAI client for embeddings and chat completions.
-    Provides unified error handling, retries, and logging.
+    Provides unified error handling, retries, logging and rate-budget scheduling.
     """
 
     def __init__(self):
+        # Chat and embedding models have separate limits on the OpenAI side
+        self.schedulers = {
+            "chat": RequestScheduler("chat", Config.OPENAI_CHAT_RPM, Config.OPENAI_CHAT_TPM),
+            "embedding": RequestScheduler("embedding", Config.OPENAI_EMBED_RPM, Config.OPENAI_EMBED_TPM),
+        }
+        for name, sched in self.schedulers.items():
+            metrics.set_gauge(f"openai.{name}.queue_depth", lambda s=sched: s.queue_depth)
+            metrics.set_gauge(f"openai.{name}.effective_scale", lambda s=sched: s.limiter.scale)
+        # Recent query embeddings: retrieval and fact ranking embed the same query text
+        self._embeddings: "OrderedDict[tuple, List[float]]" = OrderedDict()
+        self._embeddings_lock = threading.Lock()
+        logger.info("✅ LLMClient initialized successfully.")
+
+    @property
+    def client(self):
+        """OpenAI client, created on first request rather than at import time."""
         try:
-            self.client = OpenAI(api_key=Config.OPENAI_API_KEY)
-            logger.info("✅ LLMClient initialized successfully.")
+            return resources.openai_client()
         except Exception as e:
             logger.exception("Failed to initialize OpenAI client.")
             raise LLMError(f"OpenAI initialization failed: {e}")
 
-    def _retry_request(self, func, max_retries: int = 3, delay: int = 3):
-        """Generic retry wrapper for API calls."""
+    def _retry_request(
+        self,
+        func,
+        max_retries: int = 3,
+        delay: int = 3,
+        scheduler: Optional[RequestScheduler] = None,
+        tokens: int = 0,
+        priority: Priority = Priority.INTERACTIVE,
+    ):
+        """Generic retry wrapper for API calls, admitting each attempt through `scheduler`."""
+        last_error = None
         for attempt in range(1, max_retries + 1):
             try:
-                return func()
-            except (RateLimitError, APITimeoutError) as e:
+                if scheduler is not None:
+                    scheduler.acquire(tokens, priority)
+                with metrics.timer(f"openai.{scheduler.name if scheduler else 'call'}"):
+                    result = func()
+                if scheduler is not None:
+                    scheduler.on_success()
+                return result
+            except RateLimitError as e:
+                last_error = e
+                metrics.inc("openai.rate_limited")
+                if scheduler is not None:
+                    scheduler.on_rate_limited(retry_after_seconds(e))
+                # The scheduler now pauses every caller, so the next attempt waits in its queue
+                logger.warning(f"[Retry {attempt}/{max_retries}] OpenAI rate limit: {e}")
+            except APITimeoutError as e:
+                last_error = e
                 logger.warning(f"[Retry {attempt}/{max_retries}] OpenAI API issue: {e}")
+                metrics.inc("openai.retries")
                 time.sleep(delay * attempt)  # Exponential backoff
             except APIError as e:
+                last_error = e
                 logger.warning(f"[Retry {attempt}/{max_retries}] Transient APIError: {e}")
+                metrics.inc("openai.retries")
                 time.sleep(delay * attempt)
             except Exception as e:
                 logger.exception("Unexpected LLM call failure.")
                 raise LLMError(f"Unexpected LLM error: {e}")
-        raise LLMError("Max retries reached for OpenAI request.")
+        # Chain the last error so callers can tell a 429 apart from other failures
+        raise LLMError("Max retries reached for OpenAI request.") from last_error
+
+    @staticmethod
+    def _record_usage(kind: str, model: str, response):
+        """Count the tokens OpenAI reports for a response, with their estimated cost and budget charge."""
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+        if kind == "chat":
+            record_usage(
+                kind, model,
+                getattr(usage, "prompt_tokens", 0) or 0,
+                getattr(usage, "completion_tokens", 0) or 0,
+            )
+        else:
+            record_usage(kind, model, getattr(usage, "total_tokens", 0) or 0)
 
     def embed_text(
         self,
         text: str,
         model: str = "text-embedding-3-small",
-        timeout: Optional[int] = 30
+        timeout: Optional[int] = 30,
+        priority: Optional[Priority] = None
     ) -> List[float]:
-        """Return embedding vector for the given text."""
+        """Return embedding vector for the given text (recent texts are served from memory)."""
+        priority = current_priority() if priority is None else priority
+        key = (model, text)
+        with self._embeddings_lock:
+            if key in self._embeddings:
+                self._embeddings.move_to_end(key)
+                metrics.inc("embedding_cache.hit")
+                return self._embeddings[key]
         try:
+            # Only the SDK call goes through the cassette: scheduler waits are local and are
+            # not part of the recorded latency
             def _embed_call():
-                return self.client.embeddings.create(model=model, input=[text], timeout=timeout)
+                resp = self.client.embeddings.create(model=model, input=[text], timeout=timeout)
+                self._record_usage("embedding", model, resp)
+                return resp.data[0].embedding
 
-            resp = self._retry_request(_embed_call)
-            embedding = resp.data[0].embedding
+            request = {"model": model, "input": [text]}
+            embedding = self._retry_request(
+                lambda: cassette.through("embedding", request, _embed_call),
+                scheduler=self.schedulers["embedding"],
+                tokens=len(text) // 4 + 1,
+                priority=priority,
+            )
             logger.debug(f"Generated embedding (len={len(embedding)}).")
+            with self._embeddings_lock:
+                self._embeddings[key] = embedding
+                while len(self._embeddings) > Config.EMBED_CACHE_SIZE:
+                    self._embeddings.popitem(last=False)
             return embedding
         except Exception as e:
             logger.exception("Embedding generation failed.")
             raise LLMError(f"Embedding failed: {e}")
 
+    def embed_texts(
+        self,
+        texts: List[str],
+        model: str = "text-embedding-3-small",
+        timeout: Optional[int] = 60,
+        priority: Priority = Priority.BATCH
+    ) -> List[List[float]]:
+        """Return embedding vectors for a batch of texts in a single request."""
+        try:
+            def _embed_call():
+                resp = self.client.embeddings.create(model=model, input=texts, timeout=timeout)
+                self._record_usage("embedding", model, resp)
+                return [d.embedding for d in sorted(resp.data, key=lambda d: d.index)]
+
+            request = {"model": model, "input": list(texts)}
+            embeddings = self._retry_request(
+                lambda: cassette.through("embedding", request, _embed_call),
+                scheduler=self.schedulers["embedding"],
+                tokens=sum(len(t) for t in texts) // 4 + len(texts),
+                priority=priority,
+            )
+            logger.debug(f"Generated {len(embeddings)} embeddings.")
+            return embeddings
+        except Exception as e:
+            logger.exception("Batch embedding generation failed.")
+            raise LLMError(f"Batch embedding failed: {e}") from e
+
     def chat_completion(
         self,
         messages: List[Dict[str, str]],
         model: str = "gpt-4o-mini",
         temperature: float = 0.3,
         max_tokens: int = 2000,
-        timeout: Optional[int] = 60
+        timeout: Optional[int] = 60,
+        priority: Optional[Priority] = None
     ) -> str:
-        """Return chat completion output from OpenAI."""
+        """Return chat completion output from OpenAI (at the current priority unless given)."""
+        priority = current_priority() if priority is None else priority
         try:
             def _chat_call():
-                return self.client.chat.completions.create(
+                response = self.client.chat.completions.create(
                     model=model,
                     messages=messages,
                     temperature=temperature,
                     max_tokens=max_tokens,
                     timeout=timeout
                 )
+                self._record_usage("chat", model, response)
+                return response.choices[0].message.content
 
-            response = self._retry_request(_chat_call)
-            content = response.choices[0].message.content
+            request = {"model": model, "messages": messages, "temperature": temperature, "max_tokens": max_tokens}
+            content = self._retry_request(
+                lambda: cassette.through("chat", request, _chat_call),
+                scheduler=self.schedulers["chat"],
+                tokens=estimate_message_tokens(messages, max_tokens),
+                priority=priority,
+            )
             logger.debug(f"Received chat response (len={len(content)}).")
             return content.strip()
         except Exception as e:
@@ -98,5 +221,14 @@ llm_client = LLMClient()
 def embed_text(text: str) -> List[float]:
     return llm_client.embed_text(text)
 
-def chat_completion(messages: List[Dict[str, str]]) -> str:
-    return llm_client.chat_completion(messages)
+def embed_texts(texts: List[str], priority: Priority = Priority.BATCH) -> List[List[float]]:
+    return llm_client.embed_texts(texts, priority=priority)
+
+def chat_completion(
+    messages: List[Dict[str, str]], priority: Optional[Priority] = None, max_tokens: int = 2000
+) -> str:
+    return llm_client.chat_completion(messages, max_tokens=max_tokens, priority=priority)
+
+def scheduler_stats() -> Dict[str, Dict]:
+    """Queue depth, wait times and budget state of the shared OpenAI schedulers."""
+    return {name: sched.stats() for name, sched in llm_client.schedulers.items()}
@@ -63,7 +63,7 @@ Enhanced PromptBuilder with advanced reasoning and context structuring.
 """
 
 import logging
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -76,9 +76,16 @@ class PromptBuilder:
     def __init__(self):
         logger.info("Enhanced PromptBuilder initialized.")
 
-    def build_prompt(self, query: str, matches: List[Dict], graph_facts: List[Dict]) -> List[Dict]:
+    def build_prompt(
+        self,
+        query: str,
+        matches: List[Dict],
+        graph_facts: List[Dict],
+        history: Optional[str] = None,
+    ) -> List[Dict]:
         """
         Construct an enhanced structured chat prompt with better context organization.
+        `history` is an optional rolling summary of earlier turns in the conversation.
         Returns a list of messages suitable for OpenAI Chat API.
         """
         try:
@@ -96,6 +103,8 @@ class PromptBuilder:
             
             # Enhanced user prompt with structured thinking
             user_prompt = self._build_user_prompt(query, semantic_context, graph_context)
+            if history:
+                user_prompt = f"**Conversation so far:**\n{history}\n\n{user_prompt}"
 
             messages = [
                 {"role": "system", "content": system_prompt},
@@ -154,7 +163,7 @@ class PromptBuilder:
         if not graph_facts:
             return "No graph relationships found."
         
-        # Group by source
+        # Group by source, keeping the given order (facts arrive ranked and capped by FactRanker)
         relationships_by_source = {}
         for fact in graph_facts:
             source = fact.get("source", "Unknown")
@@ -165,9 +174,9 @@ class PromptBuilder:
         sections = []
         sections.append("**Connected Destinations & Features:**")
         
-        for source, facts in list(relationships_by_source.items())[:5]:  # Top 5 sources
+        for source, facts in relationships_by_source.items():
             rel_list = []
-            for fact in facts[:3]:  # Top 3 relationships per source
+            for fact in facts:
                 rel_type = fact.get("rel", "related_to")
                 target = fact.get("target_name", "Unknown")
                 rel_list.append(f"{target} ({rel_type})")
@@ -0,0 +1,139 @@
+"""
+app/llm/scheduler.py
+Process-wide flow control in front of OpenAI calls.
+
+Every request waits for RPM/TPM budget (using estimated prompt tokens) in a
+priority queue, so interactive chat goes ahead of batch work and bursts queue
+up locally instead of being thrown back with RateLimitError.
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Dict, List, Optional
+
+from app.utils.rate_limiter import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """Lower value is served first."""
+    INTERACTIVE = 0
+    BACKGROUND = 5
+    BATCH = 10
+
+
+# Priority for requests that don't pass one explicitly (set around background work)
+_priority: ContextVar[Optional[Priority]] = ContextVar("request_priority", default=None)
+
+
+@contextmanager
+def priority_scope(priority: Priority):
+    """Run the enclosed calls (and threads started with asyncio.to_thread) at `priority`."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority(default: Priority = Priority.INTERACTIVE) -> Priority:
+    value = _priority.get()
+    return default if value is None else value
+
+
+def estimate_message_tokens(messages: List[Dict[str, str]], max_tokens: int = 0) -> int:
+    """
+    Rough token estimate for a chat request (~4 characters per token).
+    OpenAI counts the requested max_tokens against the TPM budget, so include it.
+    """
+    chars = sum(len(m.get("content") or "") for m in messages)
+    return chars // 4 + 4 * len(messages) + max_tokens
+
+
+class RequestScheduler:
+    """Priority-ordered admission of requests against a shared RateLimiter."""
+
+    def __init__(self, name: str, rpm: float, tpm: float):
+        self.name = name
+        self.limiter = RateLimiter(rpm=rpm, tpm=tpm)
+        self._cond = threading.Condition()
+        self._heap: list = []
+        self._seq = itertools.count()
+        self.admitted = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.waiting_by_priority: Dict[str, int] = {p.name: 0 for p in Priority}
+
+    def acquire(self, tokens: int, priority: Priority = Priority.INTERACTIVE,
+                timeout: Optional[float] = None) -> float:
+        """
+        Block until this request is at the head of the queue and fits the budget.
+        Returns the seconds spent waiting.
+        """
+        start = time.monotonic()
+        ticket = (int(priority), next(self._seq))
+        with self._cond:
+            heapq.heappush(self._heap, ticket)
+            self.waiting_by_priority[Priority(priority).name] += 1
+            admitted = False
+            try:
+                while True:
+                    wait = 0.25
+                    if self._heap[0] == ticket:
+                        wait = self.limiter.try_acquire(tokens)
+                        if wait <= 0:
+                            heapq.heappop(self._heap)
+                            admitted = True
+                            break
+                    if timeout is not None and time.monotonic() - start > timeout:
+                        raise TimeoutError(f"{self.name} request waited more than {timeout}s for rate budget")
+                    self._cond.wait(timeout=min(wait, 1.0))
+            finally:
+                if not admitted:
+                    # Leave the queue so the requests behind this one are not blocked
+                    self._heap.remove(ticket)
+                    heapq.heapify(self._heap)
+                self.waiting_by_priority[Priority(priority).name] -= 1
+                self._cond.notify_all()
+
+            waited = time.monotonic() - start
+            self.admitted += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+        if waited > 1.0:
+            logger.info(f"[SCHED] {self.name} {Priority(priority).name} request waited {waited:.2f}s for budget.")
+        return waited
+
+    def configure(self, rpm: float, tpm: float):
+        """Replace the RPM/TPM budget (e.g. an ingest run's own limits); back-off state starts over."""
+        with self._cond:
+            self.limiter = RateLimiter(rpm=rpm, tpm=tpm)
+            self._cond.notify_all()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._heap)
+
+    def on_rate_limited(self, retry_after: Optional[float] = None):
+        self.limiter.on_rate_limited(retry_after)
+
+    def on_success(self):
+        self.limiter.on_success()
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                "queue_depth": self.queue_depth,
+                "waiting": dict(self.waiting_by_priority),
+                "admitted": self.admitted,
+                "avg_wait_s": round(self.total_wait / self.admitted, 4) if self.admitted else 0.0,
+                "max_wait_s": round(self.max_wait, 4),
+                **self.limiter.stats(),
+            }
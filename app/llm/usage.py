@@ -0,0 +1,129 @@
+"""
+app/llm/usage.py
+Token usage, cost estimates and the daily token budget.
+
+LLMClient reports the usage OpenAI returns for every embedding and chat call
+here. Token counts and estimated cost go to the shared metrics counters (and so
+to the current request's trace), and tokens are charged to the process-wide
+daily budget. Once DAILY_TOKEN_BUDGET is nearly spent the budget is in
+"economy" mode; once it is spent it is "exhausted". AsyncHybridChat degrades
+its answers accordingly.
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from app.config_loader import Config
+from app.utils.metrics import RequestTrace, current_trace, metrics
+
+logger = logging.getLogger(__name__)
+
+# USD per million tokens: (input, output)
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "text-embedding-3-small": (0.02, 0.0),
+    "text-embedding-3-large": (0.13, 0.0),
+}
+
+NORMAL = "normal"
+ECONOMY = "economy"
+EXHAUSTED = "exhausted"
+
+
+def local_day() -> str:
+    return time.strftime("%Y-%m-%d")
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int = 0) -> float:
+    """Estimated USD cost of one call (0 for models without a known price)."""
+    price_in, price_out = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * price_in + completion_tokens * price_out) / 1_000_000
+
+
+class TokenBudget:
+    """Tokens spent today by this process against a daily cap (0 = no cap); days roll over at `today()` changes."""
+
+    def __init__(self, daily_tokens: int = 0, economy_ratio: float = 0.8, today: Callable[[], str] = local_day):
+        self.daily_tokens = daily_tokens
+        self.economy_ratio = economy_ratio
+        self.today = today
+        self._lock = threading.Lock()
+        self._day = today()
+        self._used = 0
+        self._mode = NORMAL
+
+    def _roll_over(self):
+        # Called with the lock held
+        today = self.today()
+        if today != self._day:
+            self._day, self._used = today, 0
+
+    def record(self, tokens: int):
+        with self._lock:
+            self._roll_over()
+            self._used += tokens
+        self.mode()
+
+    def used_today(self) -> int:
+        with self._lock:
+            self._roll_over()
+            return self._used
+
+    def mode(self) -> str:
+        """NORMAL, ECONOMY (past economy_ratio of the cap) or EXHAUSTED (cap reached)."""
+        if self.daily_tokens <= 0:
+            return NORMAL
+        with self._lock:
+            self._roll_over()
+            used = self._used
+            if used >= self.daily_tokens:
+                mode = EXHAUSTED
+            elif used >= self.daily_tokens * self.economy_ratio:
+                mode = ECONOMY
+            else:
+                mode = NORMAL
+            changed, self._mode = mode != self._mode, mode
+        if changed:
+            logger.warning(f"[BUDGET] {used:,}/{self.daily_tokens:,} tokens used today — switching to {mode} mode.")
+        return mode
+
+    def status(self) -> Dict:
+        used = self.used_today()
+        return {
+            "daily_tokens": self.daily_tokens,
+            "used_today": used,
+            "used_ratio": round(used / self.daily_tokens, 4) if self.daily_tokens > 0 else 0.0,
+            "mode": self.mode(),
+        }
+
+
+# Shared by every chat and client in the process
+budget = TokenBudget(Config.DAILY_TOKEN_BUDGET, Config.BUDGET_ECONOMY_RATIO)
+
+
+def record_usage(kind: str, model: str, prompt_tokens: int, completion_tokens: int = 0):
+    """Count one call's tokens and cost (kind is "chat" or "embedding") and charge the daily budget."""
+    if kind == "chat":
+        metrics.inc("tokens.chat_prompt", prompt_tokens)
+        metrics.inc("tokens.chat_completion", completion_tokens)
+    else:
+        metrics.inc("tokens.embedding", prompt_tokens)
+    cost = estimate_cost(model, prompt_tokens, completion_tokens)
+    metrics.inc("cost.usd", cost)
+    metrics.inc(f"cost.{kind}_usd", cost)
+    budget.record(prompt_tokens + completion_tokens)
+
+
+def request_usage(trace: Optional[RequestTrace] = None) -> Dict:
+    """Tokens and estimated cost spent so far by the current request (zeros outside one)."""
+    trace = trace if trace is not None else current_trace()
+    counters = trace.counters if trace is not None else {}
+    return {
+        "prompt_tokens": int(counters.get("tokens.chat_prompt", 0)),
+        "completion_tokens": int(counters.get("tokens.chat_completion", 0)),
+        "embedding_tokens": int(counters.get("tokens.embedding", 0)),
+        "cost_usd": round(counters.get("cost.usd", 0.0), 6),
+    }
@@ -1,14 +1,153 @@
 # app/logger.py
+"""
+Process-wide logging setup, done once.
+
+Records are handed to a QueueHandler and written to logs/app.log and the
+console by a QueueListener thread, so request threads and the event loop
+never block on disk or terminal I/O. The file gets one JSON object per line
+with the request id; the console keeps a readable text format.
+
+Each request is sampled once when it starts (Config.LOG_SAMPLE_RATE). INFO and DEBUG
+lines of unsampled requests are dropped before they are queued. WARNING and
+above, and anything logged outside a request, are always kept.
+
+Requests the service makes on its own behalf (cache warm-up) are marked: their
+ids start with "warmup-" and their JSON lines carry "warmup": true, so readers
+of the log can tell them from user traffic.
+"""
+
+import atexit
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from app.config_loader import Config
+
+LOG_DIR = "logs"
+LOG_FILE = os.path.join(LOG_DIR, "app.log")
+
+# (request id, sampled, warmup) of the request being handled in this context
+_request: ContextVar[Optional[tuple]] = ContextVar("log_request", default=None)
+
+_configured = False
+_configure_lock = threading.Lock()
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, request_id, msg (+ warmup, exc)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created)) + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", None),
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "warmup", False):
+            entry["warmup"] = True
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class RequestContextFilter(logging.Filter):
+    """Tags records with the current request id and drops low-level lines of unsampled requests."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        current = _request.get()
+        if current is None:
+            record.request_id = None
+            record.warmup = False
+            return True
+        request_id, sampled, warmup = current
+        record.request_id = request_id
+        record.warmup = warmup
+        return sampled or record.levelno >= logging.WARNING
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Keeps exception text for the JSON formatter (the stock handler folds it into msg)."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+def configure_logging():
+    """Install the queue-based handlers on the root logger; later calls do nothing."""
+    global _configured, _listener
+    with _configure_lock:
+        if _configured:
+            return
+        level = Config.LOG_LEVEL
+        os.makedirs(LOG_DIR, exist_ok=True)
+
+        file_handler = logging.FileHandler(LOG_FILE, mode="a", encoding="utf-8")
+        if Config.LOG_FORMAT == "json":
+            file_handler.setFormatter(JsonFormatter())
+        else:
+            file_handler.setFormatter(logging.Formatter(
+                "%(asctime)s | %(levelname)s | %(name)s | %(request_id)s | %(message)s"
+            ))
+        console = logging.StreamHandler()
+        console.setFormatter(logging.Formatter("%(asctime)s | %(levelname)s | %(name)s | %(message)s"))
+
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        handler = _QueueHandler(log_queue)
+        handler.addFilter(RequestContextFilter())
+        root = logging.getLogger()
+        root.setLevel(level)
+        root.addHandler(handler)
+
+        _listener = logging.handlers.QueueListener(log_queue, file_handler, console, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+        _configured = True
+
 
 def get_logger(name: str) -> logging.Logger:
-    log_level = os.getenv("LOG_LEVEL", "INFO").upper()
-    log_format = "%(asctime)s | %(levelname)s | %(name)s | %(message)s"
-    os.makedirs("logs", exist_ok=True)
-    handlers = [
-        logging.FileHandler("logs/app.log", mode="a", encoding="utf-8"),
-        logging.StreamHandler()
-    ]
-    logging.basicConfig(level=log_level, format=log_format, handlers=handlers)
+    configure_logging()
     return logging.getLogger(name)
+
+
+# --------------------- REQUEST CONTEXT ---------------------
+def sample_rate() -> float:
+    return Config.LOG_SAMPLE_RATE
+
+
+@contextmanager
+def request_context(request_id: Optional[str] = None, warmup: bool = False):
+    """
+    Scope one request: its log lines carry `request_id`, and INFO/DEBUG lines are
+    kept only if the request was sampled. Threads started with
+    asyncio.to_thread inherit the context. `warmup` marks a cache warm-up request.
+    """
+    request_id = request_id or (("warmup-" if warmup else "") + uuid.uuid4().hex[:12])
+    token = _request.set((request_id, random.random() < sample_rate(), warmup))
+    try:
+        yield request_id
+    finally:
+        _request.reset(token)
+
+
+def current_request_id() -> Optional[str]:
+    current = _request.get()
+    return current[0] if current else None
@@ -0,0 +1,196 @@
+"""
+app/replay/cassette.py
+Record/replay of backend calls for deterministic offline runs.
+
+In "record" mode every embedding, vector query / fetch, Cypher query and chat
+completion is executed for real and captured with its measured latency. Callers
+route only the backend call itself through the cassette, not local queueing
+(the OpenAI scheduler) or retry back-off, so that wait is neither recorded nor
+replayed twice. In
+"replay" mode the same requests are answered from the cassette without
+touching the network, optionally sleeping for the recorded latency (scaled by
+CASSETTE_LATENCY_SCALE) so performance comparisons stay production-like.
+
+Cassettes are gzip-compressed JSON lines. Embedding vectors are stored as
+base64 float32 so a 1536-d vector takes ~8 KB instead of ~30 KB of JSON text.
+"""
+
+import atexit
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from app.config_loader import Config
+from app.exceptions import ReplayError
+
+logger = logging.getLogger(__name__)
+
+MODES = ("off", "record", "replay")
+FORMAT_VERSION = 1
+
+
+def request_key(kind: str, request: Dict) -> str:
+    """Stable hash of a request (dict key order does not matter)."""
+    canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(f"{kind}:{canonical}".encode("utf-8")).hexdigest()
+
+
+def vector_digest(vector) -> str:
+    """Short digest of a query vector, used in place of the vector inside request keys."""
+    return hashlib.sha1(np.asarray(vector, dtype=np.float32).tobytes()).hexdigest()
+
+
+def _encode_array(values) -> Dict:
+    arr = np.asarray(values, dtype=np.float32)
+    return {"b64": base64.b64encode(arr.tobytes()).decode("ascii"), "shape": list(arr.shape)}
+
+
+def _decode_array(payload: Dict) -> List:
+    return np.frombuffer(base64.b64decode(payload["b64"]), dtype=np.float32).reshape(payload["shape"]).tolist()
+
+
+def _encode(kind: str, response: Any) -> Any:
+    if kind == "embedding":
+        return _encode_array(response)
+    if kind == "vector_fetch":
+        return {vid: _encode_array(values) for vid, values in response.items()}
+    return response
+
+
+def _decode(kind: str, payload: Any) -> Any:
+    if kind == "embedding":
+        return _decode_array(payload)
+    if kind == "vector_fetch":
+        return {vid: _decode_array(values) for vid, values in payload.items()}
+    return payload
+
+
+class Cassette:
+    """One cassette file, in record or replay mode. Thread-safe."""
+
+    def __init__(self, path: str, mode: str, latency_scale: float = 1.0):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Cassette mode must be 'record' or 'replay', got {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self._entries: List[Dict] = []
+        self._index: Dict[str, List[Dict]] = defaultdict(list)
+        self._cursor: Dict[str, int] = defaultdict(int)
+        self.hits = 0
+        self.misses = 0
+        if mode == "replay":
+            self._load()
+        else:
+            atexit.register(self.save)
+        logger.info(f"Cassette {mode} mode: {path}")
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            raise ReplayError(f"Cassette {self.path} does not exist; record it first (CASSETTE_MODE=record)")
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            if header.get("format_version") != FORMAT_VERSION:
+                raise ReplayError(f"Unsupported cassette format in {self.path}")
+            for line in f:
+                entry = json.loads(line)
+                self._index[entry["key"]].append(entry)
+        logger.info(f"Loaded {sum(len(v) for v in self._index.values())} recorded calls from {self.path}")
+
+    def through(self, kind: str, request: Dict, call: Callable[[], Any]) -> Any:
+        """Record or replay one backend call. `call()` must return JSON-serializable data."""
+        key = request_key(kind, request)
+        if self.mode == "replay":
+            return self._replay(kind, key, request)
+
+        start = time.perf_counter()
+        response = call()
+        latency = time.perf_counter() - start
+        with self._lock:
+            self._entries.append({
+                "kind": kind,
+                "key": key,
+                "latency": round(latency, 6),
+                "response": _encode(kind, response),
+            })
+        return response
+
+    def _replay(self, kind: str, key: str, request: Dict) -> Any:
+        with self._lock:
+            recorded = self._index.get(key)
+            if not recorded:
+                self.misses += 1
+                raise ReplayError(f"No recorded {kind} call matches request {json.dumps(request, default=str)[:200]}")
+            # Repeated identical requests replay in recorded order, then keep the last answer
+            position = self._cursor[key]
+            entry = recorded[min(position, len(recorded) - 1)]
+            self._cursor[key] = position + 1
+            self.hits += 1
+        if self.latency_scale > 0:
+            time.sleep(entry["latency"] * self.latency_scale)
+        return _decode(kind, entry["response"])
+
+    def save(self):
+        if self.mode != "record":
+            return
+        with self._lock:
+            entries = list(self._entries)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            f.write(json.dumps({"format_version": FORMAT_VERSION, "recorded_at": time.time()}) + "\n")
+            for entry in entries:
+                f.write(json.dumps(entry, separators=(",", ":"), default=str) + "\n")
+        os.replace(tmp, self.path)
+        logger.info(f"Saved {len(entries)} recorded calls to {self.path}")
+
+    def stats(self) -> Dict:
+        return {"mode": self.mode, "path": self.path, "recorded": len(self._entries),
+                "hits": self.hits, "misses": self.misses}
+
+
+_cassette: Optional[Cassette] = None
+_cassette_lock = threading.Lock()
+
+
+def active_cassette() -> Optional[Cassette]:
+    """The process-wide cassette configured by CASSETTE_MODE, or None when off."""
+    global _cassette
+    if Config.CASSETTE_MODE == "off" and _cassette is None:
+        return None
+    with _cassette_lock:
+        if _cassette is None:
+            if Config.CASSETTE_MODE not in MODES:
+                raise ReplayError(f"Unknown CASSETTE_MODE {Config.CASSETTE_MODE!r}; expected one of {MODES}")
+            _cassette = Cassette(Config.CASSETTE_PATH, Config.CASSETTE_MODE, Config.CASSETTE_LATENCY_SCALE)
+        return _cassette
+
+
+def use_cassette(path: str, mode: str, latency_scale: float = 1.0) -> Cassette:
+    """Switch the process to an explicit cassette (scripts and benchmarks)."""
+    global _cassette
+    with _cassette_lock:
+        if _cassette is not None:
+            _cassette.save()
+        _cassette = Cassette(path, mode, latency_scale)
+        return _cassette
+
+
+def through(kind: str, request: Dict, call: Callable[[], Any]) -> Any:
+    """Route a backend call through the active cassette, or call it directly when off."""
+    cassette = active_cassette()
+    if cassette is None:
+        return call()
+    return cassette.through(kind, request, call)
@@ -0,0 +1,111 @@
+"""
+app/resources.py
+Process-wide registry of backend clients (OpenAI, Pinecone, Neo4j).
+
+Clients are created lazily on first use and then reused, so importing a module
+or constructing a retriever costs no network handshake. The Pinecone index
+existence check runs once per index per process. Holders of a client borrow it
+and never close it; the registry closes them all when the process exits.
+"""
+
+import atexit
+import logging
+import threading
+from typing import Dict, Set
+
+from app.config_loader import Config
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.RLock()
+_clients: Dict[str, object] = {}
+_indexes: Dict[str, object] = {}
+_known_indexes: Set[str] = set()
+
+
+# --------------------- OPENAI ---------------------
+def openai_client():
+    """
+    Shared OpenAI client (the SDK client is thread-safe and pools connections).
+    SDK retries are off: LLMClient retries through its scheduler, which sees every 429.
+    """
+    with _lock:
+        if "openai" not in _clients:
+            from openai import OpenAI
+            _clients["openai"] = OpenAI(api_key=Config.OPENAI_API_KEY, max_retries=0)
+            logger.info("OpenAI client created.")
+        return _clients["openai"]
+
+
+# --------------------- PINECONE ---------------------
+def pinecone_client():
+    with _lock:
+        if "pinecone" not in _clients:
+            from pinecone import Pinecone
+            _clients["pinecone"] = Pinecone(api_key=Config.PINECONE_API_KEY)
+            logger.info("Pinecone client created.")
+        return _clients["pinecone"]
+
+
+def ensure_pinecone_index(name: str, dimension: int):
+    """Create the index if it is missing; the list_indexes() call runs once per process."""
+    with _lock:
+        if name in _known_indexes:
+            return
+        pc = pinecone_client()
+        if name not in pc.list_indexes().names():
+            from pinecone import ServerlessSpec
+            logger.warning(f"Index {name} not found. Creating new one.")
+            pc.create_index(
+                name = name,
+                dimension = dimension,
+                metric = "cosine",
+                spec = ServerlessSpec(cloud = "aws", region = "us-east1-gcp")
+            )
+        _known_indexes.add(name)
+
+
+def pinecone_index(name: str = None, dimension: int = None):
+    """Shared handle to a Pinecone index, checked for existence on first use."""
+    name = name or Config.PINECONE_INDEX_NAME
+    with _lock:
+        if name not in _indexes:
+            ensure_pinecone_index(name, dimension or Config.PINECONE_VECTOR_DIM)
+            _indexes[name] = pinecone_client().Index(name)
+        return _indexes[name]
+
+
+# --------------------- NEO4J ---------------------
+def neo4j_driver():
+    """Shared Neo4j driver; sessions borrowed from it reuse pooled connections."""
+    with _lock:
+        if "neo4j" not in _clients:
+            from neo4j import GraphDatabase
+            _clients["neo4j"] = GraphDatabase.driver(
+                Config.NEO4J_URI,
+                auth=(Config.NEO4J_USER, Config.NEO4J_PASSWORD)
+            )
+            logger.info("Neo4j driver created.")
+        return _clients["neo4j"]
+
+
+def close_neo4j():
+    """Close the shared driver; the next neo4j_driver() call opens a new one."""
+    with _lock:
+        driver = _clients.pop("neo4j", None)
+    if driver is not None:
+        driver.close()
+        logger.info("Neo4j connection closed.")
+
+
+# --------------------- LIFECYCLE ---------------------
+def close_all():
+    """Release every shared client (used on shutdown and by tests)."""
+    close_neo4j()
+    with _lock:
+        _clients.clear()
+        _indexes.clear()
+        _known_indexes.clear()
+
+
+atexit.register(close_all)
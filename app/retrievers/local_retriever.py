@@ -0,0 +1,55 @@
+import logging
+from typing import List, Dict, Optional
+import numpy as np
+from app.config_loader import Config
+from app.exceptions import RetrievalError
+from app.llm.llm_client import embed_text
+from app.retrievers.records import MatchRecord
+from app.vectorstore.snapshot import LocalVectorStore
+
+logger = logging.getLogger(__name__)
+
+class LocalVectorRetriever:
+    """
+    Semantic retrieval from a memory-mapped local vector snapshot.
+    Drop-in replacement for PineconeRetriever.query() without the network hop.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        try:
+            self.store = LocalVectorStore(
+                path or Config.LOCAL_VECTOR_PATH,
+                rescore_factor=Config.LOCAL_VECTOR_RESCORE_FACTOR,
+                nprobe=Config.LOCAL_VECTOR_NPROBE,
+            )
+            logger.info(f"LocalVectorRetriever initialised (snapshot: {self.store.path})")
+        except Exception as e:
+            logger.exception("Failed to initialize LocalVectorRetriever")
+            raise RetrievalError(f"Error initializing LocalVectorRetriever: {e}")
+
+    def get_embedding(self, text: str) -> List[float]:
+        try:
+            return embed_text(text)
+        except Exception as e:
+            logger.exception("Error generate embedding.")
+            raise RetrievalError(f"Failed to embed text: {e}")
+
+    def node_vectors(self, node_ids: List[str]) -> Dict[str, np.ndarray]:
+        """Stored embeddings of the given nodes (missing ids are left out)."""
+        vectors = {}
+        for node_id in node_ids:
+            vec = self.store.vector(node_id)
+            if vec is not None:
+                vectors[node_id] = vec
+        return vectors
+
+    def query(self, text: str, top_k: int = Config.TOP_K, filter: Optional[Dict] = None) -> List[Dict]:
+        """Query the local snapshot for the most similar items."""
+        try:
+            vector = self.get_embedding(text)
+            matches = [MatchRecord.from_dict(m) for m in self.store.search(vector, top_k=top_k, filter=filter)]
+            logger.info(f"Local vector query returned {len(matches)} matches.")
+            return matches
+        except Exception as e:
+            logger.exception("Error during local vector query.")
+            raise RetrievalError(f"Local vector query failed: {e}")
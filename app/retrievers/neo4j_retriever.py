@@ -1,7 +1,10 @@
 import logging
-from typing import List, Dict
-from neo4j import GraphDatabase
+from contextlib import ExitStack
+from typing import List, Dict, Optional
+from app import resources
 from app.config_loader import Config
+from app.replay import cassette
+from app.retrievers.records import FactRecord, intern_node
 from app.exceptions import GraphError
 
 logger = logging.getLogger(__name__)
@@ -12,12 +15,13 @@ class Neo4jRetriever:
     """
 
     def __init__(self):
+        logger.info("Neo4jRetriever initialized successfully.")
+
+    @property
+    def driver(self):
+        """Shared driver from the resource registry, connected on first use."""
         try:
-            self.driver = GraphDatabase.driver(
-                Config.NEO4J_URI,
-                auth=(Config.NEO4J_USER, Config.NEO4J_PASSWORD)
-            )
-            logger.info("Neo4jRetriever initialized successfully.")
+            return resources.neo4j_driver()
         except Exception as e:
             logger.exception("Failed to initialize Neo4jRetriever.")
             raise GraphError(f"Error connecting to Neo4j: {e}")
@@ -32,26 +36,33 @@ class Neo4jRetriever:
             return []
 
         facts = []
+        q = (
+            "MATCH (n:Entity {id:$nid})-[r]-(m:Entity) "
+            "RETURN type(r) AS rel, labels(m) AS labels, "
+            "m.id AS id, m.name AS name, m.type AS type, "
+            "m.description AS description "
+            "LIMIT $limit"
+        )
         try:
-            with self.driver.session() as session:
+            with ExitStack() as stack:
+                session = None
+
+                def run(cypher: str, **params) -> List[Dict]:
+                    # Opened on first use only, so replayed lookups never connect
+                    nonlocal session
+                    if session is None:
+                        session = stack.enter_context(self.driver.session())
+                    return [r.data() for r in session.run(cypher, **params)]
+
                 for nid in node_ids:
-                    q = (
-                        "MATCH (n:Entity {id:$nid})-[r]-(m:Entity) "
-                        "RETURN type(r) AS rel, labels(m) AS labels, "
-                        "m.id AS id, m.name AS name, m.type AS type, "
-                        "m.description AS description "
-                        "LIMIT $limit"
+                    params = {"nid": nid, "limit": limit_per_node}
+                    results = cassette.through(
+                        "cypher", {"query": q, "params": params}, lambda: run(q, **params)
                     )
-                    results = session.run(q, nid=nid, limit=limit_per_node)
                     for r in results:
-                        facts.append({
-                            "source": nid,
-                            "rel": r["rel"],
-                            "target_id": r["id"],
-                            "target_name": r["name"],
-                            "target_desc": (r["description"] or "")[:400],
-                            "labels": r["labels"]
-                        })
+                        # Targets are interned: a node reached from several sources is stored once
+                        target = intern_node(r["id"], r["name"], r["type"], r["description"], r["labels"])
+                        facts.append(FactRecord(nid, r["rel"], target))
                 logger.info(f"Fetched {len(facts)} graph facts for {len(node_ids)} nodes.")
             return facts
 
@@ -59,21 +70,20 @@ class Neo4jRetriever:
             logger.exception("Graph retrieval failed.")
             raise GraphError(f"Failed to fetch graph context: {e}")
         
-    def fetch_graph_context(self, node_ids):
+    def fetch_graph_context(self, node_ids, limit_per_node: Optional[int] = None):
         """
         Compatibility wrapper for HybridRetriever.
-        Delegates to fetch_neighbors().
+        Delegates to fetch_neighbors(); the default neighbourhood is wide because
+        the chat ranks facts against the query before prompting.
         """
         try:
-            return self.fetch_neighbors(node_ids)
+            return self.fetch_neighbors(node_ids, limit_per_node or Config.GRAPH_NEIGHBORS_PER_NODE)
         except Exception as e:
             logger.exception("Graph context fetch failed.")
             raise GraphError(f"Graph context fetch failed: {e}")
         
     def close(self):
-        """Close the Neo4j driver connection."""
-        try:
-            self.driver.close()
-            logger.info("Neo4j connection closed.")
-        except Exception as e:
-            logger.warning(f"Error closing Neo4j connection: {e}")
+        """
+        Nothing to release: the driver is borrowed from the resource registry and
+        shared with other retrievers, which closes it when the process exits.
+        """
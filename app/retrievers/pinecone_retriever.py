@@ -1,9 +1,15 @@
 import logging
-from typing import List, Dict
-from pinecone import Pinecone, ServerlessSpec
-from openai import OpenAI
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Optional, Union
+import numpy as np
+from app import resources
 from app.config_loader import Config
 from app.exceptions import RetrievalError
+from app.llm.llm_client import llm_client
+from app.replay import cassette
+from app.retrievers.records import MatchRecord
 
 logger = logging.getLogger(__name__)
 
@@ -13,52 +19,108 @@ class PineconeRetriever:
     """
 
     def __init__(self):
-        try:
-            self.pc = Pinecone(api_key=Config.PINECONE_API_KEY)
-            self.client = OpenAI(api_key = Config.OPENAI_API_KEY)
-            self.index_name = Config.PINECONE_INDEX_NAME
-            self.vector_dim = Config.PINECONE_VECTOR_DIM
-            self._ensure_index_exists()
-            self.index = self.pc.Index(self.index_name)
-            logger.info(f"PineconeRetriever initialised (index: {self.index_name})")
+        # No network calls here: the client and index are opened on first query
+        self.index_name = Config.PINECONE_INDEX_NAME
+        self.vector_dim = Config.PINECONE_VECTOR_DIM
+        self._index = None
+        # Stored node embeddings fetched for fact ranking; nodes rarely change, so keep recent ones.
+        # An id the index does not have maps to the time of the miss; it is not fetched again
+        # until NODE_VECTOR_MISS_TTL has passed, so nodes uploaded later are picked up.
+        self._node_vectors: "OrderedDict[str, Union[np.ndarray, float]]" = OrderedDict()
+        self._node_vectors_lock = threading.Lock()
+        logger.info(f"PineconeRetriever initialised (index: {self.index_name})")
 
-        except Exception as e:
-            logger.exception("Failed to initialize PineconeRetriever")
-            raise RetrievalError(f"Error initializing PineconeRetriever: {e}")
-        
-    def _ensure_index_exists(self):
-        """Ensure the index exists or create it if missing."""
-        existing_indexes = self.pc.list_indexes().names()
-        if self.index_name not in existing_indexes:
-            logger.warning(f"Index {self.index_name} not found. Creating new one.")
-            self.pc.create_index(
-                name = self.index_name,
-                dimension = self.vector_dim,
-                metric = "cosine",
-                spec = ServerlessSpec(cloud = "aws", region = "us-east1-gcp")
-            )
+    @property
+    def pc(self):
+        return resources.pinecone_client()
+
+    @property
+    def index(self):
+        """Shared index handle; the existence check runs once per process."""
+        if self._index is None:
+            try:
+                self._index = resources.pinecone_index(self.index_name, self.vector_dim)
+            except Exception as e:
+                logger.exception("Failed to open Pinecone index")
+                raise RetrievalError(f"Error opening Pinecone index {self.index_name}: {e}")
+        return self._index
     
     def get_embedding(self, text: str, model = "text-embedding-3-small") -> List[float]:
         """Generate an embedding for a given text."""
         try:
-            response = self.client.embeddings.create(model = model, input = [text])
-            return response.data[0].embedding
+            # Goes through the shared LLMClient so query embeddings share its rate budget
+            return llm_client.embed_text(text, model = model)
         
         except Exception as e:
             logger.exception("Error generate embedding.")
             raise RetrievalError(f"Failed to embed text: {e}")
         
-    def query(self, text: str, top_k: int = Config.TOP_K) -> List[Dict]:
-        """Query Pinecone for the most similar items."""
+    def get_embeddings(self, texts: List[str], model = "text-embedding-3-small") -> List[List[float]]:
+        """Generate embeddings for a batch of texts with one API request."""
+        try:
+            return llm_client.embed_texts(texts, model = model)
+
+        except Exception as e:
+            logger.exception("Error generating batch embeddings.")
+            raise RetrievalError(f"Failed to embed batch: {e}") from e
+
+    def node_vectors(self, node_ids: List[str]) -> Dict[str, np.ndarray]:
+        """Stored embeddings of the given nodes, fetched from the index once and kept in memory (LRU)."""
+        found, missing = {}, set()
+        now = time.monotonic()
+        with self._node_vectors_lock:
+            for nid in node_ids:
+                cached = self._node_vectors.get(nid)
+                if cached is None or (isinstance(cached, float) and now - cached >= Config.NODE_VECTOR_MISS_TTL):
+                    missing.add(nid)
+                    continue
+                self._node_vectors.move_to_end(nid)
+                if not isinstance(cached, float):
+                    found[nid] = cached
+        missing = sorted(missing)
+        if not missing:
+            return found
+        try:
+            def _fetch():
+                resp = self.index.fetch(ids=missing)
+                return {vid: list(v.values) for vid, v in resp.vectors.items()}
+
+            request = {"index": self.index_name, "ids": missing}
+            fetched = cassette.through("vector_fetch", request, _fetch)
+        except Exception as e:
+            logger.exception("Error fetching node vectors from Pinecone.")
+            raise RetrievalError(f"Pinecone fetch failed: {e}")
+
+        with self._node_vectors_lock:
+            for vid in missing:
+                values = fetched.get(vid)
+                if values is None:
+                    self._node_vectors[vid] = now
+                else:
+                    found[vid] = self._node_vectors[vid] = np.asarray(values, dtype=np.float32)
+                self._node_vectors.move_to_end(vid)
+            while len(self._node_vectors) > Config.NODE_VECTOR_CACHE_SIZE:
+                self._node_vectors.popitem(last=False)
+        return found
+
+    def query(self, text: str, top_k: int = Config.TOP_K, filter: Optional[Dict] = None) -> List[Dict]:
+        """Query Pinecone for the most similar items, optionally restricted by a metadata filter."""
         try:
             vector = self.get_embedding(text)
-            results = self.index.query(
-                vector = vector,
-                top_k = top_k,
-                include_metadata = True,
-                include_values = False,
-            )
-            matches = results.get("matches", [])
+
+            def _query():
+                results = self.index.query(
+                    vector = vector,
+                    top_k = top_k,
+                    filter = filter,
+                    include_metadata = True,
+                    include_values = False,
+                )
+                # Plain dicts, so recorded and live results look the same
+                return [m.to_dict() if hasattr(m, "to_dict") else dict(m) for m in results.get("matches", [])]
+
+            request = {"index": self.index_name, "vector": cassette.vector_digest(vector), "top_k": top_k, "filter": filter}
+            matches = [MatchRecord.from_dict(m) for m in cassette.through("vector_query", request, _query)]
             logger.info(f"Pinecone query returned {len(matches)} matches.")
             return matches
             
@@ -0,0 +1,201 @@
+"""
+app/retrievers/records.py
+Compact record types for semantic matches and graph facts.
+
+Retrievers return these instead of ad-hoc dicts. Records use __slots__, and a
+node that appears as the target of many facts (across sources, requests and
+cached answers) is stored once: facts point at the interned NodeRecord
+instead of carrying their own copy of its description and labels.
+
+Records (and their metadata) are read-only Mappings, so existing code that
+does fact["rel"] or match.get("metadata") keeps working. Plain dicts are produced only at the API
+and cache boundaries (to_dict / to_plain).
+"""
+
+import sys
+import threading
+import weakref
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+DESCRIPTION_CHARS = 400
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class _Record(Mapping):
+    """Mapping view over a slotted record; `_keys` lists the dict form's fields."""
+
+    __slots__ = ()
+    _keys: Tuple[str, ...] = ()
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._keys:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def to_dict(self) -> Dict:
+        return {key: to_plain(getattr(self, key)) for key in self._keys}
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{k}={getattr(self, k)!r}" for k in self._keys)
+        return f"{type(self).__name__}({fields})"
+
+
+class NodeRecord(_Record):
+    """A graph node as seen from a fact. Shared between all facts that target it."""
+
+    __slots__ = ("id", "name", "type", "description", "labels", "__weakref__")
+    _keys = ("id", "name", "type", "description", "labels")
+
+    def __init__(self, id: str, name: str, type: Optional[str], description: str, labels: Tuple[str, ...]):
+        self.id = _intern(id)
+        self.name = _intern(name)
+        self.type = _intern(type)
+        self.description = description
+        self.labels = labels
+
+    def _same(self, name, type, description, labels) -> bool:
+        return (self.name, self.type, self.description, self.labels) == (name, type, description, labels)
+
+
+class FactRecord(_Record):
+    """One relationship (source)-[rel]->(target); the target is an interned NodeRecord."""
+
+    __slots__ = ("source", "rel", "target")
+    _keys = ("source", "rel", "target_id", "target_name", "target_desc", "labels")
+
+    def __init__(self, source: str, rel: str, target: NodeRecord):
+        self.source = _intern(source)
+        self.rel = _intern(rel)
+        self.target = target
+
+    @property
+    def target_id(self) -> str:
+        return self.target.id
+
+    @property
+    def target_name(self) -> str:
+        return self.target.name
+
+    @property
+    def target_desc(self) -> str:
+        return self.target.description
+
+    @property
+    def labels(self) -> Tuple[str, ...]:
+        return self.target.labels
+
+
+class Metadata(Mapping):
+    """
+    Read-only match metadata. One instance is shared by every match (and cached
+    answer) of the same node, so it cannot be changed in place; list values
+    become tuples.
+    """
+
+    __slots__ = ("_data", "__weakref__")
+
+    def __init__(self, items: Iterable[Tuple[str, Any]] = ()):
+        self._data = {
+            _intern(k): tuple(v) if isinstance(v, list) else _intern(v) for k, v in dict(items).items()
+        }
+
+    def __getitem__(self, key: str) -> Any:
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def to_dict(self) -> Dict:
+        return to_plain(self._data)
+
+    def __repr__(self) -> str:
+        return f"Metadata({self._data!r})"
+
+
+class MatchRecord(_Record):
+    """A semantic search hit: id, similarity score and (shared) metadata."""
+
+    __slots__ = ("id", "score", "metadata")
+    _keys = ("id", "score", "metadata")
+
+    def __init__(self, id: str, score: float, metadata: Optional[Dict]):
+        self.id = _intern(id)
+        self.score = float(score)
+        self.metadata = intern_metadata(self.id, metadata or {})
+
+    @classmethod
+    def from_dict(cls, match: Dict) -> "MatchRecord":
+        """Build from a Pinecone / snapshot match dict, dropping vector values."""
+        if isinstance(match, MatchRecord):
+            return match
+        return cls(match["id"], match.get("score") or 0.0, match.get("metadata"))
+
+
+# --------------------- INTERNING ---------------------
+_nodes: "weakref.WeakValueDictionary[str, NodeRecord]" = weakref.WeakValueDictionary()
+_metadata: "weakref.WeakValueDictionary[str, Metadata]" = weakref.WeakValueDictionary()
+_labels: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+_lock = threading.Lock()
+
+
+def intern_node(
+    id: str,
+    name: str,
+    type: Optional[str] = None,
+    description: Optional[str] = None,
+    labels: Iterable[str] = (),
+) -> NodeRecord:
+    """
+    The shared NodeRecord for this node. Records live as long as some fact,
+    session or cached answer references them. A node whose attributes changed
+    gets a fresh record; facts built earlier keep the old one.
+    """
+    description = (description or "")[:DESCRIPTION_CHARS]
+    labels = tuple(_intern(label) for label in labels)
+    with _lock:
+        labels = _labels.setdefault(labels, labels)
+        node = _nodes.get(id)
+        if node is None or not node._same(name, type, description, labels):
+            node = NodeRecord(id, name, type, description, labels)
+            _nodes[id] = node
+        return node
+
+
+def intern_metadata(id: str, metadata: Dict) -> Metadata:
+    """Share one metadata dict per node id across matches, sessions and cached answers."""
+    with _lock:
+        shared = _metadata.get(id)
+        if shared is None or shared.to_dict() != to_plain(metadata):
+            shared = Metadata(metadata.items())
+            _metadata[id] = shared
+        return shared
+
+
+def interned_count() -> Dict[str, int]:
+    """Live interned records (for diagnostics and memory tests)."""
+    return {"nodes": len(_nodes), "metadata": len(_metadata)}
+
+
+# --------------------- BOUNDARIES ---------------------
+def to_plain(value: Any) -> Any:
+    """Recursively turn records (and tuples) into plain dicts and lists for JSON/API output."""
+    if isinstance(value, (_Record, Metadata)):
+        return value.to_dict()
+    if isinstance(value, dict):
+        return {k: to_plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_plain(v) for v in value]
+    return value
@@ -0,0 +1,79 @@
+"""
+An asyncio event loop running forever on a daemon thread.
+
+Synchronous callers (Streamlit script threads, the CLI) submit coroutines with
+run() and block on the result, so they never create, nest or patch event loops
+of their own.
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import threading
+from typing import Awaitable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class BackgroundLoop:
+    """Owns one event loop on a dedicated thread; thread-safe to submit to."""
+
+    def __init__(self, name: str = "background-loop"):
+        self.loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+        self._ready.wait()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(self._ready.set)
+        self.loop.run_forever()
+        self.loop.close()
+
+    @property
+    def running(self) -> bool:
+        return self.thread.is_alive() and not self.loop.is_closed()
+
+    def submit(self, coro: Awaitable[T]) -> concurrent.futures.Future:
+        """Schedule `coro` on the loop and return a concurrent Future for its result."""
+        if not self.running:
+            raise RuntimeError("Background loop is not running")
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Awaitable[T], timeout: Optional[float] = None) -> T:
+        """
+        Run `coro` on the loop and wait for its result. On timeout the coroutine
+        is cancelled so it stops holding connections and budget.
+        """
+        future = self.submit(coro)
+        try:
+            return future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise TimeoutError(f"Operation did not finish within {timeout}s")
+
+    async def _cancel_pending(self):
+        """Cancel every other task on the loop and wait for their cleanup (finally blocks, closes)."""
+        tasks = [t for t in asyncio.all_tasks(self.loop) if t is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        for task, result in zip(tasks, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Task {task.get_name()} failed while stopping: {result!r}")
+        await self.loop.shutdown_asyncgens()
+
+    def stop(self, timeout: float = 5.0):
+        """Cancel pending tasks, wait up to `timeout` for them to finish, then stop the loop."""
+        if not self.running:
+            return
+        try:
+            self.submit(self._cancel_pending()).result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            logger.warning(f"Pending tasks did not finish within {timeout}s; stopping the loop anyway.")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=timeout)
+        logger.info("Background event loop stopped.")
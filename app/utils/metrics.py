@@ -0,0 +1,302 @@
+"""
+In-process metrics: counters, gauges, latency histograms and top-N tables
+(the most frequent user queries, for cache warm-up).
+
+Code records into the process-wide `metrics` registry; a MetricsExporter thread
+periodically writes a JSON snapshot that the dashboard reads, so watching the
+service never opens backend connections of its own. Each process writes its own
+file (the pid goes into the name) so that concurrent services do not overwrite
+each other. Inside request_trace(), the
+same counters and timings are also summed for that one request.
+"""
+
+import bisect
+import glob
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Latency bucket upper bounds in milliseconds (last bucket is +inf)
+LATENCY_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+# Entries of each top-N table kept in memory and written to the snapshot
+TOP_CAPACITY = 500
+
+
+class Histogram:
+    """Fixed-bucket latency histogram with approximate percentiles."""
+
+    def __init__(self, buckets: List[float] = LATENCY_BUCKETS_MS):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value_ms: float):
+        self.counts[bisect.bisect_left(self.buckets, value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+        self.max = max(self.max, value_ms)
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th percentile (max for the overflow bucket)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return float(self.buckets[i]) if i < len(self.buckets) else self.max
+        return self.max
+
+    def snapshot(self) -> Dict:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count, 2) if self.count else 0.0,
+            "p50_ms": self.percentile(0.50),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(self.max, 2),
+            "buckets": {
+                **{f"le_{b}": c for b, c in zip(self.buckets, self.counts)},
+                "inf": self.counts[-1],
+            },
+        }
+
+
+class TopCounter:
+    """
+    Approximate most frequent keys in bounded memory: once 2 * capacity keys are
+    held, only the `capacity` most frequent are kept.
+    """
+
+    def __init__(self, capacity: int = TOP_CAPACITY):
+        self.capacity = capacity
+        self.counts: Dict[str, int] = {}
+
+    def add(self, key: str, amount: int = 1):
+        self.counts[key] = self.counts.get(key, 0) + amount
+        if len(self.counts) > 2 * self.capacity:
+            self.counts = dict(heapq.nlargest(self.capacity, self.counts.items(), key=lambda kv: kv[1]))
+
+    def most_common(self, n: Optional[int] = None) -> List[Tuple[str, int]]:
+        return heapq.nlargest(n or self.capacity, self.counts.items(), key=lambda kv: kv[1])
+
+
+class RequestTrace:
+    """Counters and timings (ms) recorded while one request was being handled."""
+
+    __slots__ = ("counters", "timings", "_lock")
+
+    def __init__(self):
+        self.counters: Dict[str, float] = {}
+        self.timings: Dict[str, float] = {}
+        # Worker threads of the request (asyncio.to_thread) record into the same trace
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, amount: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name: str, value_ms: float):
+        with self._lock:
+            self.timings[name] = self.timings.get(name, 0.0) + value_ms
+
+
+# Trace of the request being handled in this context, if any
+_trace: ContextVar[Optional[RequestTrace]] = ContextVar("request_trace", default=None)
+
+
+@contextmanager
+def request_trace():
+    """Collect everything the shared registry records in this context into a fresh RequestTrace."""
+    trace = RequestTrace()
+    token = _trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _trace.reset(token)
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return _trace.get()
+
+
+class MetricsRegistry:
+    """Thread-safe registry; gauges may be values or callables read at snapshot time."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.counters: Dict[str, float] = {}
+        self.gauges: Dict[str, object] = {}
+        self.histograms: Dict[str, Histogram] = {}
+        self.tops: Dict[str, TopCounter] = {}
+
+    def inc(self, name: str, amount: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+        trace = _trace.get()
+        if trace is not None:
+            trace.inc(name, amount)
+
+    def count_top(self, name: str, key: str, amount: int = 1):
+        """Count `key` in the top-N table `name` (e.g. "queries")."""
+        with self._lock:
+            top = self.tops.get(name)
+            if top is None:
+                top = self.tops[name] = TopCounter()
+            top.add(key, amount)
+
+    def set_gauge(self, name: str, value):
+        """Set a gauge to a value, or to a zero-argument callable evaluated on snapshot."""
+        with self._lock:
+            self.gauges[name] = value
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            hist = self.histograms.get(name)
+            if hist is None:
+                hist = self.histograms[name] = Histogram()
+            hist.observe(seconds * 1000.0)
+        trace = _trace.get()
+        if trace is not None:
+            trace.observe(name, seconds * 1000.0)
+
+    @contextmanager
+    def timer(self, name: str):
+        """Time a block into histogram `name` (recorded even if the block raises)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+            histograms = {name: h.snapshot() for name, h in self.histograms.items()}
+            tops = {name: top.most_common() for name, top in self.tops.items()}
+        for name, value in gauges.items():
+            if callable(value):
+                try:
+                    gauges[name] = value()
+                except Exception as e:
+                    gauges[name] = None
+                    logger.debug(f"Gauge {name} failed: {e}")
+        return {
+            "timestamp": time.time(),
+            "uptime_s": round(time.time() - self.started, 1),
+            "pid": os.getpid(),
+            "counters": counters,
+            "gauges": gauges,
+            "histograms": histograms,
+            "top": tops,
+        }
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.tops.clear()
+            self.started = time.time()
+
+
+def snapshot_path(path: str, pid: Optional[int] = None) -> str:
+    """Per-process snapshot file for METRICS_PATH: logs/metrics.json -> logs/metrics.<pid>.json."""
+    base, ext = os.path.splitext(path)
+    return f"{base}.{pid if pid is not None else os.getpid()}{ext}"
+
+
+class MetricsExporter:
+    """Writes registry snapshots to this process's JSON file atomically every `interval` seconds."""
+
+    def __init__(self, registry: MetricsRegistry, path: str, interval: float = 2.0):
+        self.registry = registry
+        self.path = snapshot_path(path)
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def write(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.registry.snapshot(), f, default=str)
+        os.replace(tmp, self.path)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.write()
+            except Exception as e:
+                logger.warning(f"Metrics export failed: {e}")
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="metrics-exporter", daemon=True)
+            self._thread.start()
+            logger.info(f"Exporting metrics to {self.path} every {self.interval}s.")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+        self.write()
+
+
+def read_snapshot(path: str) -> Optional[Dict]:
+    """Load the latest exported snapshot, or None if nothing has been written yet."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def read_snapshots(path: str) -> List[Dict]:
+    """Every process's snapshot for METRICS_PATH `path`, most recently written first."""
+    base, ext = os.path.splitext(path)
+    snapshots = []
+    for name in glob.glob(f"{glob.escape(base)}.*{ext}"):
+        if not name[len(base) + 1 : len(name) - len(ext)].isdigit():
+            continue
+        snapshot = read_snapshot(name)
+        if snapshot is not None:
+            snapshots.append(snapshot)
+    return sorted(snapshots, key=lambda s: -s.get("timestamp", 0))
+
+
+# Shared registry for the whole process
+metrics = MetricsRegistry()
+
+_exporter: Optional[MetricsExporter] = None
+_exporter_lock = threading.Lock()
+
+
+def start_exporter(path: str, interval: float = 2.0) -> MetricsExporter:
+    """Start (once per process) the background exporter for the shared registry."""
+    global _exporter
+    with _exporter_lock:
+        if _exporter is None:
+            _exporter = MetricsExporter(metrics, path, interval)
+        _exporter.start()
+        return _exporter
+
+
+def register_gauges(gauges: Dict[str, Callable[[], object]]):
+    for name, fn in gauges.items():
+        metrics.set_gauge(name, fn)
@@ -0,0 +1,164 @@
+"""
+Append-only per-query performance log for offline analysis.
+
+AsyncHybridChat hands one compact record per query to PerfLog.record(), which
+only puts it on a bounded queue. A writer thread appends the records as JSON
+lines in batches to this process's file for PERF_LOG_PATH (logs/perf.jsonl ->
+logs/perf.<pid>.jsonl), rotating to .1, .2, ... once the file reaches
+PERF_LOG_MAX_BYTES. Every process rotates only its own file, so service
+workers and CLI runs sharing a path never rename each other's files. When the
+writer falls behind, records are dropped (counter perf_log.dropped) rather
+than slowing requests down.
+
+read_records() merges every process's files; scripts/analyze_perf_log.py uses it.
+"""
+
+import atexit
+import glob
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+from typing import Dict, Iterator, List, Optional
+
+from app.utils.metrics import metrics, snapshot_path
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class PerfLog:
+    """Background JSONL writer with size-based rotation of this process's file for `path`."""
+
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024, backups: int = 5, queue_size: int = 10000):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    # --------------------- PRODUCER ---------------------
+    def record(self, entry: Dict):
+        """Queue one record; never blocks the caller."""
+        self.start()
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            metrics.inc("perf_log.dropped")
+
+    # --------------------- WRITER ---------------------
+    @property
+    def file_path(self) -> str:
+        # Resolved per write so a forked worker gets its own file
+        return snapshot_path(self.path)
+
+    def _rotate(self, path: str):
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{path}.{i}"):
+                os.replace(f"{path}.{i}", f"{path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(path, f"{path}.1")
+        else:
+            os.remove(path)
+
+    def _write(self, lines):
+        path = self.file_path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(path) and os.path.getsize(path) >= self.max_bytes:
+            self._rotate(path)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("".join(lines))
+        metrics.inc("perf_log.written", len(lines))
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            # Drain whatever else is waiting so a burst costs one open/write
+            while len(batch) < 1000:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if _STOP in batch:
+                stopping = True
+                batch = [e for e in batch if e is not _STOP]
+            if not batch:
+                continue
+            try:
+                self._write([json.dumps(e, separators=(",", ":"), default=str) + "\n" for e in batch])
+            except Exception as e:
+                metrics.inc("perf_log.failed", len(batch))
+                logger.warning(f"Could not write {len(batch)} perf records to {self.file_path}: {e}")
+
+    # --------------------- LIFECYCLE ---------------------
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="perf-log-writer", daemon=True)
+                self._thread.start()
+
+    def close(self, timeout: float = 5.0):
+        """Write out everything queued so far and stop the writer."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join(timeout=timeout)
+
+
+_perf_logs: Dict[str, PerfLog] = {}
+_perf_logs_lock = threading.Lock()
+
+
+def open_perf_log(path: str, max_bytes: int = 64 * 1024 * 1024, backups: int = 5) -> PerfLog:
+    """The process-wide writer for `path` (chats sharing a path share one thread and file)."""
+    with _perf_logs_lock:
+        log = _perf_logs.get(path)
+        if log is None:
+            log = _perf_logs[path] = PerfLog(path, max_bytes, backups)
+            atexit.register(log.close)
+        return log
+
+
+def query_hash(query: str) -> str:
+    """Stable short id of a query; perf records and INFO log lines carry it instead of the text."""
+    return hashlib.sha1(query.strip().lower().encode()).hexdigest()[:16]
+
+
+def log_files(path: str) -> List[str]:
+    """
+    Files for PERF_LOG_PATH `path`: `path` itself (single-file logs of older
+    versions) and each process's file, every one preceded by its rotated files.
+    """
+    base, ext = os.path.splitext(path)
+    current = [path] + sorted(
+        name for name in glob.glob(f"{glob.escape(base)}.*{ext}")
+        if name[len(base) + 1 : len(name) - len(ext)].isdigit()
+    )
+    files = []
+    for name in current:
+        rotated = glob.glob(f"{glob.escape(name)}.[0-9]*")
+        files += sorted(rotated, key=lambda p: -int(p.rsplit(".", 1)[1]))
+        if os.path.exists(name):
+            files.append(name)
+    return files
+
+
+def read_records(path: str) -> Iterator[Dict]:
+    """Records from every process's file for `path`, oldest rotated file first; bad lines are skipped."""
+    for name in log_files(path):
+        with open(name, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
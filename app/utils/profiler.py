@@ -0,0 +1,180 @@
+"""
+Opt-in per-request profiling (PROFILE_SAMPLE_RATE, or `--profile` on the CLI).
+
+For a sampled request three things run while it is handled:
+  - cProfile on the event-loop thread (deterministic call counts and times;
+    coroutines of other requests sharing the loop are included)
+  - a stack sampler over the loop thread and the asyncio.to_thread workers,
+    where retrieval, embedding and LLM calls actually run
+  - tracemalloc, snapshotted before and after
+
+Each profile is written to PROFILE_DIR as <time>_<request id>.*:
+  .pstats      cProfile stats (pstats / snakeviz)
+  .collapsed   sampled stacks in collapsed format ("a;b;c 12"), for
+               flamegraph.pl, speedscope or inferno
+  .txt         top functions by cumulative time, top allocation sites still
+               alive after the request, and the allocation growth it caused
+
+Only one request is profiled at a time, because a thread can only have one
+profiler. Sampled requests that overlap it run unprofiled.
+"""
+
+import cProfile
+import io
+import logging
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from typing import Optional
+
+from app.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class StackSampler:
+    """Samples the Python stacks of the calling thread and asyncio worker threads into collapsed form."""
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._target = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _watched(self):
+        """Thread ident -> name for the loop thread and the default-executor workers."""
+        watched = {}
+        for t in threading.enumerate():
+            if t.ident == self._target or t.name.startswith("asyncio_"):
+                watched[t.ident] = t.name
+        return watched
+
+    def _collapse(self, frame) -> str:
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            module = frame.f_globals.get("__name__", os.path.basename(code.co_filename))
+            names.append(f"{module}:{code.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def _run(self):
+        watched, refreshed = {}, 0.0
+        while not self._stop.wait(self.interval):
+            now = time.monotonic()
+            if now - refreshed > 0.1:
+                watched, refreshed = self._watched(), now
+            frames = sys._current_frames()
+            for ident, name in watched.items():
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.stacks[f"{name};{self._collapse(frame)}"] += 1
+            self.samples += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class RequestProfiler:
+    """Profiles a sample of requests and dumps one set of files per profiled request."""
+
+    def __init__(
+        self,
+        output_dir: str = "outputs/profiles",
+        sample_rate: float = 1.0,
+        top_n: int = 25,
+        interval_ms: float = 5.0,
+        tracemalloc_frames: int = 10,
+    ):
+        self.output_dir = output_dir
+        self.sample_rate = sample_rate
+        self.top_n = top_n
+        self.interval = interval_ms / 1000.0
+        self.tracemalloc_frames = tracemalloc_frames
+        self._busy = threading.Lock()
+
+    @contextmanager
+    def profile(self, request_id: str, label: str = ""):
+        """Profile the enclosed block if this request is sampled and no other profile is running."""
+        if random.random() >= self.sample_rate or not self._busy.acquire(blocking=False):
+            yield None
+            return
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(self.tracemalloc_frames)
+        try:
+            before = tracemalloc.take_snapshot()
+            sampler = StackSampler(self.interval)
+            profiler = cProfile.Profile()
+            started = time.perf_counter()
+            sampler.start()
+            profiler.enable()
+            try:
+                yield profiler
+            finally:
+                profiler.disable()
+                sampler.stop()
+                seconds = time.perf_counter() - started
+                after = tracemalloc.take_snapshot()
+                current, peak = tracemalloc.get_traced_memory()
+                try:
+                    path = self._dump(request_id, label, seconds, profiler, sampler, before, after, current, peak)
+                    metrics.inc("profiles.written")
+                    logger.info(f"[PROFILE] {seconds * 1000:.0f} ms request profiled to {path}.*")
+                except Exception as e:
+                    logger.warning(f"[PROFILE] Could not write profile for {request_id}: {e}")
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+            self._busy.release()
+
+    def _dump(self, request_id, label, seconds, profiler, sampler, before, after, current, peak) -> str:
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, f"{time.strftime('%Y%m%d-%H%M%S')}_{request_id}")
+        profiler.dump_stats(f"{base}.pstats")
+        with open(f"{base}.collapsed", "w", encoding="utf-8") as f:
+            f.write(sampler.collapsed())
+
+        # Allocations made by the profiler and its sampler thread are noise
+        ignore = [
+            tracemalloc.Filter(False, path)
+            for path in (__file__, tracemalloc.__file__, cProfile.__file__, threading.__file__)
+        ]
+        after = after.filter_traces(ignore)
+        out = io.StringIO()
+        out.write(f"request {request_id}  {label}\n")
+        out.write(f"wall time {seconds * 1000:.1f} ms, {sampler.samples} stack samples\n")
+        out.write(f"traced memory {current / 1024:.0f} KiB (peak {peak / 1024:.0f} KiB)\n")
+
+        out.write(f"\n=== Top {self.top_n} functions by cumulative time (event-loop thread) ===\n")
+        pstats.Stats(profiler, stream=out).strip_dirs().sort_stats("cumulative").print_stats(self.top_n)
+
+        out.write(f"\n=== Top {self.top_n} allocation sites alive after the request ===\n")
+        for stat in after.statistics("lineno")[: self.top_n]:
+            out.write(f"{stat}\n")
+
+        out.write(f"\n=== Top {self.top_n} allocation changes during the request ===\n")
+        for stat in after.compare_to(before.filter_traces(ignore), "lineno")[: self.top_n]:
+            out.write(f"{stat}\n")
+
+        with open(f"{base}.txt", "w", encoding="utf-8") as f:
+            f.write(out.getvalue())
+        return base
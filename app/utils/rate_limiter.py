@@ -0,0 +1,149 @@
+"""
+Token-bucket rate limiting for OpenAI request (RPM) and token (TPM) budgets,
+with adaptive back-off when the provider answers 429.
+"""
+
+import threading
+import time
+from typing import Optional
+
+
+def is_rate_limited(exc: BaseException) -> bool:
+    """True if `exc`, or anything it was raised from, is a 429 / rate-limit error."""
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        if type(exc).__name__ == "RateLimitError" or getattr(exc, "status_code", None) == 429:
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """
+    The server's requested wait from the Retry-After (or retry-after-ms) header of
+    `exc` or anything it was raised from; None if no response carries one.
+    """
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        headers = getattr(getattr(exc, "response", None), "headers", None)
+        if headers is not None:
+            try:
+                if headers.get("retry-after-ms") is not None:
+                    return float(headers["retry-after-ms"]) / 1000.0
+                if headers.get("retry-after") is not None:
+                    return float(headers["retry-after"])
+            except (TypeError, ValueError):
+                pass  # an HTTP date or garbage: fall back to the limiter's cooldown
+        exc = exc.__cause__ or exc.__context__
+    return None
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available (0 if they are now)."""
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate if self.rate > 0 else float("inf")
+
+
+class RateLimiter:
+    """
+    Thread-safe limiter over a requests-per-minute and a tokens-per-minute budget.
+
+    acquire() blocks until both budgets allow the request. On a 429 the effective
+    rate is halved and requests pause briefly; every success recovers a little of
+    the configured rate (additive increase, multiplicative decrease).
+    """
+
+    def __init__(
+        self,
+        rpm: float,
+        tpm: float,
+        min_scale: float = 0.1,
+        recovery_step: float = 0.02,
+        cooldown: float = 2.0,
+    ):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.min_scale = min_scale
+        self.recovery_step = recovery_step
+        self.cooldown = cooldown
+        self.scale = 1.0
+        self.rate_limited = 0
+        self._paused_until = 0.0
+        self._requests = TokenBucket(rpm / 60.0, max(1.0, rpm / 60.0))
+        self._tokens = TokenBucket(tpm / 60.0, max(1.0, tpm / 60.0))
+        self._lock = threading.Lock()
+
+    def try_acquire(self, tokens: float = 0) -> float:
+        """
+        Take one request of `tokens` tokens if both budgets allow it now and return 0;
+        otherwise take nothing and return the seconds to wait before trying again.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._requests.refill(now)
+            self._tokens.refill(now)
+            # A single request larger than the bucket would never fit; let it drain the bucket
+            needed = min(tokens, self._tokens.capacity)
+            wait = max(
+                self._paused_until - now,
+                self._requests.wait_time(1),
+                self._tokens.wait_time(needed),
+            )
+            if wait <= 0:
+                self._requests.tokens -= 1
+                self._tokens.tokens -= needed
+                return 0.0
+            return wait
+
+    def acquire(self, tokens: float = 0, timeout: Optional[float] = None) -> float:
+        """Block until one request of `tokens` tokens fits the budgets; returns seconds waited."""
+        start = time.monotonic()
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return time.monotonic() - start
+            if timeout is not None and time.monotonic() - start + wait > timeout:
+                raise TimeoutError("Rate limiter wait exceeded timeout")
+            time.sleep(min(wait, 1.0))
+
+    def _apply_scale(self):
+        self._requests.rate = self.rpm / 60.0 * self.scale
+        self._tokens.rate = self.tpm / 60.0 * self.scale
+
+    def on_rate_limited(self, retry_after: Optional[float] = None):
+        """Back off after a 429: halve the rate and pause all callers for a moment."""
+        with self._lock:
+            self.rate_limited += 1
+            self.scale = max(self.min_scale, self.scale * 0.5)
+            self._apply_scale()
+            self._paused_until = time.monotonic() + (retry_after or self.cooldown)
+
+    def on_success(self):
+        with self._lock:
+            if self.scale < 1.0:
+                self.scale = min(1.0, self.scale + self.recovery_step)
+                self._apply_scale()
+
+    def stats(self) -> dict:
+        return {
+            "rpm_limit": self.rpm,
+            "tpm_limit": self.tpm,
+            "effective_scale": round(self.scale, 3),
+            "rate_limited": self.rate_limited,
+        }
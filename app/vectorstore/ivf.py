@@ -0,0 +1,187 @@
+"""
+Inverted-file (IVF) approximate nearest-neighbour index for vector snapshots.
+
+Rows are clustered with spherical k-means; each cluster ("list") stores the
+snapshot rows assigned to it. A query scores the centroids, visits the
+`nprobe` closest lists and scores only their rows, so search cost grows with
+nprobe * (count / nlist) instead of count.
+
+Files, stored inside the snapshot directory:
+
+    ivf.centroids   float32 (nlist, dim), unit length
+    ivf.offsets     uint64 (nlist + 1) start of each list in ivf.rows
+    ivf.rows        int64 snapshot rows grouped by list
+
+Centroids can be reused when a snapshot is rewritten: build_ivf_index then
+skips training. Given the list of each row carried over from the previous
+snapshot (IVFIndex.row_labels), it assigns only the new rows and merges them
+into the lists, instead of scoring every row against every centroid again.
+"""
+
+import json
+import logging
+import math
+import os
+import time
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize_rows(x: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    return np.divide(x, norms, out=np.zeros_like(x), where=norms > 0)
+
+
+def default_nlist(count: int) -> int:
+    """Common rule of thumb: about sqrt(N) lists, at least 1."""
+    return max(1, int(round(math.sqrt(count))))
+
+
+def assign(vectors, centroids: np.ndarray, block: int = 16384) -> np.ndarray:
+    """Nearest centroid (by cosine) for every row, in blocks."""
+    out = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), block):
+        chunk = np.asarray(vectors[start:start + block], dtype=np.float32)
+        out[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+    return out
+
+
+def train_centroids(
+    vectors,
+    nlist: int,
+    iterations: int = 20,
+    sample: int = 100_000,
+    seed: int = 0,
+) -> np.ndarray:
+    """Spherical k-means on a random sample of rows."""
+    rng = np.random.default_rng(seed)
+    count = len(vectors)
+    nlist = min(nlist, count)
+    picks = np.sort(rng.choice(count, size=min(sample, count), replace=False))
+    data = _normalize_rows(np.asarray(vectors[picks], dtype=np.float32))
+    centroids = data[rng.choice(len(data), size=nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        labels = assign(data, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, data)
+        counts = np.bincount(labels, minlength=nlist)
+        empty = counts == 0
+        if empty.any():
+            # Re-seed empty lists with random points so every list stays useful
+            sums[empty] = data[rng.choice(len(data), size=int(empty.sum()), replace=False)]
+        centroids = _normalize_rows(sums)
+    return centroids
+
+
+class IVFIndex:
+    """Loaded IVF lists (memory-mapped); a rewritten snapshot gets new lists from build_ivf_index."""
+
+    def __init__(self, centroids: np.ndarray, offsets: np.ndarray, rows: np.ndarray):
+        self.centroids = centroids
+        self.offsets = offsets
+        self.rows = rows
+        self.nlist = len(centroids)
+
+    @classmethod
+    def load(cls, path: str, dim: int) -> "IVFIndex":
+        centroids = np.fromfile(os.path.join(path, "ivf.centroids"), dtype=np.float32).reshape(-1, dim)
+        offsets = np.fromfile(os.path.join(path, "ivf.offsets"), dtype=np.uint64).astype(np.int64)
+        rows_path = os.path.join(path, "ivf.rows")
+        rows = (
+            np.memmap(rows_path, dtype=np.int64, mode="r")
+            if os.path.getsize(rows_path) else np.zeros(0, dtype=np.int64)
+        )
+        return cls(centroids, offsets, rows)
+
+    def probe(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        """Snapshot rows in the `nprobe` lists whose centroids are closest to the query."""
+        nprobe = max(1, min(nprobe, self.nlist))
+        scores = self.centroids @ query
+        lists = np.argpartition(-scores, nprobe - 1)[:nprobe]
+        parts = [np.asarray(self.rows[self.offsets[i]:self.offsets[i + 1]]) for i in lists]
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+
+    def list_sizes(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    def row_labels(self, count: int) -> np.ndarray:
+        """The list of every snapshot row (inverse of the grouped `rows`)."""
+        labels = np.full(count, -1, dtype=np.int64)
+        labels[np.asarray(self.rows)] = np.repeat(np.arange(self.nlist), self.list_sizes())
+        return labels
+
+
+def build_ivf_index(
+    path: str,
+    nlist: Optional[int] = None,
+    centroids: Optional[np.ndarray] = None,
+    iterations: int = 20,
+    sample: int = 100_000,
+    seed: int = 0,
+    labels: Optional[np.ndarray] = None,
+) -> dict:
+    """
+    Build (or rebuild) the IVF files for the snapshot at `path`. Passing the
+    centroids of a previous build skips training: only assignment is done.
+    With those centroids, `labels` can give the list of each row already
+    assigned (-1 for new rows); only the new rows are then assigned.
+    """
+    from app.vectorstore.snapshot import LocalVectorStore  # avoid a circular import
+
+    store = LocalVectorStore(path)
+    start = time.perf_counter()
+    if centroids is None:
+        nlist = nlist or default_nlist(store.count)
+        centroids = train_centroids(store.vectors, nlist, iterations, sample, seed)
+        trained = True
+    else:
+        trained = False
+    train_s = time.perf_counter() - start
+
+    if trained or labels is None:
+        labels = assign(store.vectors, centroids)
+        assigned = store.count
+    else:
+        labels = np.array(labels, dtype=np.int64)
+        new_rows = np.flatnonzero(labels < 0)
+        labels[new_rows] = assign(store.vectors[new_rows], centroids) if len(new_rows) else new_rows
+        assigned = len(new_rows)
+    # Rows grouped by list, in row order within each list
+    order = np.argsort(labels, kind="stable")
+    offsets = np.zeros(len(centroids) + 1, dtype=np.uint64)
+    offsets[1:] = np.cumsum(np.bincount(labels, minlength=len(centroids)))
+
+    for name, data in (("ivf.centroids", centroids.astype(np.float32)), ("ivf.offsets", offsets),
+                       ("ivf.rows", order.astype(np.int64))):
+        tmp = os.path.join(path, f"{name}.tmp")
+        data.tofile(tmp)
+        os.replace(tmp, os.path.join(path, name))
+
+    info = {"nlist": len(centroids), "rows": store.count, "assigned": assigned, "trained": trained}
+    manifest = dict(store.manifest, ivf=info)
+    manifest_tmp = os.path.join(path, "manifest.json.tmp")
+    with open(manifest_tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_tmp, os.path.join(path, "manifest.json"))
+
+    elapsed = time.perf_counter() - start
+    logger.info(
+        f"Built IVF index for {store.count} rows in {path}: {len(centroids)} lists, "
+        f"{'trained' if trained else 'reused centroids'}, {assigned} rows assigned "
+        f"({train_s:.1f}s training, {elapsed:.1f}s total)"
+    )
+    return dict(info, seconds=round(elapsed, 2))
+
+
+def load_centroids(path: str) -> Optional[np.ndarray]:
+    """Centroids of an existing snapshot's IVF index, for incremental rebuilds."""
+    manifest_path = os.path.join(path, "manifest.json")
+    if not os.path.exists(os.path.join(path, "ivf.centroids")) or not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        dim = json.load(f)["dim"]
+    return np.fromfile(os.path.join(path, "ivf.centroids"), dtype=np.float32).reshape(-1, dim)
@@ -0,0 +1,545 @@
+"""
+On-disk vector snapshot that worker processes share through `mmap`.
+
+A snapshot is a directory:
+
+    manifest.json   format version, row count, dimension, dtype, column vocabularies
+    vectors.bin     raw row-major matrix (float32 or float16), L2-normalized
+    ids.dat/.idx    UTF-8 ids and uint64 offsets into ids.dat
+    ids.order       uint64 rows sorted by id, for binary-search id lookups
+    meta.dat/.idx   compact JSON metadata per row and uint64 offsets
+    col.<field>     int32 code per row of a filterable metadata field (FILTER_COLUMNS),
+                    indexing the vocabulary in the manifest; -1 when missing
+    coarse.bin      optional int8 first-pass matrix over the first `coarse_dim`
+                    dimensions (Matryoshka truncation), renormalized
+    coarse.scale    per-row float32 dequantization scale for coarse.bin
+    ivf.*           optional inverted-file ANN index (see app/vectorstore/ivf.py)
+
+Readers open every file read-only with `numpy.memmap`, so N workers share one
+physical copy through the page cache and nothing is parsed up front. Filters
+on the column fields are evaluated on the code arrays, without parsing any
+row's JSON.
+
+`path` itself is a symlink to a versioned directory (`<name>.v<ns>`). A
+writer fills a new version and swaps the link with os.replace, so readers see
+either the old snapshot or the new one, never a missing or half-written one.
+
+With a coarse index, search scans the small int8 matrix first and rescores a
+shortlist with the full-precision rows; only the shortlist rows of
+vectors.bin are touched. text-embedding-3 vectors are trained so that a prefix
+of the dimensions is itself a usable embedding, which is what makes the
+truncated first pass accurate.
+"""
+
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.exceptions import RetrievalError
+from app.vectorstore.ivf import IVFIndex
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+SUPPORTED_DTYPES = ("float32", "float16")
+SUPPORTED_QUANTIZATION = ("int8",)
+COARSE_SCAN_BLOCK = 4096
+# Metadata fields stored as columns; these are the fields follow-up filters use
+FILTER_COLUMNS = ("type", "city")
+
+
+def quantize_rows(rows: np.ndarray, coarse_dim: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Truncate rows to their first `coarse_dim` dimensions, renormalize, and
+    quantize each row to int8 with its own symmetric scale.
+    Returns (int8 rows, float32 scales) with score ~= scale * (q . query).
+    """
+    head = np.asarray(rows, dtype=np.float32)[:, :coarse_dim]
+    norms = np.linalg.norm(head, axis=1, keepdims=True)
+    head = np.divide(head, norms, out=np.zeros_like(head), where=norms > 0)
+    scales = np.abs(head).max(axis=1) / 127.0
+    safe = np.where(scales > 0, scales, 1.0)[:, None]
+    quantized = np.clip(np.rint(head / safe), -127, 127).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+
+def _truncate_query(query: np.ndarray, coarse_dim: int) -> np.ndarray:
+    head = query[:coarse_dim]
+    norm = np.linalg.norm(head)
+    return head / norm if norm > 0 else head
+
+
+def _swap_in(path: str, version_dir: str):
+    """
+    Point `path` at `version_dir` with one atomic rename of a symlink, then delete
+    the versions it replaced. Readers that already mapped the old files keep them.
+    """
+    parent, name = os.path.split(os.path.abspath(path))
+    link_tmp = f"{path}.link.tmp"
+    if os.path.lexists(link_tmp):
+        os.remove(link_tmp)
+    os.symlink(os.path.basename(version_dir), link_tmp)
+    legacy = None
+    if os.path.isdir(path) and not os.path.islink(path):
+        # A snapshot from before versioned directories: moved aside once, then dropped
+        legacy = f"{path}.legacy"
+        shutil.rmtree(legacy, ignore_errors=True)
+        os.replace(path, legacy)
+    os.replace(link_tmp, path)
+
+    version = re.compile(rf"{re.escape(name)}\.v\d+")
+    for entry in os.listdir(parent):
+        if version.fullmatch(entry) and entry != os.path.basename(version_dir):
+            shutil.rmtree(os.path.join(parent, entry), ignore_errors=True)
+    if legacy:
+        shutil.rmtree(legacy, ignore_errors=True)
+
+
+class SnapshotWriter:
+    """
+    Streams (id, vector, metadata) rows into a new snapshot directory.
+    Rows are written as they arrive (add() is thread-safe); the snapshot replaces
+    `path` atomically on close().
+    """
+
+    def __init__(
+        self,
+        path: str,
+        dim: int,
+        dtype: str = "float32",
+        quantize: Optional[str] = None,
+        coarse_dim: Optional[int] = None,
+    ):
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"Unsupported snapshot dtype {dtype!r}; expected one of {SUPPORTED_DTYPES}")
+        if quantize is not None and quantize not in SUPPORTED_QUANTIZATION:
+            raise ValueError(f"Unsupported quantization {quantize!r}; expected one of {SUPPORTED_QUANTIZATION}")
+        self.path = path
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.quantize = quantize
+        self.coarse_dim = min(coarse_dim or dim, dim)
+        self.count = 0
+        self._tmp = f"{path}.v{time.time_ns()}"
+        os.makedirs(self._tmp)
+        self._vectors = open(os.path.join(self._tmp, "vectors.bin"), "wb")
+        self._ids = open(os.path.join(self._tmp, "ids.dat"), "wb")
+        self._meta = open(os.path.join(self._tmp, "meta.dat"), "wb")
+        self._coarse = open(os.path.join(self._tmp, "coarse.bin"), "wb") if quantize else None
+        self._coarse_scales: List[float] = []
+        self._id_offsets: List[int] = [0]
+        self._meta_offsets: List[int] = [0]
+        # field -> {value: code} and field -> per-row codes; a field with a non-string value is dropped
+        self._vocab: Dict[str, Dict[str, int]] = {field: {} for field in FILTER_COLUMNS}
+        self._codes: Dict[str, List[int]] = {field: [] for field in FILTER_COLUMNS}
+        self._lock = threading.Lock()
+
+    def add(self, node_id: str, vector: Iterable[float], metadata: Optional[Dict] = None) -> int:
+        """Append a row; returns its row number."""
+        row = np.asarray(vector, dtype=np.float32)
+        if row.shape != (self.dim,):
+            raise ValueError(f"Vector for {node_id} has shape {row.shape}, expected ({self.dim},)")
+        norm = np.linalg.norm(row)
+        if norm > 0:
+            row = row / norm
+        raw_vector = row.astype(self.dtype).tobytes()
+        raw_id = node_id.encode("utf-8")
+        raw_meta = json.dumps(metadata or {}, separators=(",", ":")).encode("utf-8")
+        coarse = quantize_rows(row[None, :], self.coarse_dim) if self._coarse else None
+
+        with self._lock:
+            self._vectors.write(raw_vector)
+            if coarse is not None:
+                self._coarse.write(coarse[0].tobytes())
+                self._coarse_scales.append(float(coarse[1][0]))
+            self._ids.write(raw_id)
+            self._id_offsets.append(self._id_offsets[-1] + len(raw_id))
+            self._meta.write(raw_meta)
+            self._meta_offsets.append(self._meta_offsets[-1] + len(raw_meta))
+            for field in list(self._codes):
+                value = (metadata or {}).get(field)
+                if value is not None and not isinstance(value, str):
+                    del self._codes[field], self._vocab[field]
+                    continue
+                vocab = self._vocab[field]
+                self._codes[field].append(-1 if value is None else vocab.setdefault(value, len(vocab)))
+            self.count += 1
+            return self.count - 1
+
+    def _files(self):
+        return [f for f in (self._vectors, self._ids, self._meta, self._coarse) if f is not None]
+
+    def close(self):
+        for f in self._files():
+            f.close()
+        np.asarray(self._id_offsets, dtype=np.uint64).tofile(os.path.join(self._tmp, "ids.idx"))
+        np.asarray(self._meta_offsets, dtype=np.uint64).tofile(os.path.join(self._tmp, "meta.idx"))
+        self._write_id_order()
+        for field, codes in self._codes.items():
+            np.asarray(codes, dtype=np.int32).tofile(os.path.join(self._tmp, f"col.{field}"))
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "count": self.count,
+            "dim": self.dim,
+            "dtype": self.dtype.name,
+            "metric": "cosine",
+            "columns": {field: list(vocab) for field, vocab in self._vocab.items()},
+        }
+        if self.quantize:
+            np.asarray(self._coarse_scales, dtype=np.float32).tofile(os.path.join(self._tmp, "coarse.scale"))
+            manifest["coarse"] = {"quantization": self.quantize, "dim": self.coarse_dim}
+        with open(os.path.join(self._tmp, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+        _swap_in(self.path, self._tmp)
+        logger.info(f"Wrote vector snapshot with {self.count} rows to {self.path}")
+
+    def _write_id_order(self):
+        """Rows sorted by their UTF-8 id, so readers can binary-search ids without a table."""
+        with open(os.path.join(self._tmp, "ids.dat"), "rb") as f:
+            data = f.read()
+        offsets = self._id_offsets
+        order = sorted(range(self.count), key=lambda row: data[offsets[row]:offsets[row + 1]])
+        np.asarray(order, dtype=np.uint64).tofile(os.path.join(self._tmp, "ids.order"))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            for f in self._files():
+                f.close()
+            shutil.rmtree(self._tmp, ignore_errors=True)
+
+
+def _memmap(path: str, dtype, shape=None):
+    # numpy refuses to map empty files; an empty snapshot gets an empty array instead
+    if os.path.getsize(path) == 0:
+        return np.zeros(shape or (0,), dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=shape)
+
+
+def _matches_filter(meta: Dict, flt: Optional[Dict]) -> bool:
+    """Evaluate the subset of Pinecone filter syntax we use ($and, $in, $eq, equality)."""
+    if not flt:
+        return True
+    for key, cond in flt.items():
+        if key == "$and":
+            if not all(_matches_filter(meta, sub) for sub in cond):
+                return False
+            continue
+        value = meta.get(key)
+        if isinstance(cond, dict):
+            if "$in" in cond and value not in cond["$in"]:
+                return False
+            if "$eq" in cond and value != cond["$eq"]:
+                return False
+        elif value != cond:
+            return False
+    return True
+
+
+class LocalVectorStore:
+    """Read-only, memory-mapped view of a vector snapshot with exact cosine search."""
+
+    def __init__(self, path: str, scan_block: int = 65536, rescore_factor: int = 10, nprobe: int = 8):
+        manifest_path = os.path.join(path, "manifest.json")
+        if not os.path.exists(manifest_path):
+            raise RetrievalError(f"No vector snapshot found at {path}")
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format_version") != FORMAT_VERSION:
+            raise RetrievalError(
+                f"Snapshot format v{self.manifest.get('format_version')} is not supported "
+                f"(expected v{FORMAT_VERSION})"
+            )
+
+        self.path = path
+        self.count = self.manifest["count"]
+        self.dim = self.manifest["dim"]
+        self.scan_block = scan_block
+        self.vectors = _memmap(
+            os.path.join(path, "vectors.bin"), self.manifest["dtype"], shape=(self.count, self.dim)
+        )
+        self._id_data = _memmap(os.path.join(path, "ids.dat"), np.uint8)
+        self._id_offsets = _memmap(os.path.join(path, "ids.idx"), np.uint64)
+        self._meta_data = _memmap(os.path.join(path, "meta.dat"), np.uint8)
+        self._meta_offsets = _memmap(os.path.join(path, "meta.idx"), np.uint64)
+        order_path = os.path.join(path, "ids.order")
+        self._id_order = _memmap(order_path, np.uint64) if os.path.exists(order_path) else None
+        self._rows: Optional[Dict[str, int]] = None
+        # field -> (per-row codes, {value: code}) for filters evaluated without parsing metadata
+        self.columns: Dict[str, Tuple[np.ndarray, Dict[str, int]]] = {
+            field: (_memmap(os.path.join(path, f"col.{field}"), np.int32), {v: i for i, v in enumerate(vocab)})
+            for field, vocab in self.manifest.get("columns", {}).items()
+        }
+
+        # Optional int8 / truncated first-pass index
+        self.rescore_factor = rescore_factor
+        self.coarse = None
+        self.coarse_scales = None
+        self.coarse_dim = None
+        if self.manifest.get("coarse"):
+            self.coarse_dim = self.manifest["coarse"]["dim"]
+            self.coarse = _memmap(os.path.join(path, "coarse.bin"), np.int8, shape=(self.count, self.coarse_dim))
+            self.coarse_scales = _memmap(os.path.join(path, "coarse.scale"), np.float32)
+
+        # Optional IVF index: only the nprobe closest lists are scanned
+        self.nprobe = nprobe
+        self.ivf = IVFIndex.load(path, self.dim) if self.manifest.get("ivf") else None
+        logger.info(
+            f"LocalVectorStore opened {path} ({self.count} x {self.dim}, {self.manifest['dtype']}"
+            + (f", int8 first pass on {self.coarse_dim} dims" if self.coarse is not None else "")
+            + (f", IVF {self.ivf.nlist} lists" if self.ivf is not None else "") + ")"
+        )
+
+    # --------------------- ROW ACCESS ---------------------
+    def _id_bytes(self, row: int) -> bytes:
+        start, end = int(self._id_offsets[row]), int(self._id_offsets[row + 1])
+        return bytes(self._id_data[start:end])
+
+    def id_at(self, row: int) -> str:
+        return self._id_bytes(row).decode("utf-8")
+
+    def metadata_at(self, row: int) -> Dict:
+        start, end = int(self._meta_offsets[row]), int(self._meta_offsets[row + 1])
+        return json.loads(bytes(self._meta_data[start:end]))
+
+    def row_of(self, node_id: str) -> Optional[int]:
+        """Map an id to its row by binary search over ids.order (no per-process table)."""
+        if self._id_order is None:
+            # Snapshots written before ids.order: build the lookup table on first use
+            if self._rows is None:
+                self._rows = {self.id_at(i): i for i in range(self.count)}
+            return self._rows.get(node_id)
+        target = node_id.encode("utf-8")
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._id_bytes(int(self._id_order[mid])) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count and self._id_bytes(int(self._id_order[lo])) == target:
+            return int(self._id_order[lo])
+        return None
+
+    def vector(self, node_id: str) -> Optional[np.ndarray]:
+        row = self.row_of(node_id)
+        return None if row is None else np.asarray(self.vectors[row], dtype=np.float32)
+
+    # --------------------- SEARCH ---------------------
+    def _scores(self, query: np.ndarray) -> np.ndarray:
+        """Cosine scores for every row, scanned in blocks to bound temporary memory."""
+        scores = np.empty(self.count, dtype=np.float32)
+        for start in range(0, self.count, self.scan_block):
+            block = self.vectors[start:start + self.scan_block]
+            scores[start:start + len(block)] = block.astype(np.float32, copy=False) @ query
+        return scores
+
+    def _coarse_scores(self, query: np.ndarray) -> np.ndarray:
+        """Approximate scores from the int8 truncated matrix (same blocked scan)."""
+        q = _truncate_query(query, self.coarse_dim)
+        scores = np.empty(self.count, dtype=np.float32)
+        # int8 blocks are widened to float32 for BLAS; small blocks keep that copy in cache
+        step = min(self.scan_block, COARSE_SCAN_BLOCK)
+        for start in range(0, self.count, step):
+            block = self.coarse[start:start + step]
+            scores[start:start + len(block)] = (block.astype(np.float32) @ q) * self.coarse_scales[start:start + len(block)]
+        return scores
+
+    def _rescore(self, rows: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """Exact scores for a shortlist; reads only those rows of vectors.bin."""
+        rows = np.sort(rows)
+        exact = np.asarray(self.vectors[rows], dtype=np.float32) @ query
+        order = np.argsort(-exact)
+        return rows[order], exact[order]
+
+    def _normalize(self, vector: Iterable[float]) -> np.ndarray:
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        return query / norm if norm > 0 else query
+
+    def _filter_mask(self, flt: Dict, rows: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        """
+        Which of `rows` (default: all) match the filter, from the column codes. None
+        when the filter uses a field or operator the columns cannot answer; the
+        caller parses the metadata then.
+        """
+        mask = np.ones(self.count if rows is None else len(rows), dtype=bool)
+        for key, cond in flt.items():
+            if key == "$and":
+                for sub in cond:
+                    sub_mask = self._filter_mask(sub, rows)
+                    if sub_mask is None:
+                        return None
+                    mask &= sub_mask
+                continue
+            if key not in self.columns:
+                return None
+            if not isinstance(cond, dict):
+                cond = {"$eq": cond}
+            elif set(cond) - {"$in", "$eq"}:
+                return None
+            codes, vocab = self.columns[key]
+            if rows is not None:
+                codes = codes[rows]
+            for op, values in cond.items():
+                values = values if op == "$in" else [values]
+                wanted = [vocab[v] for v in values if isinstance(v, str) and v in vocab]
+                if None in values:
+                    wanted.append(-1)
+                mask &= np.isin(codes, wanted)
+        return mask
+
+    def _collect(self, rows, scores, top_k: int, filter: Optional[Dict]) -> List[Dict]:
+        rows = np.asarray(rows, dtype=np.int64)
+        mask = self._filter_mask(filter, rows) if filter else None
+        matches = []
+        for i, (row, score) in enumerate(zip(rows, scores)):
+            row = int(row)
+            if mask is not None and not mask[i]:
+                continue
+            meta = self.metadata_at(row)
+            if mask is None and not _matches_filter(meta, filter):
+                continue
+            matches.append({"id": self.id_at(row), "score": float(score), "metadata": meta})
+            if len(matches) >= top_k:
+                break
+        return matches
+
+    def _search_exact(self, query: np.ndarray, top_k: int, filter: Optional[Dict]) -> List[Dict]:
+        scores = self._scores(query)
+        mask = self._filter_mask(filter) if filter else None
+        if filter and mask is None:
+            order = np.argsort(-scores)
+            return self._collect(order, scores[order], top_k, filter)
+        rows = np.flatnonzero(mask) if mask is not None else np.arange(self.count)
+        if len(rows) == 0:
+            return []
+        k = min(top_k, len(rows))
+        order = rows[np.argpartition(-scores[rows], k - 1)[:k]]
+        order = order[np.argsort(-scores[order])]
+        return self._collect(order, scores[order], top_k, None)
+
+    def _search_ivf(self, query: np.ndarray, top_k: int, filter: Optional[Dict], nprobe: int) -> List[Dict]:
+        candidates = self.ivf.probe(query, nprobe)
+        shortlist = top_k * self.rescore_factor * (4 if filter else 1)
+        if self.coarse is not None and len(candidates) > shortlist:
+            # int8 scores over the probed lists pick the rows worth rescoring
+            q = _truncate_query(query, self.coarse_dim)
+            rows = np.sort(candidates)
+            approx = (np.asarray(self.coarse[rows], dtype=np.float32) @ q) * self.coarse_scales[rows]
+            candidates = rows[np.argpartition(-approx, shortlist - 1)[:shortlist]]
+        if len(candidates) == 0:
+            return []
+        rows, scores = self._rescore(candidates, query)
+        matches = self._collect(rows, scores, top_k, filter)
+        if filter and len(matches) < top_k:
+            return self._search_exact(query, top_k, filter)
+        return matches
+
+    def search(
+        self,
+        vector: Iterable[float],
+        top_k: int = 5,
+        filter: Optional[Dict] = None,
+        exact: bool = False,
+        nprobe: Optional[int] = None,
+    ) -> List[Dict]:
+        """
+        Return Pinecone-shaped matches ({id, score, metadata}) for the query vector.
+        With an IVF index (and exact=False) only the `nprobe` closest lists are
+        scored. With a coarse index the int8 pass picks a shortlist of
+        top_k * rescore_factor rows that is rescored at full precision.
+        """
+        if self.count == 0:
+            return []
+        query = self._normalize(vector)
+        if not exact and self.ivf is not None:
+            return self._search_ivf(query, top_k, filter, nprobe or self.nprobe)
+        if exact or self.coarse is None:
+            return self._search_exact(query, top_k, filter)
+
+        shortlist = min(self.count, top_k * self.rescore_factor * (4 if filter else 1))
+        approx = self._coarse_scores(query)
+        candidates = np.argpartition(-approx, shortlist - 1)[:shortlist]
+        rows, scores = self._rescore(candidates, query)
+        matches = self._collect(rows, scores, top_k, filter)
+        if filter and len(matches) < top_k and shortlist < self.count:
+            # A selective filter can empty the shortlist; fall back to the exact scan
+            return self._search_exact(query, top_k, filter)
+        return matches
+
+    # --------------------- EVALUATION ---------------------
+    def evaluate_recall(
+        self, k: int = 10, samples: int = 200, noise: float = 0.05, seed: int = 0, nprobe: Optional[int] = None
+    ) -> Dict:
+        """
+        recall@k of the two-stage search against exact search. Queries are stored
+        rows perturbed with Gaussian noise, so they are realistic but not exact hits.
+        """
+        if self.coarse is None and self.ivf is None:
+            raise RetrievalError("Snapshot has no coarse or IVF index to evaluate")
+        rng = np.random.default_rng(seed)
+        picks = rng.choice(self.count, size=min(samples, self.count), replace=False)
+        recall, exact_time, fast_time = 0.0, 0.0, 0.0
+        for row in picks:
+            query = np.asarray(self.vectors[row], dtype=np.float32)
+            query = query + rng.normal(0, noise / np.sqrt(self.dim), self.dim).astype(np.float32)
+
+            start = time.perf_counter()
+            truth = {m["id"] for m in self.search(query, k, exact=True)}
+            exact_time += time.perf_counter() - start
+            start = time.perf_counter()
+            found = {m["id"] for m in self.search(query, k, nprobe=nprobe)}
+            fast_time += time.perf_counter() - start
+            recall += len(truth & found) / max(len(truth), 1)
+
+        n = len(picks)
+        full_bytes = self.dim * self.vectors.dtype.itemsize
+        coarse_bytes = self.coarse_dim + 4 if self.coarse is not None else full_bytes
+        return {
+            "k": k,
+            "queries": n,
+            "nprobe": (nprobe or self.nprobe) if self.ivf is not None else None,
+            "recall_at_k": round(recall / n, 4),
+            "exact_ms": round(exact_time / n * 1000, 3),
+            "two_stage_ms": round(fast_time / n * 1000, 3),
+            "bytes_per_vector_full": full_bytes,
+            "bytes_per_vector_scan": coarse_bytes,
+            "scan_compression": round(full_bytes / coarse_bytes, 1),
+        }
+
+
+def build_coarse_index(path: str, coarse_dim: int, block: int = 65536):
+    """Add (or replace) the int8 first-pass index of an existing snapshot."""
+    store = LocalVectorStore(path)
+    coarse_dim = min(coarse_dim, store.dim)
+    coarse_tmp = os.path.join(path, "coarse.bin.tmp")
+    scales = []
+    with open(coarse_tmp, "wb") as f:
+        for start in range(0, store.count, block):
+            quantized, block_scales = quantize_rows(store.vectors[start:start + block], coarse_dim)
+            f.write(quantized.tobytes())
+            scales.append(block_scales)
+    scale_tmp = os.path.join(path, "coarse.scale.tmp")
+    (np.concatenate(scales) if scales else np.zeros(0, np.float32)).tofile(scale_tmp)
+    os.replace(coarse_tmp, os.path.join(path, "coarse.bin"))
+    os.replace(scale_tmp, os.path.join(path, "coarse.scale"))
+
+    manifest = dict(store.manifest, coarse={"quantization": "int8", "dim": coarse_dim})
+    manifest_tmp = os.path.join(path, "manifest.json.tmp")
+    with open(manifest_tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_tmp, os.path.join(path, "manifest.json"))
+    logger.info(f"Built int8 coarse index ({coarse_dim} dims) for {store.count} rows in {path}")
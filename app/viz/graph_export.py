@@ -0,0 +1,264 @@
+"""
+app/viz/graph_export.py
+Graph visualization pipeline that scales past a few thousand edges.
+
+    edge stream (Neo4j pages or dataset file)
+        -> GraphAggregator (community = city; member ids and link counts, no edge list kept)
+        -> overview graph, or a sampled drill-down into one community
+        -> PyVis HTML rendered in memory (FragmentCache keyed by fact-set hash)
+"""
+
+import hashlib
+import logging
+import random
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from pyvis.network import Network
+
+from app.ingest.dataset_reader import iter_nodes
+
+logger = logging.getLogger(__name__)
+
+TYPE_COLORS = {
+    "City": "#03A9F4",
+    "Attraction": "#FF9800",
+    "Hotel": "#8BC34A",
+    "Activity": "#E91E63",
+}
+DEFAULT_COLOR = "#9E9E9E"
+
+
+class Edge(NamedTuple):
+    source_id: str
+    source_name: str
+    source_type: str
+    source_community: str
+    rel: str
+    target_id: str
+    target_name: str
+    target_type: str
+    target_community: str
+
+
+def community_of(node: Dict) -> str:
+    """Cities are their own community; everything else belongs to its city."""
+    if node.get("type") == "City":
+        return node.get("name") or node.get("id", "")
+    return node.get("city") or "Unknown"
+
+
+# --------------------- EDGE SOURCES ---------------------
+# A page is a range of source nodes (an index seek on the unique Entity.id),
+# expanded to all of their outgoing edges. Nodes without edges return one row
+# with a null relationship so the next page still starts after them.
+EDGE_PAGE_QUERY = (
+    "MATCH (a:Entity) WHERE a.id > $after_id "
+    "WITH a ORDER BY a.id LIMIT $limit "
+    "OPTIONAL MATCH (a)-[r]->(b:Entity) "
+    "RETURN a.id AS a_id, a.name AS a_name, a.type AS a_type, a.city AS a_city, "
+    "type(r) AS rel, "
+    "b.id AS b_id, b.name AS b_name, b.type AS b_type, b.city AS b_city "
+    "ORDER BY a.id"
+)
+
+
+def _community(node_type: Optional[str], name: Optional[str], city: Optional[str]) -> str:
+    return community_of({"type": node_type, "name": name, "city": city})
+
+
+def iter_neo4j_edges(driver, page_size: int = 500) -> Iterator[Edge]:
+    """
+    Stream every relationship, `page_size` source nodes at a time. Each page
+    seeks past the last source id in the Entity.id index, so it costs the same
+    however deep into the graph it is.
+    """
+    after_id = ""
+    with driver.session() as session:
+        while True:
+            rows = session.execute_read(
+                lambda tx: list(tx.run(EDGE_PAGE_QUERY, after_id=after_id, limit=page_size))
+            )
+            sources = set()
+            for r in rows:
+                sources.add(r["a_id"])
+                if r["rel"] is None:
+                    continue
+                yield Edge(
+                    r["a_id"], r["a_name"] or r["a_id"], r["a_type"] or "Entity",
+                    _community(r["a_type"], r["a_name"], r["a_city"]),
+                    r["rel"],
+                    r["b_id"], r["b_name"] or r["b_id"], r["b_type"] or "Entity",
+                    _community(r["b_type"], r["b_name"], r["b_city"]),
+                )
+            if len(sources) < page_size:
+                return
+            after_id = rows[-1]["a_id"]
+
+
+def iter_dataset_edges(path: str, strict: bool = False) -> Iterator[Edge]:
+    """
+    Stream edges straight from the dataset file (no Neo4j needed). The file is
+    read twice: once for a compact node index, once for the connections.
+    """
+    index: Dict[str, Tuple[str, str, str]] = {}
+    for node in iter_nodes(path, strict=strict):
+        index[node["id"]] = (node.get("name") or node["id"], node.get("type", "Entity"), community_of(node))
+    for node in iter_nodes(path, strict=strict):
+        src_name, src_type, src_comm = index[node["id"]]
+        for conn in node.get("connections", []):
+            target = index.get(conn.get("target"))
+            if target is None:
+                continue
+            yield Edge(
+                node["id"], src_name, src_type, src_comm, conn.get("relation", "RELATED_TO"),
+                conn["target"], target[0], target[1], target[2],
+            )
+
+
+# --------------------- AGGREGATION ---------------------
+class GraphAggregator:
+    """
+    Consumes an edge stream once without keeping the edges: it holds the set of
+    node ids in each community (so memory grows with nodes, not edges), edge
+    counts between communities and relation counts. With `community` set it
+    also keeps a uniform reservoir sample of that community's edges.
+    """
+
+    def __init__(self, community: Optional[str] = None, max_edges: int = 1500, seed: int = 0):
+        self.community = community
+        self.max_edges = max_edges
+        self.members: Dict[str, set] = defaultdict(set)
+        self.links: Counter = Counter()
+        self.relations: Counter = Counter()
+        self.edge_count = 0
+        self.sample: List[Edge] = []
+        self._seen_in_community = 0
+        self._rng = random.Random(seed)
+
+    def add(self, edge: Edge):
+        self.edge_count += 1
+        self.members[edge.source_community].add(edge.source_id)
+        self.members[edge.target_community].add(edge.target_id)
+        self.relations[edge.rel] += 1
+        if edge.source_community != edge.target_community:
+            self.links[tuple(sorted((edge.source_community, edge.target_community)))] += 1
+
+        if self.community is not None and self.community in (edge.source_community, edge.target_community):
+            # Reservoir sampling keeps the drill-down bounded and unbiased
+            self._seen_in_community += 1
+            if len(self.sample) < self.max_edges:
+                self.sample.append(edge)
+            else:
+                j = self._rng.randrange(self._seen_in_community)
+                if j < self.max_edges:
+                    self.sample[j] = edge
+
+    def consume(self, edges: Iterable[Edge]) -> "GraphAggregator":
+        for edge in edges:
+            self.add(edge)
+        logger.info(
+            f"[VIZ] Aggregated {self.edge_count} edges into {len(self.members)} communities"
+            + (f"; sampled {len(self.sample)} of {self._seen_in_community} in {self.community}" if self.community else "")
+        )
+        return self
+
+    @property
+    def sampled(self) -> bool:
+        return self._seen_in_community > len(self.sample)
+
+    def communities(self) -> List[Tuple[str, int]]:
+        return sorted(((c, len(ids)) for c, ids in self.members.items()), key=lambda x: -x[1])
+
+
+# --------------------- RENDERING ---------------------
+def _new_network(height: str) -> Network:
+    net = Network(height=height, width="100%", bgcolor="#ffffff", font_color="black", directed=True)
+    net.force_atlas_2based(gravity=-30, spring_length=100)
+    return net
+
+
+def render_overview(agg: GraphAggregator, height: str = "900px") -> str:
+    """One node per community sized by membership, edges weighted by link count."""
+    net = _new_network(height)
+    net.directed = False
+    for community, size in agg.communities():
+        net.add_node(community, label=f"{community}\n({size})", value=size,
+                     title=f"{community}: {size} entities", color=TYPE_COLORS["City"])
+    for (a, b), count in agg.links.items():
+        net.add_edge(a, b, value=count, title=f"{count} relationships")
+    return net.generate_html()
+
+
+def render_edges(edges: Iterable[Edge], height: str = "900px") -> str:
+    net = _new_network(height)
+    for e in edges:
+        net.add_node(e.source_id, label=e.source_name, title=f"{e.source_name} ({e.source_type})",
+                     color=TYPE_COLORS.get(e.source_type, DEFAULT_COLOR))
+        net.add_node(e.target_id, label=e.target_name, title=f"{e.target_name} ({e.target_type})",
+                     color=TYPE_COLORS.get(e.target_type, DEFAULT_COLOR))
+        net.add_edge(e.source_id, e.target_id, title=e.rel)
+    return net.generate_html()
+
+
+def render_facts(facts: List[Dict], height: str = "550px") -> str:
+    """Render chat graph facts ({source, rel, target_id, target_name}) as HTML."""
+    net = _new_network(height)
+    for fact in facts:
+        src = fact.get("source", "Unknown")
+        tgt = fact.get("target_id") or fact.get("target_name", "Unknown")
+        net.add_node(src, label=src, color=TYPE_COLORS["City"])
+        net.add_node(tgt, label=fact.get("target_name") or tgt, color=TYPE_COLORS["Attraction"])
+        net.add_edge(src, tgt, label=fact.get("rel", "related_to"))
+    return net.generate_html()
+
+
+# --------------------- FRAGMENT CACHE ---------------------
+def fact_set_hash(facts: List[Dict]) -> str:
+    """Order-independent hash of a fact set, so the same graph renders once."""
+    keys = sorted(
+        f"{f.get('source')}|{f.get('rel')}|{f.get('target_id') or f.get('target_name')}" for f in facts
+    )
+    return hashlib.sha1("\n".join(keys).encode("utf-8")).hexdigest()
+
+
+class FragmentCache:
+    """Small thread-safe LRU of rendered HTML fragments."""
+
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_render(self, key: str, render) -> str:
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return html
+            self.misses += 1
+        html = render()
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return html
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Process-wide cache shared by every UI session
+fragment_cache = FragmentCache()
+
+
+def facts_html(facts: List[Dict], height: str = "550px") -> str:
+    """Cached render of a chat answer's graph facts."""
+    return fragment_cache.get_or_render(
+        f"{height}:{fact_set_hash(facts)}", lambda: render_facts(facts, height)
+    )
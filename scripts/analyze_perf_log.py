@@ -0,0 +1,153 @@
+"""
+Summarise the per-query performance log written by AsyncHybridChat
+(every process's file for PERF_LOG_PATH, rotated files included).
+
+Reports the slowest pipeline stages, cache hit ratios over time and the most
+expensive queries. Queries are only stored as hashes; with --app-log the query
+text is taken from the DEBUG "Handling user query" lines of the application log
+(LOG_LEVEL=DEBUG) and matched to the records by query hash.
+
+Usage:
+  python -m scripts.analyze_perf_log
+  python -m scripts.analyze_perf_log --bucket 15 --top 20 --sort latency
+  python -m scripts.analyze_perf_log --since 24 --app-log logs/app.log
+"""
+
+import argparse
+import os
+import time
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from app.config_loader import Config
+from app.hybrid.warmup import logged_query
+from app.utils.perf_log import query_hash, read_records
+
+
+def total_tokens(record):
+    return sum(record.get("tokens", {}).values())
+
+
+def query_texts(app_log, hashes):
+    """query hash -> query text, from the DEBUG "Handling user query" lines of the app log."""
+    texts = {}
+    if not app_log or not os.path.exists(app_log):
+        return texts
+    with open(app_log, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            query = logged_query(line.strip())
+            if query:
+                key = query_hash(query)
+                if key in hashes and key not in texts:
+                    texts[key] = query
+    return texts
+
+
+def report_overview(records):
+    errors = Counter(r["error"] for r in records if r.get("error"))
+    sources = Counter(r.get("source") or "error" for r in records)
+    start = time.strftime("%Y-%m-%d %H:%M", time.localtime(records[0]["ts"]))
+    end = time.strftime("%Y-%m-%d %H:%M", time.localtime(records[-1]["ts"]))
+    print(f"{len(records)} queries from {start} to {end}")
+    print("  by source: " + ", ".join(f"{k}={v}" for k, v in sources.most_common()))
+    if errors:
+        print("  errors:    " + ", ".join(f"{k}={v}" for k, v in errors.most_common()))
+    retries = sum(r.get("retries", 0) for r in records)
+    print(f"  retries:   {retries} ({sum(1 for r in records if r.get('retries'))} queries)")
+    print(f"  tokens:    {sum(total_tokens(r) for r in records):,}")
+    print(f"  cost:      ${sum(r.get('cost_usd', 0.0) for r in records):.4f}")
+
+
+def report_stages(records):
+    timings = defaultdict(list)
+    for r in records:
+        for stage, ms in r.get("stages_ms", {}).items():
+            timings[stage].append(ms)
+    total = sum(timings.get("total", [])) or 1.0
+    print(f"\n{'stage':<16}{'count':>8}{'avg ms':>10}{'p50':>10}{'p95':>10}{'max':>10}{'% of total':>12}")
+    rows = sorted(timings.items(), key=lambda kv: -np.percentile(kv[1], 95))
+    for stage, values in rows:
+        v = np.asarray(values)
+        share = "" if stage == "total" else f"{100 * v.sum() / total:.1f}%"
+        print(f"{stage:<16}{len(v):>8}{v.mean():>10.1f}{np.percentile(v, 50):>10.1f}"
+              f"{np.percentile(v, 95):>10.1f}{v.max():>10.1f}{share:>12}")
+
+
+def report_trend(records, bucket_minutes):
+    buckets = defaultdict(list)
+    for r in records:
+        buckets[int(r["ts"] // (bucket_minutes * 60))].append(r)
+    print(f"\n{'period':<18}{'queries':>8}{'hit %':>8}{'stale %':>9}{'fast %':>8}{'p95 ms':>10}{'tokens':>10}")
+    for key in sorted(buckets):
+        rs = buckets[key]
+        looked_up = [r for r in rs if r.get("cache") not in (None, "bypass")]
+        hits = sum(1 for r in looked_up if r["cache"] != "miss")
+        stale = sum(1 for r in looked_up if r["cache"] == "stale")
+        fast = sum(1 for r in rs if r.get("cache") == "bypass")
+        totals = [r["stages_ms"]["total"] for r in rs if "total" in r.get("stages_ms", {})]
+        p95 = np.percentile(totals, 95) if totals else 0.0
+        label = time.strftime("%m-%d %H:%M", time.localtime(key * bucket_minutes * 60))
+        hit_pct = f"{100 * hits / len(looked_up):.0f}" if looked_up else "-"
+        stale_pct = f"{100 * stale / len(looked_up):.0f}" if looked_up else "-"
+        print(f"{label:<18}{len(rs):>8}{hit_pct:>8}{stale_pct:>9}{100 * fast / len(rs):>8.0f}"
+              f"{p95:>10.0f}{sum(total_tokens(r) for r in rs):>10,}")
+
+
+def report_expensive(records, top, sort, app_log):
+    groups = defaultdict(list)
+    for r in records:
+        groups[r["query_hash"]].append(r)
+    stats = []
+    for query_hash, rs in groups.items():
+        totals = [r["stages_ms"].get("total", 0.0) for r in rs]
+        stats.append({
+            "hash": query_hash,
+            "count": len(rs),
+            "tokens": sum(total_tokens(r) for r in rs),
+            "cost": sum(r.get("cost_usd", 0.0) for r in rs),
+            "avg_ms": float(np.mean(totals)),
+            "max_ms": float(np.max(totals)),
+            "misses": sum(1 for r in rs if r.get("cache") == "miss"),
+        })
+    key = {"cost": "cost", "tokens": "tokens", "latency": "avg_ms", "count": "count"}[sort]
+    stats.sort(key=lambda s: -s[key])
+    stats = stats[:top]
+    texts = query_texts(app_log, {s["hash"] for s in stats})
+
+    print(f"\nTop {len(stats)} queries by {sort}")
+    print(f"{'query':<42}{'count':>7}{'misses':>8}{'tokens':>10}{'cost $':>10}{'avg ms':>10}{'max ms':>10}")
+    for s in stats:
+        text = texts.get(s["hash"])
+        label = (text[:39] + "...") if text and len(text) > 42 else (text or s["hash"])
+        print(f"{label:<42}{s['count']:>7}{s['misses']:>8}{s['tokens']:>10,}{s['cost']:>10.4f}"
+              f"{s['avg_ms']:>10.0f}{s['max_ms']:>10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report slow stages, cache hit ratios and expensive queries")
+    parser.add_argument("--path", default=Config.PERF_LOG_PATH)
+    parser.add_argument("--since", type=float, help="Only the last N hours")
+    parser.add_argument("--bucket", type=float, default=60, help="Trend period in minutes")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--sort", choices=["cost", "tokens", "latency", "count"], default="cost")
+    parser.add_argument("--app-log", default="logs/app.log", help="App log with DEBUG query lines to show query text ('' to skip)")
+    args = parser.parse_args()
+
+    records = [r for r in read_records(args.path) if "ts" in r and "query_hash" in r]
+    if args.since:
+        cutoff = time.time() - args.since * 3600
+        records = [r for r in records if r["ts"] >= cutoff]
+    if not records:
+        print(f"No perf records in {args.path}")
+        return
+    records.sort(key=lambda r: r["ts"])
+
+    report_overview(records)
+    report_stages(records)
+    report_trend(records, args.bucket)
+    report_expensive(records, args.top, args.sort, args.app_log)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Benchmark IVF approximate search against exact search on synthetic, scaled
+versions of the travel dataset.
+
+Every dataset node becomes the centre of a cluster of synthetic vectors
+(nodes of the same city share a city direction, so the clusters overlap the
+way real POI embeddings do). For each size the snapshot is built, the IVF index
+trained, and nprobe swept; the script writes a CSV and prints a text plot of
+recall@k against latency.
+
+Usage:
+  python -m scripts.benchmark_ann                              -> 10k, 100k rows at 256 dims
+  python -m scripts.benchmark_ann --sizes 300000 --dim 1536    -> closer to production
+  python -m scripts.benchmark_ann --nprobe 1 2 4 8 16 32 --quantize
+"""
+
+import argparse
+import csv
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+from app.ingest.dataset_reader import iter_nodes
+from app.vectorstore.ivf import build_ivf_index
+from app.vectorstore.snapshot import LocalVectorStore, SnapshotWriter, build_coarse_index
+
+DATA_FILE = "data/vietnam_travel_dataset.json"
+OUTPUT_CSV = os.path.join("outputs", "ann_benchmark.csv")
+
+
+def synthetic_vectors(nodes, count, dim, seed):
+    """Yield (id, vector, metadata) rows clustered around the dataset's nodes."""
+    rng = np.random.default_rng(seed)
+    city_dirs = {}
+    centres = []
+    for node in nodes:
+        city = node.get("city") or node.get("name")
+        if city not in city_dirs:
+            city_dirs[city] = rng.normal(size=dim)
+        centres.append(city_dirs[city] + 0.6 * rng.normal(size=dim))
+    centres = np.asarray(centres, dtype=np.float32)
+    centres /= np.linalg.norm(centres, axis=1, keepdims=True)
+    for i in range(count):
+        j = i % len(nodes)
+        vec = centres[j] + rng.normal(0, 0.35 / np.sqrt(dim), dim).astype(np.float32)
+        yield f"{nodes[j]['id']}#{i}", vec, {"type": nodes[j].get("type"), "city": nodes[j].get("city")}
+
+
+def time_queries(store, queries, k, **kwargs):
+    results, start = [], time.perf_counter()
+    for q in queries:
+        results.append([m["id"] for m in store.search(q, k, **kwargs)])
+    return results, (time.perf_counter() - start) / len(queries) * 1000
+
+
+def text_plot(rows, width=60, height=16):
+    """Scatter of recall (y) against latency (x) using one letter per size."""
+    if not rows:
+        return ""
+    x_max = max(r["latency_ms"] for r in rows) or 1.0
+    y_min = min(0.9, np.floor(min(r["recall"] for r in rows) * 10) / 10)
+    grid = [[" "] * (width + 1) for _ in range(height + 1)]
+    sizes = sorted({r["rows"] for r in rows})
+    marks = {size: chr(ord("A") + i) for i, size in enumerate(sizes)}
+    for r in rows:
+        x = int(r["latency_ms"] / x_max * width)
+        y = height - int((r["recall"] - y_min) / (1 - y_min) * height)
+        grid[y][x] = marks[r["rows"]] if r["method"] == "ivf" else "*"
+    lines = [f"{1 - i / height * (1 - y_min):4.2f} |" + "".join(line) for i, line in enumerate(grid)]
+    lines.append("     +" + "-" * (width + 1))
+    lines.append(f"      0 ms{' ' * (width - 14)}{x_max:.2f} ms")
+    lines.append("      " + "  ".join(f"{m}={size} rows (ivf)" for size, m in marks.items()) + "  *=exact")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark IVF recall@k and latency against exact search")
+    parser.add_argument("--data", default=DATA_FILE)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--nlist", type=int, help="IVF lists (default ~sqrt(rows))")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--quantize", action="store_true", help="Also add the int8 first pass (quarter of dims)")
+    parser.add_argument("--query-noise", type=float, default=0.8, help="Norm of the noise added to query rows")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=OUTPUT_CSV)
+    args = parser.parse_args()
+
+    nodes = list(iter_nodes(args.data, strict=False))
+    rng = np.random.default_rng(args.seed + 1)
+    rows = []
+    workdir = tempfile.mkdtemp(prefix="ann-bench-")
+    try:
+        for size in args.sizes:
+            path = os.path.join(workdir, f"snap-{size}")
+            with SnapshotWriter(path, args.dim) as writer:
+                for node_id, vec, meta in synthetic_vectors(nodes, size, args.dim, args.seed):
+                    writer.add(node_id, vec, meta)
+            if args.quantize:
+                build_coarse_index(path, max(1, args.dim // 4))
+            build = build_ivf_index(path, nlist=args.nlist, seed=args.seed)
+            store = LocalVectorStore(path)
+
+            # Queries: stored rows pushed well off their cluster, like a user's paraphrase
+            picks = rng.choice(size, size=args.queries, replace=False)
+            queries = [np.asarray(store.vectors[p], dtype=np.float32)
+                       + rng.normal(0, args.query_noise / np.sqrt(args.dim), args.dim).astype(np.float32)
+                       for p in picks]
+            truth, exact_ms = time_queries(store, queries, args.k, exact=True)
+            rows.append({"rows": size, "method": "exact", "nlist": "", "nprobe": "",
+                         "recall": 1.0, "latency_ms": round(exact_ms, 3), "build_s": ""})
+            print(f"[{size} rows] exact: {exact_ms:.2f} ms/query; IVF {build['nlist']} lists built in {build['seconds']}s")
+
+            for nprobe in args.nprobe:
+                if nprobe > build["nlist"]:
+                    continue
+                found, ms = time_queries(store, queries, args.k, nprobe=nprobe)
+                recall = np.mean([len(set(t) & set(f)) / len(t) for t, f in zip(truth, found)])
+                rows.append({"rows": size, "method": "ivf", "nlist": build["nlist"], "nprobe": nprobe,
+                             "recall": round(float(recall), 4), "latency_ms": round(ms, 3), "build_s": build["seconds"]})
+                print(f"    nprobe={nprobe:<3} recall@{args.k}={recall:.3f}  {ms:.2f} ms/query ({exact_ms / ms:.1f}x)")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"\nrecall@{args.k} vs latency")
+    print(text_plot(rows))
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,11 +5,15 @@ Usage:
   python -m scripts.chat_cli                -> interactive prompt
   python -m scripts.chat_cli --query "..."  -> single query
   python -m scripts.chat_cli --no-cache     -> disable caching
+  python -m scripts.chat_cli --profile      -> profile every query into outputs/profiles/
 """
 
 import argparse
+from app.config_loader import Config
 from app.hybrid.hybrid_chat import HybridChat
+from app.hybrid.summary import search_summary
 from app.logger import get_logger
+from app.utils.profiler import RequestProfiler
 from rich.console import Console
 from rich.markdown import Markdown
 
@@ -20,13 +24,15 @@ console = Console()
 
 def run_interactive(chat: HybridChat):
     print("Hybrid Travel Assistant (type 'exit' or Ctrl+C to quit)\n")
+    # One session per interactive run so follow-ups reuse earlier context
+    session_id = chat.new_session()
     try:
         while True:
             q = input("Enter your travel question: ").strip()
             if not q or q.lower() in ("exit", "quit"):
                 break
             print("\nThinking...\n")
-            result = chat.handle_query(q)
+            result = chat.handle_query(q, session_id=session_id)
             print_result(result)
     except KeyboardInterrupt:
         print("\nGoodbye!")
@@ -42,7 +48,11 @@ def print_result(result: dict):
     cached = result.get("cached", False)
     ts = result.get("timestamp", "")
 
-    hdr = f"[bold cyan]{'[Cached]' if cached else '[Fresh]'}[/bold cyan]"
+    if cached:
+        label = "[Cached, refreshing]" if result.get("stale") else "[Cached]"
+    else:
+        label = {"fast_path": "[Fast path]", "degraded": "[Limited]"}.get(result.get("source"), "[Fresh]")
+    hdr = f"[bold cyan]{label}[/bold cyan]"
     console.print(f"\n{hdr} [dim]Response generated at {ts}[/dim]\n")
 
     # --- Print model's main answer ---
@@ -52,9 +62,7 @@ def print_result(result: dict):
         console.print("[red]No answer returned from model.[/red]")
 
     # --- Add summary section ---
-    from app.hybrid.hybrid_retriever import HybridRetriever  # lightweight import here
-    retriever = HybridRetriever()
-    summary = retriever.search_summary(result)
+    summary = search_summary(result)
     console.print("\n[bold yellow]Quick Summary:[/bold yellow]")
     console.print(Markdown(summary))
     console.print()  # spacing
@@ -64,6 +72,21 @@ def print_result(result: dict):
     console.print(f"[green]Semantic matches:[/green] {len(matches)}")
     console.print(f"[green]Graph facts:[/green] {len(facts)}")
 
+    usage = result.get("usage") or {}
+    if usage:
+        console.print(
+            f"[green]Tokens:[/green] {usage.get('prompt_tokens', 0)} prompt, "
+            f"{usage.get('completion_tokens', 0)} completion, {usage.get('embedding_tokens', 0)} embedding "
+            f"(~${usage.get('cost_usd', 0):.4f})"
+        )
+
+    retrieval = result.get("retrieval") or {}
+    if retrieval.get("followup"):
+        console.print(
+            f"[green]Follow-up:[/green] reused {retrieval.get('reused_matches', 0)} matches, "
+            f"{retrieval.get('graph_lookups', 0)} new graph lookups"
+        )
+
     top_ids = [m.get("id") for m in matches[:5]]
     if top_ids:
         console.print(f"[cyan]Top match IDs:[/cyan] {', '.join(top_ids)}")
@@ -84,9 +107,21 @@ def main():
     parser = argparse.ArgumentParser(description="Hybrid Travel Assistant CLI")
     parser.add_argument("--query", type=str, help="Run a single query and exit")
     parser.add_argument("--no-cache", action="store_true", help="Disable retrieval cache")
+    parser.add_argument(
+        "--profile", type=float, nargs="?", const=1.0, metavar="RATE",
+        help=f"Profile queries (all, or this share of them) into {Config.PROFILE_DIR}/",
+    )
     args = parser.parse_args()
 
-    chat = HybridChat(enable_cache=not args.no_cache)
+    profiler = None
+    if args.profile:
+        profiler = RequestProfiler(
+            Config.PROFILE_DIR,
+            args.profile,
+            top_n=Config.PROFILE_TOP_N,
+            interval_ms=Config.PROFILE_INTERVAL_MS,
+        )
+    chat = HybridChat(enable_cache=not args.no_cache, profiler=profiler)
 
     if args.query:
         run_single_query(chat, args.query)
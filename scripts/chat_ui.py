@@ -4,20 +4,16 @@ Combines AI reasoning + Neo4j graph visualization.
 """
 
 import streamlit as st
-from app.hybrid.hybrid_chat import HybridChat
-from app.hybrid.hybrid_retriever import HybridRetriever
-from pyvis.network import Network
-import tempfile
-import os
-import nest_asyncio
-import asyncio
-
-# --- Fix Streamlit event loop issue ---
-nest_asyncio.apply()
-try:
-    asyncio.get_event_loop()
-except RuntimeError:
-    asyncio.set_event_loop(asyncio.new_event_loop())
+from app.hybrid.chat_service import get_chat_service
+from app.hybrid.summary import search_summary
+from app.viz.graph_export import facts_html
+
+
+@st.cache_resource(show_spinner=False)
+def load_chat_service():
+    # One service per server process: every browser session shares its
+    # connection pools, answer cache and event loop
+    return get_chat_service()
 
 # --- Page Config ---
 st.set_page_config(
@@ -32,12 +28,10 @@ st.markdown(
     "get intelligent, connected responses powered by **Pinecone + Neo4j + OpenAI.**"
 )
 
-# --- Initialize session state ---
-if "chat" not in st.session_state:
-    st.session_state.chat = HybridChat(enable_cache=True)
-
-chat = st.session_state.chat
-retriever = HybridRetriever()
+# --- Initialize session state (only the conversation id is per user) ---
+service = load_chat_service()
+if "session_id" not in st.session_state:
+    st.session_state.session_id = service.new_session()
 
 # --- User Input ---
 query = st.text_area(
@@ -56,7 +50,7 @@ if run and query.strip():
 
     try:
         # 1. Run hybrid reasoning
-        result = chat.handle_query(query)
+        result = service.ask(query, session_id=st.session_state.session_id)
         answer = result.get("answer", "")
         matches = result.get("matches", [])
         facts = result.get("graph_facts", [])
@@ -68,37 +62,17 @@ if run and query.strip():
 
         # 3. Display quick summary
         try:
-            summary = retriever.search_summary(result)
+            summary = search_summary(result)
             st.markdown("### 🧩 Quick Summary")
             st.markdown(summary)
         except Exception as e:
             st.warning(f"⚠️ Could not generate summary: {e}")
 
-        # 4. Graph visualization
-        # 4. Graph visualization
+        # 4. Graph visualization (rendered in memory, cached by fact set)
         st.markdown("### 🌐 Knowledge Graph Visualization")
         if facts:
             try:
-                net = Network(height="550px", width="100%", bgcolor="#ffffff", font_color="black", directed=True)
-                net.force_atlas_2based(gravity=-30, spring_length=100)
-
-                for fact in facts:
-                    src = fact.get("source", "Unknown")
-                    tgt = fact.get("target_name", "Unknown")
-                    rel = fact.get("rel", "related_to")
-
-                    net.add_node(src, label=src, color="#03A9F4")
-                    net.add_node(tgt, label=tgt, color="#FF9800")
-                    net.add_edge(src, tgt, label=rel)
-
-                # ✅ FIX: use write_html instead of show()
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".html") as tmpfile:
-                    net.write_html(tmpfile.name)
-                    with open(tmpfile.name, "r", encoding="utf-8") as f:
-                        graph_html = f.read()
-
-                st.components.v1.html(graph_html, height=600, scrolling=True)
-                os.unlink(tmpfile.name)
+                st.components.v1.html(facts_html(facts), height=600, scrolling=True)
             except Exception as e:
                 st.warning(f"⚠️ Graph visualization error: {e}")
         else:
@@ -118,12 +92,14 @@ if run and query.strip():
 with st.sidebar:
     st.header("⚙️ Settings")
     if st.button("🧹 Clear Cache"):
-        chat.clear_cache()
+        # Shared by all users of this server
+        service.clear_cache()
         st.success("Cache cleared!")
 
-    if st.button("🔌 Close Connection"):
-        chat.close()
-        st.warning("Connection closed.")
+    if st.button("🔄 New Conversation"):
+        service.end_session(st.session_state.session_id)
+        st.session_state.session_id = service.new_session()
+        st.success("Started a new conversation.")
 
 st.markdown("---")
 st.caption("💠 Powered by OpenAI + Pinecone + Neo4j | Built by Blue Enigma")
@@ -1,54 +1,150 @@
 # scripts/dashboard.py
 """
-Streamlit dashboard to view Neo4j graph visualization (generated HTML)
-and basic system stats (cache size, retriever index list).
+Streamlit dashboard: live performance panel for the running chat service, plus
+the exported Neo4j graph visualization.
+
+The performance panel only reads the metrics snapshots the services write next
+to METRICS_PATH (one file per process); it opens no Pinecone, Neo4j or OpenAI
+connections.
 
 Run:
     streamlit run scripts/dashboard.py
 """
 
 import os
+import time
+import pandas as pd
 import streamlit as st
+from app.config_loader import Config
 from app.logger import get_logger
-from app.hybrid.hybrid_chat import HybridChat
-from app.retrievers.pinecone_retriever import PineconeRetriever
+from app.utils.metrics import read_snapshots
 
 logger = get_logger(__name__)
 
-st.set_page_config(page_title="Hybrid AI — Neo4j Graph", layout="wide")
+st.set_page_config(page_title="Hybrid AI — Dashboard", layout="wide")
 
-st.title("Hybrid AI - Graph Visualization")
+st.title("Hybrid AI - Dashboard")
 
 # Path to generated HTML
 viz_path = "outputs/neo4j_viz.html"
 
-if not os.path.exists(viz_path):
-    st.warning("Visualization file not found. Generate it first with scripts/visualize_graph.py")
-else:
-    st.markdown("**Neo4j Graph Visualization**")
-    with open(viz_path, "r", encoding="utf-8") as f:
-        html = f.read()
-    st.components.v1.html(html, height=800, scrolling=True)
+
+def counter_rates(snapshot: dict) -> dict:
+    """Per-second counter rates since the previous snapshot this browser session saw."""
+    previous = st.session_state.get("previous_snapshot")
+    st.session_state.previous_snapshot = snapshot
+    if not previous or previous.get("pid") != snapshot.get("pid"):
+        return {}
+    elapsed = snapshot["timestamp"] - previous["timestamp"]
+    if elapsed <= 0:
+        return {}
+    before = previous.get("counters", {})
+    return {
+        name: (value - before.get(name, 0)) / elapsed
+        for name, value in snapshot.get("counters", {}).items()
+    }
+
+
+def ratio(num: float, den: float) -> str:
+    return f"{num / den:.1%}" if den else "—"
+
+
+def performance_panel(snapshot: dict):
+    counters = snapshot.get("counters", {})
+    gauges = snapshot.get("gauges", {})
+    histograms = snapshot.get("histograms", {})
+    rates = counter_rates(snapshot)
+    age = time.time() - snapshot["timestamp"]
+
+    st.caption(f"Service pid {snapshot.get('pid')} · up {snapshot.get('uptime_s', 0):.0f}s · snapshot {age:.1f}s old")
+    if age > 5 * Config.METRICS_EXPORT_INTERVAL:
+        st.warning("Metrics snapshot is stale — is the chat service still running?")
+
+    # --- Headline numbers ---
+    hits, misses = counters.get("cache.hit", 0), counters.get("cache.miss", 0)
+    c1, c2, c3, c4, c5 = st.columns(5)
+    c1.metric("Requests", int(counters.get("requests.total", 0)), f"{rates.get('requests.total', 0):.2f}/s")
+    c2.metric("Errors", int(counters.get("requests.errors", 0)))
+    c3.metric("Cache hit rate", ratio(hits, hits + misses), f"{rates.get('cache.hit', 0):.2f} hits/s")
+    c4.metric("Cache entries", gauges.get("cache.entries") or 0,
+              f"{rates.get('cache.evictions', 0) + rates.get('cache.expired', 0):.2f} evictions/s",
+              delta_color="inverse")
+    c5.metric("Sessions", gauges.get("chat.sessions") or 0)
+
+    # --- Stage latency ---
+    st.subheader("Latency by stage")
+    if histograms:
+        table = pd.DataFrame(
+            {name: {k: v for k, v in h.items() if k != "buckets"} for name, h in sorted(histograms.items())}
+        ).T
+        st.dataframe(table, use_container_width=True)
+        stage = st.selectbox("Histogram", sorted(histograms))
+        buckets = histograms[stage]["buckets"]
+        st.bar_chart(pd.DataFrame({"requests": list(buckets.values())}, index=list(buckets.keys())))
+    else:
+        st.info("No latency samples yet.")
+
+    # --- Reliability, queues and tokens ---
+    col_a, col_b, col_c = st.columns(3)
+    with col_a:
+        st.markdown("**Retries & fallbacks**")
+        st.table(pd.DataFrame(
+            {"count": {k: v for k, v in counters.items()
+                       if k.startswith(("retries.", "fallback.", "openai.retries", "openai.rate_limited"))
+                       or k in ("requests.coalesced", "cache.evictions", "cache.expired")}}
+        ))
+    with col_b:
+        st.markdown("**OpenAI queues**")
+        st.table(pd.DataFrame({"value": {k: v for k, v in gauges.items() if k.startswith("openai.")}}))
+    with col_c:
+        st.markdown("**Token usage & cost**")
+        st.table(pd.DataFrame(
+            {"total": {k: v for k, v in counters.items() if k.startswith(("tokens.", "cost."))},
+             "per min": {k: rates.get(k, 0) * 60 for k in counters if k.startswith(("tokens.", "cost."))}}
+        ))
+        if Config.DAILY_TOKEN_BUDGET > 0:
+            st.caption(
+                f"Daily budget: {gauges.get('budget.tokens_today') or 0:,} of {Config.DAILY_TOKEN_BUDGET:,} "
+                f"tokens ({gauges.get('budget.used_ratio') or 0:.0%})"
+            )
+
+
+perf_tab, graph_tab = st.tabs(["Performance", "Graph"])
+
+with perf_tab:
+    snapshots = read_snapshots(Config.METRICS_PATH)
+    # Processes that stopped leave their last snapshot behind; show live ones when there are any
+    live = [s for s in snapshots if time.time() - s["timestamp"] <= 5 * Config.METRICS_EXPORT_INTERVAL]
+    snapshots = live or snapshots
+    if not snapshots:
+        st.info(f"No metrics next to {Config.METRICS_PATH} yet. Start the chat UI (or any ChatService) to export them.")
+    else:
+        if len(snapshots) > 1:
+            snapshot = st.selectbox(
+                "Service process", snapshots,
+                format_func=lambda s: f"pid {s.get('pid')} · up {s.get('uptime_s', 0):.0f}s",
+            )
+        else:
+            snapshot = snapshots[0]
+        performance_panel(snapshot)
+
+with graph_tab:
+    if not os.path.exists(viz_path):
+        st.warning("Visualization file not found. Generate it first with scripts/visualize_graph.py")
+    else:
+        st.markdown("**Neo4j Graph Visualization**")
+        with open(viz_path, "r", encoding="utf-8") as f:
+            html = f.read()
+        st.components.v1.html(html, height=800, scrolling=True)
 
 st.sidebar.header("System")
 with st.sidebar:
-    st.write("Pinecone index info")
-    try:
-        pr = PineconeRetriever()
-        idxs = pr.pc.list_indexes().names()
-        st.write("Available indexes:", idxs)
-    except Exception as e:
-        st.error(f"Pinecone access error: {e}")
-
+    st.write(f"Pinecone index: `{Config.PINECONE_INDEX_NAME}`")
+    st.write(f"Vector backend: `{Config.VECTOR_BACKEND}` · cache: `{Config.CACHE_BACKEND}`")
     st.write("---")
-    st.write("Hybrid Chat quick test")
-    if st.button("Run sample query"):
-        chat = HybridChat()
-        q = "Suggest a 3-day itinerary in Hanoi"
-        with st.spinner("Getting answer..."):
-            res = chat.handle_query(q)
-        st.markdown("**Answer**")
-        st.write(res["answer"])
-        st.markdown("**Matches & Facts**")
-        st.write({"matches": len(res["matches"]), "graph_facts": len(res["graph_facts"])})
-        chat.close()
+    live = st.checkbox("Live refresh", value=True)
+    interval = st.slider("Refresh every (s)", 1, 30, max(1, int(Config.METRICS_EXPORT_INTERVAL)))
+
+if live:
+    time.sleep(interval)
+    st.experimental_rerun()
@@ -0,0 +1,36 @@
+"""
+Measure the two-stage (int8 first pass + full-precision rescore) search of a
+local vector snapshot against exact search.
+
+Usage:
+  python -m scripts.evaluate_snapshot                          -> recall@10 of data/vector_snapshot
+  python -m scripts.evaluate_snapshot --build-coarse 512       -> (re)build the int8 index on 512 dims first
+  python -m scripts.evaluate_snapshot --k 5 --rescore-factor 4 -> try a smaller shortlist
+"""
+
+import argparse
+import json
+from app.config_loader import Config
+from app.vectorstore.snapshot import LocalVectorStore, build_coarse_index
+
+def main():
+    parser = argparse.ArgumentParser(description="Report recall@k of the quantized snapshot search")
+    parser.add_argument("--snapshot", default=Config.LOCAL_VECTOR_PATH)
+    parser.add_argument("--build-coarse", type=int, metavar="DIM", help="Build the int8 first-pass index on DIM dimensions")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--samples", type=int, default=200, help="Number of sampled queries")
+    parser.add_argument("--noise", type=float, default=0.05, help="Perturbation applied to sampled rows")
+    parser.add_argument("--rescore-factor", type=int, default=Config.LOCAL_VECTOR_RESCORE_FACTOR)
+    args = parser.parse_args()
+
+    if args.build_coarse:
+        build_coarse_index(args.snapshot, args.build_coarse)
+
+    store = LocalVectorStore(args.snapshot, rescore_factor=args.rescore_factor)
+    report = store.evaluate_recall(k=args.k, samples=args.samples, noise=args.noise)
+    report["rescore_factor"] = args.rescore_factor
+    report["coarse_dim"] = store.coarse_dim
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
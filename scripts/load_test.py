@@ -0,0 +1,414 @@
+"""
+Load generator for the Hybrid Travel Assistant.
+
+Replays a query file (or a synthetic mix built from dataset entities) against
+AsyncHybridChat in-process, or against an HTTP endpoint, and reports
+throughput, latency percentiles, error rate and cache hit ratio.
+
+Modes:
+  open    fixed arrival rate (--qps) regardless of how fast answers come back;
+          latency is measured from the scheduled send time, so queueing shows up
+  closed  --concurrency workers, each sending its next query as soon as the
+          previous one finishes
+
+Usage:
+  python -m scripts.load_test --mode closed --concurrency 8 --duration 60
+  python -m scripts.load_test --mode open --qps 20 --warmup 10 --stand-ins
+  python -m scripts.load_test --queries queries.txt --url http://localhost:8000/query
+  python -m scripts.load_test --cassette run.jsonl.gz --cassette-mode record    -> capture real backend calls
+  python -m scripts.load_test --cassette run.jsonl.gz --cassette-mode replay    -> rerun them offline
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import random
+import re
+import time
+import urllib.request
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from app.ingest.dataset_reader import iter_nodes
+from app.logger import get_logger
+from app.retrievers.records import FactRecord, MatchRecord, intern_node
+
+logger = get_logger(__name__)
+
+DATA_FILE = "data/vietnam_travel_dataset.json"
+
+SYNTHETIC_TEMPLATES = {
+    "City": [
+        "Plan a 3-day trip to {name}",
+        "What is {name} known for?",
+        "Best hotels in {name}",
+        "Things to do in {name} with kids",
+        "When is the best time to visit {name}?",
+    ],
+    "Attraction": ["Tell me about {name}", "Is {name} worth visiting?"],
+    "Hotel": ["Is {name} a good place to stay?"],
+    "Activity": ["How do I book {name}?"],
+}
+
+
+# ============================================================
+# Query corpora
+# ============================================================
+def load_queries(path: str) -> List[str]:
+    """One query per line, or JSONL with a "query" field."""
+    queries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                queries.append(json.loads(line)["query"])
+            else:
+                queries.append(line)
+    return queries
+
+
+def synthetic_queries(data_path: str, count: int, seed: int, skew: float) -> List[str]:
+    """
+    Build `count` queries from dataset entities. Popularity follows a Zipf-like
+    distribution (exponent `skew`), so repeated questions exercise the cache the
+    way real traffic does; skew 0 makes every query equally likely.
+    """
+    rng = random.Random(seed)
+    pool = []
+    for node in iter_nodes(data_path, strict=False):
+        for template in SYNTHETIC_TEMPLATES.get(node.get("type"), []):
+            pool.append(template.format(name=node.get("name", node["id"])))
+    rng.shuffle(pool)
+    weights = [1.0 / (rank + 1) ** skew for rank in range(len(pool))]
+    return rng.choices(pool, weights=weights, k=count)
+
+
+# ============================================================
+# Local stand-ins (no Pinecone / Neo4j / OpenAI)
+# ============================================================
+def _jitter(rng: random.Random, mean: float) -> float:
+    return rng.lognormvariate(math.log(mean), 0.35) if mean > 0 else 0.0
+
+
+class StandInVectorRetriever:
+    """Keyword-overlap search over the dataset, with simulated network latency."""
+
+    def __init__(self, nodes: List[Dict], latency: float, seed: int = 0):
+        self.latency = latency
+        self.rng = random.Random(seed)
+        self.docs = []
+        for node in nodes:
+            text = " ".join(str(node.get(k, "")) for k in ("name", "city", "type", "semantic_text"))
+            meta = {k: node[k] for k in ("id", "name", "type", "city", "description") if k in node}
+            self.docs.append((set(re.findall(r"\w+", text.lower())), node["id"], meta))
+
+    def query(self, text: str, top_k: int = 5, filter: Optional[Dict] = None) -> List[Dict]:
+        time.sleep(_jitter(self.rng, self.latency))
+        words = set(re.findall(r"\w+", text.lower()))
+        scored = sorted(
+            ((len(words & tokens) / (len(tokens) or 1), node_id, meta) for tokens, node_id, meta in self.docs),
+            key=lambda x: -x[0],
+        )[:top_k]
+        return [MatchRecord(node_id, score, meta) for score, node_id, meta in scored]
+
+
+class StandInGraphRetriever:
+    """Neighbours straight from the dataset's connections, with simulated latency."""
+
+    def __init__(self, nodes: List[Dict], latency: float, seed: int = 0):
+        self.latency = latency
+        self.rng = random.Random(seed)
+        by_id = {n["id"]: n for n in nodes}
+        self.neighbors = defaultdict(list)
+        for node in nodes:
+            for conn in node.get("connections", []):
+                target = by_id.get(conn.get("target"))
+                if target is None:
+                    continue
+                self.neighbors[node["id"]].append((conn.get("relation", "RELATED_TO"), target))
+                self.neighbors[target["id"]].append((conn.get("relation", "RELATED_TO"), node))
+
+    def fetch_graph_context(self, node_ids: List[str]) -> List[Dict]:
+        time.sleep(_jitter(self.rng, self.latency))
+        facts = []
+        for nid in node_ids:
+            for rel, m in self.neighbors.get(nid, [])[:10]:
+                target = intern_node(m["id"], m.get("name"), m.get("type"), m.get("description"),
+                                     (m.get("type", "Entity"), "Entity"))
+                facts.append(FactRecord(nid, rel, target))
+        return facts
+
+    def close(self):
+        pass
+
+
+def make_stand_in_completion(latency: float, seed: int = 0):
+    rng = random.Random(seed)
+
+    def chat_completion(messages: List[Dict], max_tokens: int = 2000) -> str:
+        time.sleep(_jitter(rng, latency))
+        return f"[stand-in answer] {messages[-1]['content'][:80]}"
+
+    return chat_completion
+
+
+# ============================================================
+# Targets
+# ============================================================
+class ChatTarget:
+    """Calls AsyncHybridChat.handle_query_async on this process's event loop."""
+
+    def __init__(self, chat):
+        self.chat = chat
+
+    async def send(self, query: str, top_k: int) -> Dict:
+        return await self.chat.handle_query_async(query, top_k)
+
+    def close(self):
+        self.chat.close()
+
+
+class HttpTarget:
+    """POSTs {"query", "top_k"} as JSON and expects the chat result as JSON back."""
+
+    def __init__(self, url: str, timeout: float):
+        self.url = url
+        self.timeout = timeout
+
+    def _post(self, query: str, top_k: int) -> Dict:
+        body = json.dumps({"query": query, "top_k": top_k}).encode("utf-8")
+        req = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            return json.loads(resp.read())
+
+    async def send(self, query: str, top_k: int) -> Dict:
+        return await asyncio.to_thread(self._post, query, top_k)
+
+    def close(self):
+        pass
+
+
+# ============================================================
+# Runner
+# ============================================================
+class Recorder:
+    """Collects per-request outcomes that finish inside the measurement window."""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors: Counter = Counter()
+        self.cached = 0
+        self.sent = 0
+        self.dropped = 0
+        self.measure_start = 0.0
+        self.measure_end = 0.0
+
+    def measuring(self, t: float) -> bool:
+        return self.measure_start <= t <= self.measure_end
+
+    async def call(self, target, query: str, top_k: int, scheduled: float):
+        try:
+            result = await target.send(query, top_k)
+            error = None
+        except Exception as e:
+            result, error = None, type(e).__name__
+        done = time.monotonic()
+        if not self.measuring(scheduled):
+            return
+        if error:
+            self.errors[error] += 1
+            return
+        self.latencies.append(done - scheduled)
+        if result.get("cached"):
+            self.cached += 1
+
+
+async def run_closed(target, queries: List[str], args, rec: Recorder):
+    end = rec.measure_end
+    cursor = itertools.count()
+
+    async def worker():
+        while True:
+            now = time.monotonic()
+            if now >= end:
+                return
+            query = queries[next(cursor) % len(queries)]
+            if rec.measuring(now):
+                rec.sent += 1
+            await rec.call(target, query, args.top_k, now)
+
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+
+
+async def run_open(target, queries: List[str], args, rec: Recorder):
+    rng = random.Random(args.seed)
+    interval = 1.0 / args.qps
+    inflight = set()
+    next_send = time.monotonic()
+    i = 0
+    while next_send < rec.measure_end:
+        delay = next_send - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(inflight) >= args.max_inflight:
+            # The target is saturated; count the arrival as shed load instead of queueing forever
+            if rec.measuring(next_send):
+                rec.dropped += 1
+        else:
+            if rec.measuring(next_send):
+                rec.sent += 1
+            task = asyncio.ensure_future(rec.call(target, queries[i % len(queries)], args.top_k, next_send))
+            inflight.add(task)
+            task.add_done_callback(inflight.discard)
+        i += 1
+        next_send += rng.expovariate(args.qps) if args.poisson else interval
+    if inflight:
+        await asyncio.wait(inflight, timeout=args.timeout)
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(math.ceil(q * len(ordered))) - 1)]
+
+
+def report(rec: Recorder, args) -> Dict:
+    window = rec.measure_end - rec.measure_start
+    ok = len(rec.latencies)
+    failed = sum(rec.errors.values())
+    summary = {
+        "mode": args.mode,
+        "target_qps": args.qps if args.mode == "open" else None,
+        "concurrency": args.concurrency if args.mode == "closed" else None,
+        "window_s": round(window, 1),
+        "sent": rec.sent,
+        "completed": ok,
+        "errors": failed,
+        "dropped": rec.dropped,
+        "error_rate": round(failed / (ok + failed), 4) if ok + failed else 0.0,
+        "throughput_qps": round(ok / window, 2) if window else 0.0,
+        "cache_hit_ratio": round(rec.cached / ok, 4) if ok else 0.0,
+        "latency_ms": {
+            name: round(percentile(rec.latencies, q) * 1000, 1)
+            for name, q in (("p50", 0.50), ("p90", 0.90), ("p95", 0.95), ("p99", 0.99), ("max", 1.0))
+        },
+        "errors_by_type": dict(rec.errors),
+    }
+    return summary
+
+
+def print_report(summary: Dict):
+    lat = summary["latency_ms"]
+    print("\n=== Load test ===")
+    if summary["mode"] == "open":
+        print(f"Mode: open loop at {summary['target_qps']} QPS")
+    else:
+        print(f"Mode: closed loop with {summary['concurrency']} workers")
+    print(f"Window: {summary['window_s']}s  sent={summary['sent']}  completed={summary['completed']}  "
+          f"errors={summary['errors']}  dropped={summary['dropped']}")
+    print(f"Throughput: {summary['throughput_qps']} QPS  error rate: {summary['error_rate']:.2%}  "
+          f"cache hits: {summary['cache_hit_ratio']:.2%}")
+    print("Latency (ms): " + "  ".join(f"{k}={v}" for k, v in lat.items()))
+    if summary["errors_by_type"]:
+        print(f"Errors: {summary['errors_by_type']}")
+
+
+async def main_async(args) -> Dict:
+    if args.queries:
+        queries = load_queries(args.queries)
+    else:
+        queries = synthetic_queries(args.data, args.synthetic, args.seed, args.skew)
+    if not queries:
+        raise SystemExit("No queries to replay.")
+
+    loop = asyncio.get_running_loop()
+    # Retrievers run in threads; the default pool would cap concurrency at a few dozen
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=args.threads))
+
+    cassette = None
+    if args.cassette:
+        from app.replay.cassette import use_cassette
+        cassette = use_cassette(args.cassette, args.cassette_mode, args.replay_latency)
+
+    if args.url:
+        target = HttpTarget(args.url, args.timeout)
+    else:
+        from app.hybrid.hybrid_chat import AsyncHybridChat
+        if args.stand_ins:
+            nodes = list(iter_nodes(args.data, strict=False))
+            chat = AsyncHybridChat(
+                enable_cache=not args.no_cache,
+                vector_retriever=StandInVectorRetriever(nodes, args.vector_latency, args.seed),
+                graph_retriever=StandInGraphRetriever(nodes, args.graph_latency, args.seed),
+                completion_fn=make_stand_in_completion(args.llm_latency, args.seed),
+            )
+        else:
+            chat = AsyncHybridChat(enable_cache=not args.no_cache)
+        if chat.cache is not None and args.clear_cache:
+            chat.clear_cache()
+        target = ChatTarget(chat)
+
+    rec = Recorder()
+    start = time.monotonic()
+    rec.measure_start = start + args.warmup
+    rec.measure_end = rec.measure_start + args.duration
+    logger.info(f"[LOAD] {len(queries)} queries, {args.mode} loop, warm-up {args.warmup}s, measuring {args.duration}s")
+    try:
+        if args.mode == "open":
+            await run_open(target, queries, args, rec)
+        else:
+            await run_closed(target, queries, args, rec)
+    finally:
+        target.close()
+        if cassette is not None:
+            cassette.save()
+            logger.info(f"[LOAD] Cassette: {cassette.stats()}")
+    return report(rec, args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay queries against the assistant at a target load")
+    parser.add_argument("--mode", choices=["open", "closed"], default="closed")
+    parser.add_argument("--qps", type=float, default=5.0, help="Arrival rate for open loop")
+    parser.add_argument("--poisson", action="store_true", help="Exponential inter-arrival times instead of fixed")
+    parser.add_argument("--concurrency", type=int, default=4, help="Workers for closed loop")
+    parser.add_argument("--duration", type=float, default=60.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Seconds of load before measuring")
+    parser.add_argument("--max-inflight", type=int, default=1000, help="Open loop: shed arrivals beyond this")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout (HTTP) / drain wait")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--queries", help="Query file (one per line, or JSONL with 'query')")
+    parser.add_argument("--data", default=DATA_FILE, help="Dataset for synthetic queries and stand-ins")
+    parser.add_argument("--synthetic", type=int, default=500, help="Synthetic queries to generate")
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent for synthetic query popularity")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--url", help="Send to this HTTP endpoint instead of an in-process AsyncHybridChat")
+    parser.add_argument("--stand-ins", action="store_true", help="Replace Pinecone/Neo4j/OpenAI with local stand-ins")
+    parser.add_argument("--vector-latency", type=float, default=0.05, help="Stand-in vector search latency (s)")
+    parser.add_argument("--graph-latency", type=float, default=0.03, help="Stand-in graph lookup latency (s)")
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="Stand-in completion latency (s)")
+    parser.add_argument("--threads", type=int, default=64, help="Worker threads for blocking backend calls")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the answer cache")
+    parser.add_argument("--clear-cache", action="store_true", help="Start from an empty answer cache")
+    parser.add_argument("--cassette", help="Record backend calls to / replay them from this cassette file")
+    parser.add_argument("--cassette-mode", choices=["record", "replay"], default="replay")
+    parser.add_argument("--replay-latency", type=float, default=1.0, help="Scale for recorded latencies on replay")
+    parser.add_argument("--json", help="Also write the summary as JSON to this path")
+    args = parser.parse_args()
+
+    summary = asyncio.run(main_async(args))
+    print_report(summary)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        print(f"Summary written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
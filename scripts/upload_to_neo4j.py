@@ -1,10 +1,33 @@
-import json
-from neo4j import GraphDatabase
+"""
+Load the dataset into Neo4j, touching only what changed since the last run.
+
+The dataset (JSON array or JSONL) is streamed twice: once to upsert nodes and
+once to rewrite the relationships of nodes whose connections changed, or that
+point at a node created in this run (their edge to it could not be created
+before the node existed, or was dropped when it was deleted). Only the ids of
+created nodes are held between the passes, so memory does not grow with the
+number of edges.
+
+The manifest is checkpointed during the relationship pass. Created nodes are
+only recorded once that pass completes, so a run interrupted before then
+treats them as new again and relinks the nodes that point at them.
+
+Usage:
+  python -m scripts.upload_to_neo4j                     -> incremental load (diff against the manifest)
+  python -m scripts.upload_to_neo4j --full              -> reload every node and relationship
+  python -m scripts.upload_to_neo4j --data nodes.jsonl  -> load another dataset file
+"""
+
+import argparse
 from tqdm import tqdm
-from app.config_loader import Config
+from app import resources
+from app.ingest.dataset_reader import iter_batches, iter_nodes
+from app.ingest.manifest import IngestManifest, node_hash
 DATA_FILE = "data/vietnam_travel_dataset.json"
-
-driver = GraphDatabase.driver(Config.NEO4J_URI, auth=(Config.NEO4J_USER, Config.NEO4J_PASSWORD))
+MANIFEST_FILE = "data/.manifests/neo4j.json"
+CHANGES_FILE = "data/.manifests/neo4j_changes.json"
+BATCH_SIZE = 500
+CHECKPOINT_EVERY = 20  # relationship batches
 
 def create_constraints(tx):
     # generic uniqueness constraint on id for node label Entity (we also add label specific types)
@@ -16,10 +39,11 @@ def upsert_node(tx, node):
     label_cypher = ":" + ":".join(labels)
     # keep a subset of properties to store (avoid storing huge nested objects)
     props = {k:v for k,v in node.items() if k not in ("connections",)}
-    # set properties using parameters
+    props["id"] = node["id"]
+    # replace all properties, so ones dropped from the dataset are removed too
     tx.run(
         f"MERGE (n{label_cypher} {{id: $id}}) "
-        "SET n += $props",
+        "SET n = $props",
         id=node["id"], props=props
     )
 
@@ -37,23 +61,91 @@ def create_relationship(tx, source_id, rel):
     )
     tx.run(cypher, source_id=source_id, target_id=target_id)
 
+def relink_node(tx, node):
+    # connection list changed: drop this node's outgoing edges and recreate them
+    tx.run("MATCH (a:Entity {id: $id})-[r]->() DELETE r", id=node["id"])
+    for rel in node.get("connections", []):
+        create_relationship(tx, node["id"], rel)
+
+def delete_node(tx, node_id):
+    tx.run("MATCH (n:Entity {id: $id}) DETACH DELETE n", id=node_id)
+
+def upsert_batch(tx, nodes):
+    for node in nodes:
+        upsert_node(tx, node)
+
+def relink_batch(tx, nodes):
+    for node in nodes:
+        relink_node(tx, node)
+
 def main():
-    with open(DATA_FILE, "r", encoding="utf-8") as f:
-        nodes = json.load(f)
+    parser = argparse.ArgumentParser(description="Load the dataset into Neo4j")
+    parser.add_argument("--data", default=DATA_FILE, help="Dataset file (JSON array or JSONL)")
+    parser.add_argument("--full", action="store_true", help="Ignore the manifest and reload everything")
+    parser.add_argument("--skip-invalid", action="store_true", help="Skip nodes that fail validation")
+    args = parser.parse_args()
 
-    with driver.session() as session:
+    manifest = IngestManifest(MANIFEST_FILE)
+    if args.full:
+        manifest.reset()
+    strict = not args.skip_invalid
+
+    relink_ids = set()
+    # id -> node hash of nodes created in this run, recorded only after pass 2
+    created = {}
+    with resources.neo4j_driver().session() as session:
         session.execute_write(create_constraints)
-        # Upsert all nodes
-        for node in tqdm(nodes, desc="Creating nodes"):
-            session.execute_write(upsert_node, node)
 
-        # Create relationships
-        for node in tqdm(nodes, desc="Creating relationships"):
-            conns = node.get("connections", [])
-            for rel in conns:
-                session.execute_write(create_relationship, node["id"], rel)
+        # Pass 1: upsert new and changed nodes, remembering whose connections changed
+        def node_updates():
+            for node in iter_nodes(args.data, strict=strict):
+                status, edges_changed = manifest.inspect(node)
+                if edges_changed:
+                    relink_ids.add(node["id"])
+                if status == "new":
+                    created[node["id"]] = node_hash(node)
+                if status != "unchanged":
+                    yield node
+
+        with tqdm(desc="Upserting nodes", unit="node") as progress:
+            for batch in iter_batches(node_updates(), BATCH_SIZE):
+                session.execute_write(upsert_batch, batch)
+                for node in batch:
+                    if node["id"] not in created:
+                        manifest.record(node, connections=False)
+                progress.update(len(batch))
+
+        # Pass 2: every node exists now, so recreate relationships that changed and
+        # link everything that points at a node created (or re-created) in this run
+        def needs_relink(node):
+            return node["id"] in relink_ids or any(
+                rel.get("target") in created for rel in node.get("connections", [])
+            )
+
+        if relink_ids or created:
+            changed_links = (n for n in iter_nodes(args.data, strict=strict) if needs_relink(n))
+            with tqdm(desc="Updating relationships", unit="node") as progress:
+                for i, batch in enumerate(iter_batches(changed_links, BATCH_SIZE), 1):
+                    session.execute_write(relink_batch, batch)
+                    for node in batch:
+                        manifest.record_connections(node)
+                    progress.update(len(batch))
+                    if i % CHECKPOINT_EVERY == 0:
+                        manifest.save()
+        # Every edge into the created nodes exists now
+        manifest.nodes.update(created)
+
+        # Remove nodes (and their edges) that left the dataset
+        removed = manifest.removed_ids()
+        for node_id in tqdm(removed, desc="Deleting nodes"):
+            session.execute_write(delete_node, node_id)
+            manifest.forget(node_id)
 
-    print("Done loading into Neo4j.")
+    resources.close_neo4j()
+    manifest.save()
+    manifest.diff.write_report(CHANGES_FILE)
+    print(f"Diff against last load: {manifest.diff.summary()}")
+    print(f"Done loading into Neo4j. Changed ids written to {CHANGES_FILE}.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,52 +1,212 @@
-import json
-import time
+"""
+Embed the dataset and upsert it into Pinecone, optionally writing a local
+memory-mapped vector snapshot next to (or instead of) the upsert.
+
+Only nodes that are new or changed since the last run are embedded; nodes that
+left the dataset are deleted from the index. The dataset (JSON array or JSONL)
+is streamed through a generator pipeline, so memory stays flat with its size.
+
+Embedding and upserting run concurrently (see app/ingest/pipeline.py). Embedding
+requests go through the shared OpenAI scheduler at BATCH priority, whose RPM/TPM
+budget --rpm/--tpm set for this run and which backs off on 429s. Progress is checkpointed into the
+manifest, so an interrupted run resumes where it stopped when started again.
+
+Usage:
+  python -m scripts.upload_to_pinecone
+  python -m scripts.upload_to_pinecone --full
+  python -m scripts.upload_to_pinecone --data nodes.jsonl
+  python -m scripts.upload_to_pinecone --rpm 500 --tpm 200000 --embed-workers 8
+  python -m scripts.upload_to_pinecone --snapshot data/vector_snapshot
+  python -m scripts.upload_to_pinecone --snapshot data/vector_snapshot --no-pinecone
+  python -m scripts.upload_to_pinecone --snapshot data/vector_snapshot --snapshot-ivf
+"""
+
+import argparse
+import os
+from array import array
+import numpy as np
 from tqdm import tqdm
-from app.retrievers.pinecone_retriever import PineconeRetriever
 from app.config_loader import Config
+from app.ingest.dataset_reader import iter_batches, iter_nodes
+from app.ingest.manifest import IngestManifest
+from app.ingest.pipeline import IngestPipeline
+from app.llm.llm_client import embed_texts, llm_client
+from app.vectorstore.ivf import build_ivf_index, load_centroids
+from app.vectorstore.snapshot import LocalVectorStore, SnapshotWriter
 
 DATA_FILE = "data/vietnam_travel_dataset.json"
+MANIFEST_DIR = "data/.manifests"
 BATCH_SIZE = 32
+CHECKPOINT_EVERY = 20  # batches
 
 
-def main():
-    retriever = PineconeRetriever()
-    index = retriever.index
+def open_previous_snapshot(path):
+    """Open the existing snapshot so unchanged rows can be copied instead of re-embedded."""
+    if not path or not os.path.exists(os.path.join(path, "manifest.json")):
+        return None
+    try:
+        return LocalVectorStore(path)
+    except Exception as e:
+        print(f"Ignoring unreadable snapshot at {path}: {e}")
+        return None
 
-    with open(DATA_FILE, "r", encoding="utf-8") as f:
-        nodes = json.load(f)
 
-    items = []
+def node_metadata(node):
+    return {
+        "id": node.get("id"),
+        "type": node.get("type"),
+        "name": node.get("name"),
+        "city": node.get("city", node.get("region", "")),
+        "tags": node.get("tags", []),
+    }
+
+
+def pending_items(nodes, manifest, previous, snapshot, carried=None):
+    """
+    Yield (node, semantic_text, meta, needs_upsert) for nodes that must be embedded.
+    Unchanged nodes are skipped, or copied straight into the snapshot from the previous one;
+    `carried` then collects the (new row, previous row) pairs, flattened.
+    """
     for node in nodes:
         semantic_text = node.get("semantic_text") or (node.get("description") or "")[:1000]
         if not semantic_text.strip():
+            # nodes without text are not indexed; if they were before, they count as removed
             continue
-        meta = {
-            "id": node.get("id"),
-            "type": node.get("type"),
-            "name": node.get("name"),
-            "city": node.get("city", node.get("region", "")),
-            "tags": node.get("tags", []),
-        }
-        items.append((node["id"], semantic_text, meta))
-
-    print(f"Preparing to upsert {len(items)} items to Pinecone...")
-
-    for i in tqdm(range(0, len(items), BATCH_SIZE), desc="Uploading"):
-        batch = items[i : i + BATCH_SIZE]
-        ids = [item[0] for item in batch]
-        texts = [item[1] for item in batch]
-        metas = [item[2] for item in batch]
-
-        embeddings = retriever.get_embedding(texts[0]) if len(texts) == 1 else [
-            retriever.get_embedding(t) for t in texts
-        ]
+        meta = node_metadata(node)
+        status, _ = manifest.inspect(node)
+        if status == "unchanged":
+            if not snapshot:
+                continue
+            row = previous.row_of(node["id"]) if previous else None
+            if row is not None:
+                new_row = snapshot.add(node["id"], previous.vectors[row], meta)
+                if carried is not None:
+                    carried.extend((new_row, row))
+                continue
+        yield node, semantic_text, meta, status != "unchanged"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upload dataset embeddings")
+    parser.add_argument("--data", default=DATA_FILE, help="Dataset file (JSON array or JSONL)")
+    parser.add_argument("--snapshot", type=str, help="Also write a local vector snapshot to this directory")
+    parser.add_argument("--snapshot-dtype", choices=("float32", "float16"), default="float32")
+    parser.add_argument("--snapshot-quantize", choices=("int8",), help="Add an int8 first-pass index to the snapshot")
+    parser.add_argument("--snapshot-coarse-dim", type=int, default=512,
+                        help="Leading dimensions kept in the int8 first pass (Matryoshka truncation)")
+    parser.add_argument("--snapshot-ivf", action="store_true",
+                        help="Build an IVF ANN index (reuses the previous snapshot's centroids when present)")
+    parser.add_argument("--ivf-nlist", type=int, help="IVF lists when training (default ~sqrt(rows))")
+    parser.add_argument("--ivf-retrain", action="store_true", help="Retrain IVF centroids instead of reusing them")
+    parser.add_argument("--no-pinecone", action="store_true", help="Skip the Pinecone upsert (snapshot only)")
+    parser.add_argument("--full", action="store_true", help="Ignore the manifest and re-embed everything")
+    parser.add_argument("--skip-invalid", action="store_true", help="Skip nodes that fail validation")
+    parser.add_argument("--rpm", type=int, default=Config.INGEST_RPM, help="Embedding requests per minute")
+    parser.add_argument("--tpm", type=int, default=Config.INGEST_TPM, help="Embedding tokens per minute")
+    parser.add_argument("--embed-workers", type=int, default=Config.INGEST_EMBED_WORKERS)
+    parser.add_argument("--upsert-workers", type=int, default=Config.INGEST_UPSERT_WORKERS)
+    args = parser.parse_args()
+
+    if args.no_pinecone and not args.snapshot:
+        parser.error("--no-pinecone needs --snapshot, otherwise nothing is written")
+
+    index = None
+    get_embeddings = embed_texts
+    if not args.no_pinecone:
+        from app.retrievers.pinecone_retriever import PineconeRetriever
+        retriever = PineconeRetriever()
+        index = retriever.index
+        get_embeddings = retriever.get_embeddings
+
+    # snapshot-only runs must not mark nodes as present in Pinecone
+    target = "snapshot" if args.no_pinecone else "pinecone"
+    manifest = IngestManifest(os.path.join(MANIFEST_DIR, f"{target}.json"))
+    changes_file = os.path.join(MANIFEST_DIR, f"{target}_changes.json")
+    if args.full:
+        manifest.reset()
+    previous = None if args.full else open_previous_snapshot(args.snapshot)
+    # Read before the snapshot directory is replaced: rows copied from the previous snapshot
+    # keep their list, and only new rows are assigned to these centroids
+    ivf_centroids = None
+    ivf_labels, carried = None, None
+    if args.snapshot and not args.ivf_retrain:
+        ivf_centroids = load_centroids(args.snapshot)
+        if ivf_centroids is not None and previous is not None and previous.ivf is not None:
+            ivf_labels = previous.ivf.row_labels(previous.count)
+            carried = array("q")
+    snapshot = SnapshotWriter(
+        args.snapshot, Config.PINECONE_VECTOR_DIM, args.snapshot_dtype,
+        quantize=args.snapshot_quantize, coarse_dim=args.snapshot_coarse_dim,
+    ) if args.snapshot else None
+
+    nodes = iter_nodes(args.data, strict=not args.skip_invalid)
+    items = pending_items(nodes, manifest, previous, snapshot, carried)
 
+    def upsert(batch, embeddings):
         vectors = [
-            {"id": _id, "values": emb, "metadata": meta}
-            for _id, emb, meta in zip(ids, embeddings, metas)
+            {"id": node["id"], "values": emb, "metadata": meta}
+            for (node, _, meta, needs_upsert), emb in zip(batch, embeddings)
+            if needs_upsert
         ]
-        index.upsert(vectors)
-        time.sleep(0.2)
+        if vectors:
+            index.upsert(vectors)
+
+    progress = tqdm(desc="Uploading", unit="item")
+
+    def batch_done(batch, embeddings):
+        if snapshot:
+            for (node, _, meta, _), emb in zip(batch, embeddings):
+                snapshot.add(node["id"], emb, meta)
+        for node, _, _, _ in batch:
+            manifest.record(node)
+        progress.update(len(batch))
+        # Checkpoint so a rerun resumes here; a snapshot is rebuilt whole, so it cannot resume.
+        # Runs before the pipeline counts this batch, hence the + 1.
+        if not snapshot and (pipeline.stats.batches + 1) % CHECKPOINT_EVERY == 0:
+            manifest.save()
+
+    llm_client.schedulers["embedding"].configure(rpm=args.rpm, tpm=args.tpm)
+    pipeline = IngestPipeline(
+        embed_fn=get_embeddings,
+        upsert_fn=upsert if index is not None else None,
+        text_of=lambda item: item[1],
+        embed_workers=args.embed_workers,
+        upsert_workers=args.upsert_workers,
+        on_batch_done=batch_done,
+    )
+    try:
+        stats = pipeline.run(iter_batches(items, BATCH_SIZE))
+    finally:
+        progress.close()
+        if not snapshot:
+            manifest.save()
+    print(f"Throughput: {stats.summary()}")
+
+    # The manifest is only saved once the snapshot is complete: a failed close or
+    # IVF build leaves the old manifest, so the next run writes these rows again
+    if snapshot:
+        snapshot.close()
+        print(f"Vector snapshot written to {args.snapshot}")
+        if args.snapshot_ivf or args.ivf_retrain or ivf_centroids is not None:
+            labels = None
+            if carried is not None:
+                pairs = np.frombuffer(carried, dtype=np.int64).reshape(-1, 2)
+                labels = np.full(snapshot.count, -1, dtype=np.int64)
+                labels[pairs[:, 0]] = ivf_labels[pairs[:, 1]]
+            info = build_ivf_index(args.snapshot, nlist=args.ivf_nlist, centroids=ivf_centroids, labels=labels)
+            print(f"IVF index: {info}")
+
+    removed = manifest.removed_ids()
+    if index is not None and removed:
+        for i in range(0, len(removed), 1000):
+            index.delete(ids=removed[i : i + 1000])
+        print(f"Deleted {len(removed)} removed items from Pinecone.")
+    for _id in removed:
+        manifest.forget(_id)
+    manifest.save()
+    manifest.diff.write_report(changes_file)
+    print(f"Diff against last upload: {manifest.diff.summary()}")
+    print(f"Changed ids written to {changes_file}.")
 
     print("All items uploaded successfully!")
 
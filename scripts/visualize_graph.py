@@ -1,45 +1,71 @@
 # scripts/visualize_graph.py
-from neo4j import GraphDatabase
-from pyvis.network import Network
+"""
+Export the knowledge graph as PyVis HTML.
+
+Edges are streamed page by page, so the graph never has to fit in one query.
+Graphs larger than --max-edges are rendered as a city-level overview; pass
+--city to drill down into one city (sampled down to --max-edges if needed).
+
+Usage:
+  python -m scripts.visualize_graph                        -> from Neo4j
+  python -m scripts.visualize_graph --source dataset       -> from the dataset file, no Neo4j
+  python -m scripts.visualize_graph --city Hanoi           -> drill down into one city
+"""
+
+import argparse
 import os
-from app.config_loader import Config
+from app import resources
 from app.logger import get_logger
+from app.viz.graph_export import (
+    GraphAggregator,
+    iter_dataset_edges,
+    iter_neo4j_edges,
+    render_edges,
+    render_overview,
+)
 
 logger = get_logger(__name__)
 OUTPUT_HTML = os.path.join("outputs", "neo4j_viz.html")
-os.makedirs("outputs", exist_ok=True)
-
-def fetch_subgraph(tx, limit=500):
-    q = (
-        "MATCH (a:Entity)-[r]->(b:Entity) "
-        "RETURN a.id AS a_id, labels(a) AS a_labels, a.name AS a_name, "
-        "b.id AS b_id, labels(b) AS b_labels, b.name AS b_name, type(r) AS rel "
-        "LIMIT $limit"
-    )
-    return list(tx.run(q, limit=limit))
-
-def build_pyvis(rows, output_html=OUTPUT_HTML):
-    net = Network(height="900px", width="100%", directed=True, notebook=False)
-    for rec in rows:
-        a_id = rec["a_id"]; a_name = rec["a_name"] or a_id
-        b_id = rec["b_id"]; b_name = rec["b_name"] or b_id
-        a_labels = rec["a_labels"]; b_labels = rec["b_labels"]
-        rel = rec["rel"]
-        net.add_node(a_id, label=f"{a_name}\n({','.join(a_labels)})", title=f"{a_name}")
-        net.add_node(b_id, label=f"{b_name}\n({','.join(b_labels)})", title=f"{b_name}")
-        net.add_edge(a_id, b_id, title=rel)
-    net.write_html(output_html, open_browser=False)
-    logger.info(f"Saved visualization to {output_html}")
+DATA_FILE = "data/vietnam_travel_dataset.json"
 
 def main():
-    driver = GraphDatabase.driver(Config.NEO4J_URI, auth=(Config.NEO4J_USER, Config.NEO4J_PASSWORD))
-    rows = []
-    try:
-        with driver.session() as session:
-            rows = session.execute_read(fetch_subgraph, limit=500)
-    except Exception as e:
-        logger.exception("Failed to fetch subgraph")
-    build_pyvis(rows)
+    parser = argparse.ArgumentParser(description="Export the knowledge graph as PyVis HTML")
+    parser.add_argument("--source", choices=["neo4j", "dataset"], default="neo4j")
+    parser.add_argument("--data", default=DATA_FILE, help="Dataset file for --source dataset")
+    parser.add_argument("--city", help="Drill down into one city (community)")
+    parser.add_argument("--max-edges", type=int, default=1500, help="Edge budget before aggregating or sampling")
+    parser.add_argument("--page-size", type=int, default=500, help="Source nodes per Neo4j page")
+    parser.add_argument("--output", default=OUTPUT_HTML)
+    args = parser.parse_args()
+
+    if args.source == "neo4j":
+        edges = iter_neo4j_edges(resources.neo4j_driver(), page_size=args.page_size)
+    else:
+        edges = iter_dataset_edges(args.data)
+
+    agg = GraphAggregator(community=args.city, max_edges=args.max_edges)
+    head = []  # the first max_edges + 1 edges tell us whether the whole graph fits
+    for edge in edges:
+        agg.add(edge)
+        if args.city is None and len(head) <= args.max_edges:
+            head.append(edge)
+
+    if args.city:
+        if not agg.sample:
+            logger.warning(f"No edges found for city {args.city!r}. Known: {[c for c, _ in agg.communities()]}")
+        html = render_edges(agg.sample)
+        detail = f"{len(agg.sample)} edges in {args.city}" + (" (sampled)" if agg.sampled else "")
+    elif len(head) <= args.max_edges:
+        html = render_edges(head)
+        detail = f"{len(head)} edges"
+    else:
+        html = render_overview(agg)
+        detail = f"overview of {agg.edge_count} edges in {len(agg.members)} cities (use --city to drill down)"
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        f.write(html)
+    logger.info(f"Saved visualization to {args.output}: {detail}")
 
 if __name__ == "__main__":
     main()
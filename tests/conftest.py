@@ -0,0 +1,10 @@
+# Smoke scripts that call the live OpenAI, Pinecone and Neo4j services; run them by hand,
+# e.g. `python -m tests.test_hybrid_chat`, with credentials in .env
+collect_ignore = [
+    "test_chat_ui.py",
+    "test_hybrid_chat.py",
+    "test_hybrid_retriever.py",
+    "test_llm_client.py",
+    "test_neo4j_retriever.py",
+    "test_pinecone_retriever.py",
+]
@@ -0,0 +1,24 @@
+import asyncio
+
+from app.utils.background_loop import BackgroundLoop
+
+
+def test_stop_cancels_pending_tasks_and_runs_their_cleanup():
+    loop = BackgroundLoop(name="test-loop")
+    cleaned = []
+
+    async def worker(name):
+        try:
+            await asyncio.sleep(3600)
+        finally:
+            await asyncio.sleep(0)
+            cleaned.append(name)
+
+    async def start():
+        for name in ("refresh", "warmup"):
+            asyncio.create_task(worker(name), name=name)
+
+    loop.run(start())
+    loop.stop(timeout=2)
+    assert sorted(cleaned) == ["refresh", "warmup"]
+    assert not loop.running
@@ -0,0 +1,248 @@
+import asyncio
+import functools
+import sqlite3
+import threading
+
+import pytest
+
+from app.cache.freshness import FRESH, REFRESH_AHEAD, STALE, freshness
+from app.cache.memory_cache import SimpleCache
+from app.config_loader import Config
+from app.hybrid.hybrid_chat import AsyncHybridChat
+from app.llm.scheduler import Priority, current_priority
+from app.llm.usage import TokenBudget
+from app.utils.metrics import metrics
+
+TTL = 100
+STALE_SECONDS = 50
+QUERY = "romantic trip in hoi an"
+
+
+class Clock:
+    def __init__(self, now: float = 1_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class VectorRetriever:
+    def query(self, text, top_k=5, filter=None):
+        return [{"id": "hoi_an", "score": 0.9, "metadata": {"name": "Hoi An", "city": "Hoi An"}}]
+
+
+class GraphRetriever:
+    def fetch_graph_context(self, node_ids):
+        return []
+
+    def close(self):
+        pass
+
+
+class Completion:
+    """Numbered answers; records the request priority and can be held or made to fail."""
+
+    def __init__(self):
+        self.calls = 0
+        self.priorities = []
+        self.release = threading.Event()
+        self.release.set()
+        self.fail = False
+
+    def __call__(self, messages, max_tokens=2000):
+        self.priorities.append(current_priority())
+        self.release.wait(5)
+        if self.fail:
+            raise RuntimeError("completion unavailable")
+        self.calls += 1
+        return f"answer {self.calls}"
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def completion():
+    return Completion()
+
+
+@pytest.fixture
+def chat(monkeypatch, clock, completion):
+    monkeypatch.setattr(Config, "FAST_PATH_ENABLED", False)
+    monkeypatch.setattr(Config, "PERF_LOG_ENABLED", False)
+    monkeypatch.setattr(Config, "PROFILE_SAMPLE_RATE", 0)
+    monkeypatch.setattr(Config, "CACHE_REFRESH_AHEAD", 0.9)
+    monkeypatch.setattr(Config, "CACHE_HOT_HITS", 3)
+    chat = AsyncHybridChat(
+        vector_retriever=VectorRetriever(),
+        graph_retriever=GraphRetriever(),
+        completion_fn=completion,
+        budget=TokenBudget(0),
+    )
+    chat.cache = SimpleCache(ttl_seconds=TTL, stale_seconds=STALE_SECONDS, clock=clock)
+    # Failed refreshes retry without the production back-off
+    monkeypatch.setattr(chat, "_retry_async", functools.partial(AsyncHybridChat._retry_async, chat, delay=0))
+    return chat
+
+
+async def ask(chat):
+    return await chat.handle_query_async(QUERY, 5)
+
+
+async def settle(chat):
+    """Wait for the background refreshes scheduled so far."""
+    while chat._refreshing:
+        await asyncio.gather(*chat._refreshing.values())
+
+
+# --------------------- FRESHNESS POLICY ---------------------
+def test_freshness_states(clock):
+    cache = SimpleCache(ttl_seconds=TTL, stale_seconds=STALE_SECONDS, clock=clock)
+    cache.set("k", "v")
+
+    def state():
+        entry = cache.lookup("k")
+        return entry and freshness(entry, TTL, 0.9, 3)
+
+    clock.now += 89
+    assert state() == FRESH
+    clock.now += 1
+    # Inside the refresh-ahead window, but only the third hit makes the entry hot
+    assert [state(), state()] == [FRESH, REFRESH_AHEAD]
+    clock.now += 10
+    assert state() == STALE
+    assert cache.get("k") is None  # past the soft TTL
+    clock.now += STALE_SECONDS
+    assert state() is None
+    assert len(cache) == 0
+
+
+# --------------------- BACKGROUND REFRESH ---------------------
+def test_fresh_entry_is_served_without_a_refresh(chat, clock, completion):
+    async def scenario():
+        first = await ask(chat)
+        clock.now += 50
+        second = await ask(chat)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first["cached"] is False and second["cached"] is True and second["stale"] is False
+    assert second["answer"] == first["answer"] == "answer 1"
+    assert completion.calls == 1
+
+
+def test_refresh_ahead_starts_only_after_the_hot_hit_threshold(chat, clock, completion):
+    async def scenario():
+        await ask(chat)
+        clock.now += 95
+        for _ in range(2):
+            await ask(chat)
+            assert not chat._refreshing
+        hot = await ask(chat)  # third hit
+        assert len(chat._refreshing) == 1
+        await settle(chat)
+        return hot, await ask(chat)
+
+    hot, after = asyncio.run(scenario())
+    assert hot["answer"] == "answer 1" and hot["stale"] is False
+    assert after["answer"] == "answer 2"
+    assert completion.calls == 2
+
+
+def test_stale_entry_is_served_and_refreshed_in_the_background(chat, clock, completion):
+    async def scenario():
+        await ask(chat)
+        clock.now += TTL + 10
+        stale = await ask(chat)
+        await settle(chat)
+        return stale, await ask(chat)
+
+    stale, refreshed = asyncio.run(scenario())
+    assert stale["cached"] is True and stale["stale"] is True and stale["answer"] == "answer 1"
+    assert refreshed["stale"] is False and refreshed["answer"] == "answer 2"
+    assert completion.priorities[1] == Priority.BACKGROUND
+
+
+def test_only_one_refresh_runs_per_key(chat, clock, completion):
+    async def scenario():
+        await ask(chat)
+        clock.now += TTL + 10
+        completion.release.clear()
+        results = [await ask(chat) for _ in range(3)]
+        assert len(chat._refreshing) == 1
+        completion.release.set()
+        await settle(chat)
+        return results
+
+    results = asyncio.run(scenario())
+    assert all(r["stale"] and r["answer"] == "answer 1" for r in results)
+    assert completion.calls == 2
+
+
+def test_hard_miss_rebuilds_the_answer_in_the_request(chat, clock, completion):
+    async def scenario():
+        await ask(chat)
+        clock.now += TTL + STALE_SECONDS
+        return await ask(chat)
+
+    result = asyncio.run(scenario())
+    assert result["cached"] is False and result["answer"] == "answer 2"
+    assert not chat._refreshing
+
+
+def test_failed_refresh_leaves_the_stale_entry_in_place(chat, clock, completion):
+    async def scenario():
+        await ask(chat)
+        clock.now += TTL + 10
+        completion.fail = True
+        stale = await ask(chat)
+        await settle(chat)
+        again = await ask(chat)
+        # The failed refresh was cleared, so this request scheduled a new one
+        assert len(chat._refreshing) == 1
+        completion.fail = False
+        await settle(chat)
+        return stale, again
+
+    stale, again = asyncio.run(scenario())
+    assert stale["answer"] == again["answer"] == "answer 1" and again["stale"] is True
+    assert chat.cache.lookup(chat._generate_cache_key(QUERY, 5)).value["answer"] == "answer 2"
+
+
+def test_refresh_joining_a_user_request_keeps_its_priority(chat, completion):
+    async def scenario():
+        completion.release.clear()
+        user = asyncio.ensure_future(ask(chat))
+        while not completion.priorities:
+            await asyncio.sleep(0.01)
+        # A refresh for the same key joins the user's in-flight work instead of starting its own
+        chat._schedule_refresh(chat._generate_cache_key(QUERY, 5), QUERY, 5, "")
+        completion.release.set()
+        await settle(chat)
+        return await user
+
+    result = asyncio.run(scenario())
+    assert result["answer"] == "answer 1"
+    assert completion.priorities == [Priority.INTERACTIVE]
+
+
+# --------------------- CACHE FAILURES ---------------------
+class BrokenCache(SimpleCache):
+    def lookup(self, key):
+        raise sqlite3.OperationalError("database is locked")
+
+    def set(self, key, value):
+        raise TypeError("Object of type set is not JSON serializable")
+
+
+def test_cache_errors_are_counted_and_the_answer_is_still_returned(chat, completion):
+    chat.cache = BrokenCache(ttl_seconds=TTL)
+    before = metrics.snapshot()["counters"].get("cache.errors", 0)
+
+    first, second = asyncio.run(ask(chat)), asyncio.run(ask(chat))
+    assert first["answer"] == "answer 1" and second["answer"] == "answer 2"
+    assert first["cached"] is second["cached"] is False
+    # One failed lookup and one failed store per request
+    assert metrics.snapshot()["counters"]["cache.errors"] - before == 4
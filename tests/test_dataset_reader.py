@@ -0,0 +1,79 @@
+import io
+import json
+
+import pytest
+
+from app.exceptions import DatasetError
+from app.ingest import dataset_reader
+from app.ingest.dataset_reader import _iter_json_array
+
+VALID = [
+    "[]",
+    " \n[ ]\n ",
+    "[1]",
+    '[1, 2.5e3, -0.25, "a,b", "]", null, true, false]',
+    "[12345.6789e-3,-98765.4321E+2,0.000001]",
+    '[{"id": "a", "connections": [{"target": "b"}]},\n {"id": "b", "tags": ["x", "y"]}]',
+    "[[1, [2, []]], {}]",
+    '["' + "long " * 200 + '", 123456789012345678901234567890]',
+]
+
+INVALID = [
+    "",
+    "   ",
+    "[1 2 ,, 3]",
+    "[1 2]",
+    "[1,,2]",
+    "[,1]",
+    "[1,]",
+    "[",
+    "[1",
+    "[1,",
+    "[1] x",
+    "[1] []",
+    '[{"a": 1]',
+]
+
+
+def read(text):
+    return list(_iter_json_array(io.StringIO(text)))
+
+
+@pytest.fixture(params=[2, 7, 1 << 16], ids=lambda n: f"chunk{n}")
+def chunk_size(request, monkeypatch):
+    # Small chunks put element and separator boundaries at the buffer edge
+    monkeypatch.setattr(dataset_reader, "CHUNK_SIZE", request.param)
+    return request.param
+
+
+@pytest.mark.parametrize("text", VALID)
+def test_valid_arrays_match_json_load(text, chunk_size):
+    assert read(text) == json.loads(text)
+
+
+@pytest.mark.parametrize("text", INVALID)
+def test_invalid_arrays_are_rejected_like_json_load(text, chunk_size):
+    with pytest.raises(json.JSONDecodeError):
+        json.loads(text)
+    with pytest.raises(DatasetError):
+        read(text)
+
+
+def test_a_top_level_object_is_not_an_array():
+    with pytest.raises(DatasetError):
+        read('{"id": "a"}')
+
+
+class ChunkedReader(io.StringIO):
+    """Fails on unbounded reads."""
+
+    def read(self, size=-1):
+        assert size is not None and 0 <= size <= dataset_reader.CHUNK_SIZE
+        return super().read(size)
+
+
+def test_trailing_input_is_read_in_chunks(chunk_size):
+    text = "[1, 2]" + " \n" * 50
+    assert list(_iter_json_array(ChunkedReader(text))) == [1, 2]
+    with pytest.raises(DatasetError):
+        list(_iter_json_array(ChunkedReader(text + "x")))
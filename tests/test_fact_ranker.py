@@ -0,0 +1,112 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.config_loader import Config
+from app.hybrid.fact_ranker import FactRanker
+from app.retrievers.pinecone_retriever import PineconeRetriever
+
+QUERY = [1.0, 0.0, 0.0, 0.0]
+# Cosine with QUERY: near 0.99, mid 0.6, far 0.0
+VECTORS = {
+    "near": np.array([0.99, 0.14, 0.0, 0.0], dtype=np.float32),
+    "mid": np.array([0.6, 0.8, 0.0, 0.0], dtype=np.float32),
+    "far": np.array([0.0, 0.0, 1.0, 0.0], dtype=np.float32),
+}
+
+
+def fact(source, target_id, name=None, rel="Near"):
+    return {"source": source, "rel": rel, "target_id": target_id, "target_name": name or target_id}
+
+
+def lookup(node_ids):
+    return {nid: VECTORS[nid] for nid in node_ids if nid in VECTORS}
+
+
+def ids(facts):
+    return [f["target_id"] for f in facts]
+
+
+# --------------------- ORDERING ---------------------
+def test_vector_scored_facts_come_first_then_word_overlap():
+    ranker = FactRanker(node_vectors=lookup, budget=10, per_source=10)
+    facts = [
+        # No stored vector, but its name matches the query words exactly
+        fact("hue", "unknown", name="romantic river cruise"),
+        fact("hue", "far"), fact("hue", "near"), fact("hue", "mid"),
+        fact("hue", "other", name="cooking class"),
+    ]
+    ranked = ranker.rank("romantic river cruise", facts, QUERY)
+    assert ids(ranked) == ["near", "mid", "far", "unknown", "other"]
+
+
+def test_relation_weight_breaks_close_scores():
+    ranker = FactRanker(node_vectors=lookup, relation_weights={"Connected_To": 0.5}, budget=10, per_source=10)
+    ranked = ranker.rank("q", [fact("hue", "near"), fact("hue", "mid", rel="Connected_To")], QUERY)
+    assert ids(ranked) == ["mid", "near"]
+
+
+def test_without_a_query_vector_everything_is_ranked_by_word_overlap():
+    ranker = FactRanker(node_vectors=lookup, budget=10, per_source=10)
+    facts = [fact("hue", "near", name="Night Market"), fact("hue", "mid", name="Perfume River Boat")]
+    assert ids(ranker.rank("boat on the perfume river", facts)) == ["mid", "near"]
+
+
+def test_failing_vector_lookup_falls_back_to_word_overlap():
+    def broken(node_ids):
+        raise RuntimeError("index unavailable")
+
+    ranker = FactRanker(node_vectors=broken, budget=10, per_source=10)
+    facts = [fact("hue", "near", name="Night Market"), fact("hue", "mid", name="Perfume River Boat")]
+    assert ids(ranker.rank("perfume river", facts, QUERY)) == ["mid", "near"]
+
+
+# --------------------- CAPS ---------------------
+def test_per_source_cap_keeps_the_best_facts_of_each_source():
+    ranker = FactRanker(node_vectors=lookup, budget=10, per_source=2)
+    facts = [fact("hue", "far"), fact("hue", "mid"), fact("hue", "near"), fact("hoi_an", "far")]
+    ranked = ranker.rank("q", facts, QUERY)
+    assert [(f["source"], f["target_id"]) for f in ranked] == [("hue", "near"), ("hue", "mid"), ("hoi_an", "far")]
+
+
+def test_budget_caps_the_total_and_duplicates_are_dropped():
+    ranker = FactRanker(node_vectors=lookup, budget=2, per_source=5)
+    facts = [fact("hue", "mid"), fact("hue", "mid"), fact("hoi_an", "far"), fact("da_nang", "near")]
+    assert ids(ranker.rank("q", facts, QUERY)) == ["near", "mid"]
+    assert ranker.rank("q", [], QUERY) == []
+
+
+# --------------------- NODE VECTOR CACHE ---------------------
+class Index:
+    def __init__(self, vectors):
+        self.vectors = vectors
+        self.fetched = []
+
+    def fetch(self, ids):
+        self.fetched.append(list(ids))
+        return SimpleNamespace(vectors={
+            i: SimpleNamespace(values=list(self.vectors[i])) for i in ids if i in self.vectors
+        })
+
+
+@pytest.fixture
+def retriever():
+    retriever = PineconeRetriever()
+    retriever._index = Index({"near": VECTORS["near"]})
+    return retriever
+
+
+def test_node_vectors_are_fetched_once(retriever):
+    assert set(retriever.node_vectors(["near", "new"])) == {"near"}
+    assert set(retriever.node_vectors(["near", "new"])) == {"near"}
+    assert retriever._index.fetched == [["near", "new"]]
+
+
+def test_missing_node_is_fetched_again_after_the_miss_ttl(retriever, monkeypatch):
+    monkeypatch.setattr(Config, "NODE_VECTOR_MISS_TTL", 0)
+    assert retriever.node_vectors(["new"]) == {}
+    # The node was uploaded after the first lookup
+    retriever._index.vectors["new"] = VECTORS["mid"]
+    np.testing.assert_array_equal(retriever.node_vectors(["new"])["new"], VECTORS["mid"])
+    assert retriever._index.fetched == [["new"], ["new"]]
@@ -0,0 +1,106 @@
+import pytest
+
+from app.hybrid.fast_path import FastPathIndex
+
+
+def city(id, name, **extra):
+    return dict({"id": id, "name": name, "type": "City", "region": "Central Vietnam",
+                 "best_time_to_visit": "February to April", "connections": []}, **extra)
+
+
+def poi(id, name, type, rel, city_id, **extra):
+    return dict({"id": id, "name": name, "type": type, "connections": [{"relation": rel, "target": city_id}]}, **extra)
+
+
+NODES = [
+    city("city_hue", "Hue", tags=["history", "cuisine"],
+         connections=[{"relation": "Connected_To", "target": "city_hoi_an"}]),
+    city("city_hoi_an", "Hoi An", tags=["lanterns"]),
+    city("city_ha_long", "Ha Long Bay", region="Northern Vietnam"),
+    city("city_ho_chi_minh", "Ho Chi Minh City", region="Southern Vietnam"),
+    poi("attraction_citadel", "Imperial Citadel", "Attraction", "Located_In", "city_hue", tags=["unesco"]),
+    poi("hotel_riverside", "Riverside Hotel", "Hotel", "Located_In", "city_hue"),
+    poi("activity_lanterns", "Lantern Making", "Activity", "Available_In", "city_hoi_an"),
+    {"id": "attraction_rock", "name": "Lonely Rock", "type": "Attraction", "connections": []},
+]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return FastPathIndex(NODES)
+
+
+# --------------------- CLASSIFICATION ---------------------
+@pytest.mark.parametrize("query, intent, entity, etype", [
+    ("best time to visit Hue", "best_time", "city_hue", None),
+    ("When should I visit Ha Long?", "best_time", "city_ha_long", None),
+    ("what's the best season for HCMC", "best_time", "city_ho_chi_minh", None),
+    ("best months to go to halong", "best_time", "city_ha_long", None),
+    ("Which hotels are in Huế?", "list_type", "city_hue", "Hotel"),
+    ("things to do in hoian", "list_type", "city_hoi_an", "Activity"),
+    ("list all sights in ho chi minh city", "list_type", "city_ho_chi_minh", "Attraction"),
+    ("tags for the Imperial Citadel", "tags", "attraction_citadel", None),
+    ("what is Hoi An known for", "tags", "city_hoi_an", None),
+    ("where is the imperial citadel located", "region", "attraction_citadel", None),
+    ("please, which region is Ha Long Bay in? thanks", "region", "city_ha_long", None),
+    ("which cities are connected to Hue", "connections", "city_hue", None),
+])
+def test_classify(index, query, intent, entity, etype):
+    found_intent, node, found_type = index.classify(query)
+    assert (found_intent, node["id"], found_type) == (intent, entity, etype)
+
+
+@pytest.mark.parametrize("query", [
+    "best time to visit Hue and Hoi An",          # compound
+    "best time to visit Hue, then hotels there",  # compound
+    "best time to visit Atlantis",                # unknown entity
+    "which hotels are in Saigon",                 # unknown alias
+    "romantic trip in hoi an",                    # not a lookup
+    "best time to visit hue for photography",     # extra constraint
+])
+def test_classify_declines(index, query):
+    assert index.classify(query) is None
+    assert index.answer(query) is None
+
+
+# --------------------- ANSWERS ---------------------
+@pytest.mark.parametrize("query, text, match_ids, facts", [
+    ("best time to visit hue", "The best time to visit Hue is February to April.", ["city_hue"], []),
+    ("best time to visit the imperial citadel",
+     "Imperial Citadel is in Hue; the best time to visit Hue is February to April.",
+     ["attraction_citadel", "city_hue"], [("attraction_citadel", "Located_In", "city_hue")]),
+    ("which hotels are in hue", "Hotels in Hue (1): Riverside Hotel.",
+     ["city_hue", "hotel_riverside"], [("hotel_riverside", "Located_In", "city_hue")]),
+    ("which attractions are in hoi an", "I don't have any attractions listed in Hoi An.", ["city_hoi_an"], []),
+    ("what is hue famous for", "Hue is known for: history and cuisine.", ["city_hue"], []),
+    ("where is lantern making", "Lantern Making is in Hoi An, Central Vietnam.",
+     ["activity_lanterns", "city_hoi_an"], [("activity_lanterns", "Available_In", "city_hoi_an")]),
+    ("which cities are connected to hoi an", "Hoi An is connected to Hue.",
+     ["city_hoi_an", "city_hue"], [("city_hoi_an", "Connected_To", "city_hue")]),
+])
+def test_answer(index, query, text, match_ids, facts):
+    result = index.answer(query)
+    assert result["answer"] == text
+    assert [m["id"] for m in result["matches"]] == match_ids
+    assert [(f["source"], f["rel"], f["target_id"]) for f in result["graph_facts"]] == facts
+
+
+@pytest.mark.parametrize("query", [
+    "which hotels are in the imperial citadel",   # list_type needs a city
+    "best time to visit lonely rock",             # no city to take the season from
+    "where is lonely rock",
+    "tags for ha long bay",                       # no tags
+    "which cities are connected to the imperial citadel",
+])
+def test_answer_declines_when_the_dataset_cannot_answer(index, query):
+    assert index.classify(query) is not None
+    assert index.answer(query) is None
+
+
+def test_missing_relationship_declines_instead_of_raising(monkeypatch):
+    index = FastPathIndex(NODES)
+    # The node resolves to a city, but its edge to that city is missing
+    monkeypatch.setattr(index, "city_of", lambda node: index.nodes["city_hue"])
+    monkeypatch.setitem(index.outgoing, "attraction_citadel", [])
+    assert index.answer("best time to visit the imperial citadel") is None
+    assert index.answer("where is the imperial citadel") is None
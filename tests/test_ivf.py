@@ -0,0 +1,127 @@
+import numpy as np
+import pytest
+
+from app.vectorstore.ivf import IVFIndex, build_ivf_index, load_centroids
+from app.vectorstore.snapshot import LocalVectorStore, SnapshotWriter
+
+DIM = 32
+ROWS = 3000
+CLUSTERS = 60
+
+
+def clustered_rows(count, seed=0):
+    """
+    (id, vector, metadata) rows around CLUSTERS centres, spread wide enough that
+    clusters overlap; "rare" tags one row in 500.
+    """
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(CLUSTERS, DIM)).astype(np.float32)
+    centres /= np.linalg.norm(centres, axis=1, keepdims=True)
+    for i in range(count):
+        c = i % CLUSTERS
+        vec = centres[c] + rng.normal(0, 1.5 / np.sqrt(DIM), DIM).astype(np.float32)
+        yield f"n{i}", vec, {"cluster": c, "rare": i % 500 == 0}
+
+
+def write_snapshot(path, count=ROWS, seed=0):
+    with SnapshotWriter(str(path), DIM) as writer:
+        for node_id, vec, meta in clustered_rows(count, seed):
+            writer.add(node_id, vec, meta)
+
+
+@pytest.fixture(scope="module")
+def store(tmp_path_factory):
+    path = tmp_path_factory.mktemp("ivf") / "snap"
+    write_snapshot(path)
+    build_ivf_index(str(path), seed=0)
+    return LocalVectorStore(str(path))
+
+
+def noisy_queries(store, count, noise, seed=1):
+    rng = np.random.default_rng(seed)
+    for row in rng.choice(store.count, size=count, replace=False):
+        yield np.asarray(store.vectors[row], dtype=np.float32) + rng.normal(0, noise / np.sqrt(DIM), DIM).astype(np.float32)
+
+
+def recall(store, k, nprobe, queries):
+    total = 0.0
+    for q in queries:
+        truth = {m["id"] for m in store.search(q, k, exact=True)}
+        found = {m["id"] for m in store.search(q, k, nprobe=nprobe)}
+        total += len(truth & found) / len(truth)
+    return total / len(queries)
+
+
+def test_probe_returns_the_rows_of_the_nearest_lists(store):
+    ivf = store.ivf
+    query = store._normalize(store.vectors[7])
+    nearest = np.argsort(-(ivf.centroids @ query))[:3]
+    expected = np.concatenate([ivf.rows[ivf.offsets[i]:ivf.offsets[i + 1]] for i in nearest])
+
+    assert sorted(ivf.probe(query, 3)) == sorted(expected)
+    assert sorted(ivf.probe(query, ivf.nlist * 2)) == list(range(store.count))
+    assert ivf.list_sizes().sum() == store.count
+
+
+def test_every_row_is_in_the_list_of_its_nearest_centroid(store):
+    ivf = store.ivf
+    vectors = np.asarray(store.vectors, dtype=np.float32)
+    for i in range(ivf.nlist):
+        rows = np.asarray(ivf.rows[ivf.offsets[i]:ivf.offsets[i + 1]])
+        assert (np.argmax(vectors[rows] @ ivf.centroids.T, axis=1) == i).all()
+
+
+def test_rebuild_reuses_centroids_and_assigns_new_rows(tmp_path):
+    path = tmp_path / "snap"
+    write_snapshot(path, count=1000)
+    first = build_ivf_index(str(path), nlist=20, seed=0)
+    centroids = load_centroids(str(path))
+    assert first["trained"] and centroids.shape == (20, DIM)
+
+    # The snapshot is rewritten with more rows; the old centroids are kept
+    write_snapshot(path, count=1500)
+    second = build_ivf_index(str(path), centroids=centroids)
+    assert second == dict(second, nlist=20, rows=1500, trained=False)
+    ivf = IVFIndex.load(str(path), DIM)
+    np.testing.assert_array_equal(ivf.centroids, centroids)
+    assert sorted(ivf.rows) == list(range(1500))
+
+
+def test_append_assigns_only_new_rows_and_merges_them_into_the_lists(tmp_path):
+    path = tmp_path / "snap"
+    write_snapshot(path, count=1000)
+    build_ivf_index(str(path), nlist=20, seed=0)
+    centroids = load_centroids(str(path))
+    old = LocalVectorStore(str(path)).ivf.row_labels(1000)
+    assert (old >= 0).all()
+
+    # Rows 0-999 are carried over unchanged (as upload_to_pinecone copies them), 500 are new
+    write_snapshot(path, count=1500)
+    labels = np.concatenate([old, np.full(500, -1)])
+    appended = build_ivf_index(str(path), centroids=centroids, labels=labels)
+    assert appended["assigned"] == 500 and appended["rows"] == 1500
+    merged = IVFIndex.load(str(path), DIM)
+
+    full = build_ivf_index(str(path), centroids=centroids)
+    assert full["assigned"] == 1500
+    rebuilt = IVFIndex.load(str(path), DIM)
+    np.testing.assert_array_equal(merged.offsets, rebuilt.offsets)
+    np.testing.assert_array_equal(merged.rows, rebuilt.rows)
+
+
+def test_selective_filter_falls_back_to_exact_search(store):
+    query = next(noisy_queries(store, 1, noise=0.2))
+    flt = {"rare": True}
+    # Only 6 rows are rare, so the one probed list cannot hold 5 of them
+    probed = store.ivf.probe(store._normalize(query), 1)
+    assert sum(store.metadata_at(int(row))["rare"] for row in probed) < 5
+    assert store.search(query, 5, filter=flt, nprobe=1) == store.search(query, 5, filter=flt, exact=True)
+
+
+def test_recall_grows_with_nprobe_and_is_exact_when_every_list_is_probed(store):
+    queries = list(noisy_queries(store, 50, noise=0.8))
+    assert recall(store, 10, store.ivf.nlist, queries) == 1.0
+    by_nprobe = [recall(store, 10, nprobe, queries) for nprobe in (1, 4, 8, 16)]
+    assert by_nprobe == sorted(by_nprobe)
+    # Measured 0.76 at nprobe=8 on this data; a drop points at a training or probing regression
+    assert by_nprobe[2] >= 0.7
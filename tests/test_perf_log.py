@@ -0,0 +1,49 @@
+import json
+import os
+
+from app.utils.perf_log import PerfLog, query_hash, read_records
+from scripts.analyze_perf_log import query_texts
+
+
+def log_line(msg, request_id, level="INFO", **extra):
+    return json.dumps(dict({"level": level, "logger": "app.hybrid.hybrid_chat", "request_id": request_id,
+                            "msg": msg}, **extra))
+
+
+# --------------------- QUERY TEXT ---------------------
+def test_query_text_comes_from_debug_lines_matched_by_hash(tmp_path):
+    app_log = tmp_path / "app.log"
+    lines = [
+        log_line(f"[ASYNC] Handling query {query_hash('Hue in March')}", "r1"),
+        log_line("Handling user query: Hue in March", "r1", level="DEBUG"),
+        log_line("Handling user query: street food in hue", "warmup-1", level="DEBUG", warmup=True),
+        "2026-10-19 10:00:00 | DEBUG | app | r2 | Handling user query: hoi an lanterns",
+    ]
+    app_log.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    wanted = {query_hash(q) for q in ("hue in march", "street food in hue", "hoi an lanterns")}
+    assert query_texts(str(app_log), wanted) == {
+        query_hash("hue in march"): "Hue in March",
+        query_hash("hoi an lanterns"): "hoi an lanterns",
+    }
+    assert query_texts("", wanted) == {}
+
+
+# --------------------- PER-PROCESS FILES ---------------------
+def write_as(monkeypatch, log, pid, *records):
+    monkeypatch.setattr(os, "getpid", lambda: pid)
+    for r in records:
+        log._write([json.dumps(r) + "\n"])
+    monkeypatch.undo()
+
+
+def test_each_process_rotates_only_its_own_file(tmp_path, monkeypatch):
+    path = str(tmp_path / "perf.jsonl")
+    first, second = PerfLog(path, max_bytes=1, backups=2), PerfLog(path, max_bytes=1, backups=2)
+    write_as(monkeypatch, first, 101, {"n": 1}, {"n": 2})
+    write_as(monkeypatch, second, 202, {"n": 10})
+    write_as(monkeypatch, first, 101, {"n": 3})
+    assert sorted(os.listdir(tmp_path)) == [
+        "perf.101.jsonl", "perf.101.jsonl.1", "perf.101.jsonl.2", "perf.202.jsonl",
+    ]
+    (tmp_path / "perf.jsonl").write_text('{"n": 0}\nnot json\n')
+    assert [r["n"] for r in read_records(path)] == [0, 1, 2, 3, 10]
@@ -0,0 +1,93 @@
+import gc
+import json
+
+import pytest
+
+from app.retrievers.records import (
+    DESCRIPTION_CHARS,
+    FactRecord,
+    MatchRecord,
+    Metadata,
+    intern_node,
+    interned_count,
+    to_plain,
+)
+
+
+# --------------------- INTERNING ---------------------
+def test_intern_node_shares_one_record_per_node():
+    first = intern_node("hoi_an", "Hoi An", "City", "Ancient town.", ["City", "Entity"])
+    again = intern_node("hoi_an", "Hoi An", "City", "Ancient town.", ("City", "Entity"))
+    assert again is first
+    assert first.labels == ("City", "Entity")
+    # Identical label tuples are shared between nodes too
+    assert intern_node("da_nang", "Da Nang", "City", "", ["City", "Entity"]).labels is first.labels
+
+
+def test_changed_node_gets_a_fresh_record_and_old_facts_keep_theirs():
+    old = intern_node("hue", "Hue", "City", "Imperial city.")
+    fact = FactRecord("hoi_an", "Connected_To", old)
+    new = intern_node("hue", "Hue", "City", "Imperial capital on the Perfume river.")
+    assert new is not old
+    assert fact.target is old and fact.target_desc == "Imperial city."
+    assert intern_node("hue", "Hue", "City", "Imperial capital on the Perfume river.") is new
+
+
+def test_intern_node_truncates_descriptions():
+    node = intern_node("long", "Long", description="x" * (DESCRIPTION_CHARS + 100))
+    assert len(node.description) == DESCRIPTION_CHARS
+    assert intern_node("empty", "Empty").description == ""
+
+
+def test_records_are_dropped_once_nothing_references_them():
+    before = interned_count()["nodes"]
+    node = intern_node("short_lived", "Short lived")
+    assert interned_count()["nodes"] == before + 1
+    del node
+    gc.collect()
+    assert interned_count()["nodes"] == before
+
+
+# --------------------- RECORD TYPES ---------------------
+def test_fact_record_reads_like_the_old_dict():
+    target = intern_node("my_son", "My Son", "Attraction", "Cham temple ruins.", ["Attraction"])
+    fact = FactRecord("hoi_an", "Near", target)
+    assert fact["rel"] == "Near" and fact.get("target_name") == "My Son"
+    assert fact.to_dict() == {
+        "source": "hoi_an", "rel": "Near", "target_id": "my_son", "target_name": "My Son",
+        "target_desc": "Cham temple ruins.", "labels": ["Attraction"],
+    }
+    assert dict(fact)["labels"] == ("Attraction",)
+    with pytest.raises(KeyError):
+        fact["target"]
+    with pytest.raises(TypeError):
+        fact["rel"] = "Far"
+
+
+def test_match_records_share_read_only_metadata():
+    meta = {"name": "Hoi An", "type": "City", "tags": ["heritage", "lanterns"]}
+    first = MatchRecord.from_dict({"id": "hoi_an", "score": 0.91, "metadata": meta, "values": [0.1] * 8})
+    second = MatchRecord.from_dict({"id": "hoi_an", "score": 0.85, "metadata": dict(meta)})
+    assert MatchRecord.from_dict(first) is first
+    assert first.metadata is second.metadata
+    assert isinstance(first.metadata, Metadata)
+    assert first.metadata["tags"] == ("heritage", "lanterns")
+    with pytest.raises(TypeError):
+        first.metadata["name"] = "Hoian"
+    assert not hasattr(first.metadata, "update")
+
+    # New metadata for the node replaces the shared copy for later matches only
+    changed = MatchRecord("hoi_an", 0.8, dict(meta, city="Hoi An"))
+    assert changed.metadata is not first.metadata and "city" not in first.metadata
+
+
+def test_to_plain_gives_json_ready_dicts():
+    target = intern_node("ba_na", "Ba Na Hills", "Attraction", labels=["Attraction"])
+    result = {
+        "matches": [MatchRecord("da_nang", 0.9, {"name": "Da Nang", "tags": ["beach"]})],
+        "graph_facts": [FactRecord("da_nang", "Near", target)],
+    }
+    plain = to_plain(result)
+    assert plain["matches"][0] == {"id": "da_nang", "score": 0.9, "metadata": {"name": "Da Nang", "tags": ["beach"]}}
+    assert type(plain["matches"][0]["metadata"]) is dict
+    assert json.loads(json.dumps(plain)) == plain
@@ -0,0 +1,69 @@
+import pytest
+
+from app.hybrid.session import ChatSession
+
+HOI_AN = {"id": "hoi_an", "score": 0.9, "metadata": {"name": "Hoi An", "type": "City"}}
+HOTEL = {"id": "anantara", "score": 0.8, "metadata": {"name": "Anantara", "type": "Hotel", "city": "Hoi An"}}
+
+
+@pytest.fixture
+def session():
+    session = ChatSession("s1")
+    session.remember("romantic trip in hoi an", "Hoi An is lovely.", [HOI_AN, HOTEL], [], fetched_ids=["hoi_an"])
+    return session
+
+
+# --------------------- FOLLOW-UP DETECTION ---------------------
+def test_first_turn_is_never_a_followup():
+    assert ChatSession("s0").is_followup("what about hotels there?") is False
+
+
+@pytest.mark.parametrize("query", [
+    "what about hotels there?",
+    "How about the beaches?",
+    "are those open at night?",
+    "anything similar in the same area",
+    "tell me more about Hoi An",       # names a city under discussion
+    "is anantara expensive",           # names a matched place
+])
+def test_followups(session, query):
+    assert session.is_followup(query)
+
+
+@pytest.mark.parametrize("query", [
+    "is it worth visiting Sapa",
+    "what is that famous cave in Phong Nha",
+    "I also want to see Hanoi",
+    "best street food in Saigon",
+    "hoi anh restaurants",            # not the whole city name
+    "somewhere thereabouts in the north",
+])
+def test_standalone_questions_start_afresh(session, query):
+    assert not session.is_followup(query)
+
+
+# --------------------- FILTERS ---------------------
+def test_filter_scopes_the_requested_type_to_the_cities_under_discussion(session):
+    assert session.build_filter("what about hotels there?") == {
+        "$and": [{"type": {"$in": ["Hotel"]}}, {"city": {"$in": ["Hoi An"]}}]
+    }
+
+
+def test_filter_without_a_reference_keeps_only_the_type(session):
+    assert session.build_filter("any resort with a pool") == {"type": {"$in": ["Hotel"]}}
+    assert session.build_filter("hotels and sights in Hoi An, same budget") == {
+        "type": {"$in": ["Hotel", "Attraction"]}
+    }
+
+
+def test_filter_matches_whole_keywords_only(session):
+    # "stayed", "downtown", "insight" and "experienced" contain keywords but are not requests for them
+    assert session.build_filter("we stayed downtown last time") is None
+    assert session.build_filter("any insight from experienced travellers?") is None
+    assert session.build_filter("things to do there") == {
+        "$and": [{"type": {"$in": ["Activity"]}}, {"city": {"$in": ["Hoi An"]}}]
+    }
+
+
+def test_no_filter_without_a_type_or_reference(session):
+    assert session.build_filter("is the weather good in March") is None
@@ -0,0 +1,105 @@
+import os
+
+import numpy as np
+import pytest
+
+from app.vectorstore.snapshot import LocalVectorStore, SnapshotWriter, _matches_filter
+
+DIM = 8
+CITIES = ["Hoi An", "Hue", "Da Nang", None]
+TYPES = ["City", "Hotel", "Attraction"]
+
+
+def rows(count, seed=0):
+    rng = np.random.default_rng(seed)
+    for i in range(count):
+        meta = {"type": TYPES[i % 3], "tags": ["x"]}
+        if CITIES[i % 4] is not None:
+            meta["city"] = CITIES[i % 4]
+        yield f"n{i}", rng.normal(size=DIM), meta
+
+
+def write(path, count=200, seed=0, extra=()):
+    with SnapshotWriter(str(path), DIM) as writer:
+        for node_id, vec, meta in list(rows(count, seed)) + list(extra):
+            writer.add(node_id, vec, meta)
+
+
+# --------------------- ATOMIC REPLACE ---------------------
+def test_close_swaps_a_versioned_directory_in_and_drops_the_old_one(tmp_path):
+    path = tmp_path / "snap"
+    write(path, count=10)
+    first = os.readlink(path)
+    old = LocalVectorStore(str(path))
+    old_vector = np.asarray(old.vectors[3]).copy()
+
+    write(path, count=20, seed=1)
+    assert os.path.islink(path) and os.readlink(path) != first
+    assert sorted(os.listdir(tmp_path)) == sorted(["snap", os.readlink(path)])
+    assert LocalVectorStore(str(path)).count == 20
+    # A reader that mapped the old version keeps its data
+    np.testing.assert_array_equal(old.vectors[3], old_vector)
+
+
+def test_snapshot_directory_from_before_versioning_is_replaced(tmp_path):
+    path = tmp_path / "snap"
+    path.mkdir()
+    (path / "manifest.json").write_text("{}")
+    write(path, count=5)
+    assert os.path.islink(path) and LocalVectorStore(str(path)).count == 5
+    assert sorted(os.listdir(tmp_path)) == sorted(["snap", os.readlink(path)])
+
+
+def test_failed_write_leaves_the_current_snapshot(tmp_path):
+    path = tmp_path / "snap"
+    write(path, count=5)
+    with pytest.raises(RuntimeError):
+        with SnapshotWriter(str(path), DIM) as writer:
+            writer.add("a", np.ones(DIM), {})
+            raise RuntimeError("embedding failed")
+    assert LocalVectorStore(str(path)).count == 5
+    assert sorted(os.listdir(tmp_path)) == sorted(["snap", os.readlink(path)])
+
+
+# --------------------- ID LOOKUP ---------------------
+def test_row_of_binary_searches_the_sorted_ids(tmp_path):
+    path = tmp_path / "snap"
+    write(path, count=50, extra=[("hội_an", np.ones(DIM), {}), ("", np.ones(DIM), {})])
+    store = LocalVectorStore(str(path))
+    assert all(store.id_at(store.row_of(store.id_at(row))) == store.id_at(row) for row in range(store.count))
+    assert store.row_of("hội_an") == 50 and store.row_of("") == 51
+    assert store.row_of("missing") is None and store.row_of("n99") is None
+    assert store._rows is None  # no per-process id table
+
+
+# --------------------- FILTER COLUMNS ---------------------
+@pytest.mark.parametrize("flt", [
+    {"type": "Hotel"},
+    {"type": {"$in": ["Hotel", "Attraction"]}},
+    {"city": {"$eq": "Hue"}},
+    {"city": {"$in": ["Hoi An", None]}},
+    {"$and": [{"type": {"$in": ["City"]}}, {"city": {"$in": ["Hoi An", "Da Nang"]}}]},
+    {"city": {"$in": ["Sapa"]}},
+])
+def test_column_filters_match_the_metadata_filter(tmp_path, flt):
+    path = tmp_path / "snap"
+    write(path)
+    store = LocalVectorStore(str(path))
+    expected = np.array([_matches_filter(store.metadata_at(row), flt) for row in range(store.count)])
+    np.testing.assert_array_equal(store._filter_mask(flt), expected)
+
+    query = np.random.default_rng(5).normal(size=DIM)
+    scores = np.asarray(store.vectors, dtype=np.float32) @ store._normalize(query)
+    allowed = np.flatnonzero(expected)
+    top = allowed[np.argsort(-scores[allowed])][:5]
+    assert [m["id"] for m in store.search(query, 5, filter=flt)] == [store.id_at(int(r)) for r in top]
+
+
+def test_fields_outside_the_columns_fall_back_to_the_metadata(tmp_path):
+    path = tmp_path / "snap"
+    write(path, extra=[("odd", np.ones(DIM), {"type": 3})])
+    store = LocalVectorStore(str(path))
+    # A non-string value drops that column; "tags" was never one
+    assert set(store.columns) == {"city"}
+    assert store._filter_mask({"type": "Hotel"}) is None and store._filter_mask({"tags": "x"}) is None
+    assert [m["id"] for m in store.search(np.ones(DIM), 1, filter={"type": 3})] == ["odd"]
@@ -0,0 +1,112 @@
+import random
+import sqlite3
+
+import pytest
+
+from app.cache.sqlite_cache import SCHEMA_VERSION, SQLiteCache
+
+
+class Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def make_cache(tmp_path, clock, **kwargs):
+    kwargs.setdefault("ttl_seconds", 60)
+    return SQLiteCache(str(tmp_path / "answers.sqlite3"), clock=clock, **kwargs)
+
+
+def test_round_trip_and_soft_ttl(tmp_path, clock):
+    cache = make_cache(tmp_path, clock, stale_seconds=30)
+    cache.set("k", {"answer": "hi", "matches": [{"id": "a", "score": 0.5}]})
+    assert cache.get("k") == {"answer": "hi", "matches": [{"id": "a", "score": 0.5}]}
+
+    clock.now += 59
+    assert cache.get("k") is not None
+    clock.now += 1
+    # Past the soft TTL: no longer fresh, but still found within the stale window
+    assert cache.get("k") is None
+    entry = cache.lookup("k")
+    assert entry is not None and entry.age == pytest.approx(60)
+    clock.now += 30
+    assert cache.lookup("k") is None
+    assert len(cache) == 0
+    cache.close()
+
+
+def test_hits_are_counted_without_writing_on_every_read(tmp_path, clock):
+    cache = make_cache(tmp_path, clock, touch_interval=3600)
+    cache.set("k", "v")
+    assert [cache.lookup("k").hits for _ in range(3)] == [1, 2, 3]
+    stored = sqlite3.connect(cache.path).execute("SELECT hits FROM entries").fetchone()[0]
+    assert stored == 0
+    cache.close()
+    assert sqlite3.connect(cache.path).execute("SELECT hits FROM entries").fetchone()[0] == 3
+
+
+def test_lru_eviction_under_size_cap(tmp_path, clock):
+    # Incompressible values of a known size
+    rng = random.Random(0)
+    blobs = {f"k{i}": "%0256x" % rng.getrandbits(1024) for i in range(4)}
+    probe = make_cache(tmp_path, clock)
+    size = len(probe._encode(blobs["k0"]))
+    probe.close()
+
+    cache = make_cache(tmp_path, clock, max_bytes=size * 3 + size // 2, touch_interval=0)
+    for key in ("k0", "k1", "k2"):
+        clock.now += 1
+        cache.set(key, blobs[key])
+    clock.now += 1
+    assert cache.lookup("k0") is not None  # k0 is now more recent than k1 and k2
+    clock.now += 1
+    cache.set("k3", blobs["k3"])
+
+    assert cache.get("k1") is None
+    assert all(cache.get(k) is not None for k in ("k0", "k2", "k3"))
+    assert cache.stats()["bytes"] <= cache.max_bytes
+    cache.close()
+
+
+def test_expired_entries_are_swept_periodically(tmp_path, clock):
+    cache = make_cache(tmp_path, clock, evict_every=3)
+    cache.set("old", 1)
+    clock.now += 120
+    cache.set("a", 1)
+    assert len(cache) == 2
+    cache.set("b", 1)  # third write triggers the sweep
+    assert len(cache) == 2
+    assert cache.lookup("old") is None
+    cache.close()
+
+
+def test_outdated_schema_is_rebuilt(tmp_path, clock):
+    path = tmp_path / "answers.sqlite3"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE entries (key TEXT PRIMARY KEY, value TEXT)")
+    conn.execute("INSERT INTO entries VALUES ('k', 'old layout')")
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION - 1}")
+    conn.commit()
+    conn.close()
+
+    cache = SQLiteCache(str(path), ttl_seconds=60, clock=clock)
+    assert len(cache) == 0
+    cache.set("k", "new")
+    assert cache.get("k") == "new"
+    assert sqlite3.connect(path).execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    cache.close()
+
+
+def test_unserializable_values_are_rejected(tmp_path, clock):
+    cache = make_cache(tmp_path, clock)
+    with pytest.raises(TypeError):
+        cache.set("k", {"when": object()})
+    assert cache.get("k") is None
+    cache.close()
@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+
+from app.config_loader import Config
+from app.hybrid.fast_path import FastPathIndex
+from app.hybrid.hybrid_chat import AsyncHybridChat
+from app.llm.usage import ECONOMY, EXHAUSTED, NORMAL, TokenBudget, record_usage
+
+QUERY = "romantic trip in hoi an"
+
+
+class Day:
+    def __init__(self, day: str = "2026-01-01"):
+        self.day = day
+
+    def __call__(self) -> str:
+        return self.day
+
+
+class VectorRetriever:
+    def query(self, text, top_k=5, filter=None):
+        return [{"id": "hoi_an", "score": 0.9, "metadata": {"name": "Hoi An", "type": "City", "city": "Hoi An"}}]
+
+
+class GraphRetriever:
+    def fetch_graph_context(self, node_ids):
+        return []
+
+    def close(self):
+        pass
+
+
+def completion(messages, max_tokens=2000):
+    # What LLMClient reports for a real chat call
+    record_usage("chat", "gpt-4o-mini", 1000, 200)
+    return "answer"
+
+
+@pytest.fixture
+def make_chat(monkeypatch):
+    monkeypatch.setattr(Config, "FAST_PATH_ENABLED", False)
+    monkeypatch.setattr(Config, "PERF_LOG_ENABLED", False)
+    monkeypatch.setattr(Config, "PROFILE_SAMPLE_RATE", 0)
+
+    def make(budget, fast_path=None):
+        return AsyncHybridChat(
+            vector_retriever=VectorRetriever(),
+            graph_retriever=GraphRetriever(),
+            completion_fn=completion,
+            fast_path=fast_path,
+            budget=budget,
+        )
+
+    return make
+
+
+# --------------------- BUDGET ---------------------
+def test_modes_follow_the_tokens_spent():
+    budget = TokenBudget(1000, economy_ratio=0.8, today=Day())
+    assert budget.mode() == NORMAL
+    budget.record(799)
+    assert budget.mode() == NORMAL
+    budget.record(1)
+    assert budget.mode() == ECONOMY
+    budget.record(199)
+    assert budget.mode() == ECONOMY
+    budget.record(1)
+    assert budget.mode() == EXHAUSTED
+    assert budget.status() == {"daily_tokens": 1000, "used_today": 1000, "used_ratio": 1.0, "mode": EXHAUSTED}
+
+
+def test_usage_resets_at_midnight():
+    day = Day("2026-01-01")
+    budget = TokenBudget(1000, today=day)
+    budget.record(1500)
+    assert budget.mode() == EXHAUSTED
+    day.day = "2026-01-02"
+    assert budget.used_today() == 0
+    assert budget.mode() == NORMAL
+    budget.record(900)
+    assert budget.mode() == ECONOMY
+
+
+def test_no_cap_is_always_normal():
+    budget = TokenBudget(0, today=Day())
+    budget.record(10**9)
+    assert budget.mode() == NORMAL
+
+
+# --------------------- CHAT ---------------------
+def test_cache_hits_report_zero_usage(make_chat):
+    chat = make_chat(TokenBudget(0, today=Day()))
+
+    async def scenario():
+        return await chat.handle_query_async(QUERY, 5), await chat.handle_query_async(QUERY, 5)
+
+    built, hit = asyncio.run(scenario())
+    assert built["cached"] is False
+    assert built["usage"]["prompt_tokens"] == 1000 and built["usage"]["completion_tokens"] == 200
+    assert built["usage"]["cost_usd"] > 0
+    assert hit["cached"] is True
+    assert hit["usage"] == {"prompt_tokens": 0, "completion_tokens": 0, "embedding_tokens": 0, "cost_usd": 0.0}
+
+
+def test_exhausted_budget_answers_from_retrieval_with_dataset_descriptions(make_chat):
+    fast_path = FastPathIndex([{
+        "id": "hoi_an", "name": "Hoi An", "type": "City",
+        "description": "Lantern-lit ancient town on the Thu Bon river.",
+    }])
+    budget = TokenBudget(100, today=Day())
+    budget.record(100)
+    chat = make_chat(budget, fast_path=fast_path)
+
+    result = asyncio.run(chat.handle_query_async(QUERY, 5))
+    assert result["source"] == "degraded"
+    assert "**Hoi An** (City): Lantern-lit ancient town on the Thu Bon river." in result["answer"]
+    assert result["usage"]["prompt_tokens"] == 0
@@ -0,0 +1,89 @@
+import asyncio
+import json
+
+import pytest
+
+from app.config_loader import Config
+from app.hybrid.hybrid_chat import AsyncHybridChat
+from app.hybrid.warmup import CacheWarmer, queries_from_metrics
+from app.llm.usage import TokenBudget
+from app.utils.metrics import MetricsRegistry, TopCounter, metrics, snapshot_path
+
+
+class VectorRetriever:
+    def query(self, text, top_k=5, filter=None):
+        return [{"id": "hoi_an", "score": 0.9, "metadata": {"name": "Hoi An", "city": "Hoi An"}}]
+
+
+class GraphRetriever:
+    def __init__(self):
+        self.calls = 0
+
+    def fetch_graph_context(self, node_ids):
+        self.calls += 1
+        return []
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def chat(monkeypatch):
+    monkeypatch.setattr(Config, "FAST_PATH_ENABLED", False)
+    monkeypatch.setattr(Config, "PERF_LOG_ENABLED", False)
+    monkeypatch.setattr(Config, "PROFILE_SAMPLE_RATE", 0)
+    monkeypatch.setattr(metrics, "tops", {})
+    return AsyncHybridChat(
+        vector_retriever=VectorRetriever(),
+        graph_retriever=GraphRetriever(),
+        completion_fn=lambda messages, max_tokens=2000: "answer",
+        budget=TokenBudget(0),
+    )
+
+
+# --------------------- TRAFFIC COUNTS ---------------------
+def test_top_counter_keeps_the_most_frequent_keys():
+    top = TopCounter(capacity=2)
+    for key, n in (("a", 5), ("b", 3), ("c", 1), ("d", 1), ("e", 4)):
+        top.add(key, n)
+    assert top.most_common() == [("a", 5), ("e", 4)]
+
+
+def test_user_queries_are_counted_but_warm_up_is_not(chat):
+    async def scenario():
+        await chat.handle_query_async("romantic  trip in hoi an", 5)
+        await chat.handle_query_async("romantic trip in hoi an", 5)
+        await chat.warm_query_async("street food in hue")
+
+    asyncio.run(scenario())
+    assert metrics.snapshot()["top"]["queries"] == [("romantic trip in hoi an", 2)]
+
+
+def test_counts_are_summed_over_every_process_snapshot(tmp_path):
+    path = str(tmp_path / "metrics.json")
+    for pid, queries in ((101, {"hue": 3, "hoi an": 1}), (102, {"hoi an": 4})):
+        registry = MetricsRegistry()
+        for query, n in queries.items():
+            registry.count_top("queries", query, n)
+        with open(snapshot_path(path, pid), "w", encoding="utf-8") as f:
+            json.dump(registry.snapshot(), f)
+    assert queries_from_metrics(path) == {"hoi an": 5, "hue": 3}
+
+
+# --------------------- WARM-UP ---------------------
+def test_warmed_retrieval_is_used_without_graph_lookups(chat, tmp_path):
+    path = str(tmp_path / "metrics.json")
+    registry = MetricsRegistry()
+    registry.count_top("queries", "romantic trip in hoi an", 7)
+    with open(snapshot_path(path, 1), "w", encoding="utf-8") as f:
+        json.dump(registry.snapshot(), f)
+    warmer = CacheWarmer(chat, "log", metrics_path=path)
+
+    async def scenario():
+        status = await warmer.warm_once()
+        return status, await chat.handle_query_async("romantic trip in hoi an", 5)
+
+    status, result = asyncio.run(scenario())
+    assert status["outcomes"] == {"retrieval": 1} and status["traffic_coverage"] == 1.0
+    assert chat.neo4j.calls == 1  # during warm-up only
+    assert result["retrieval"] == {"followup": False, "graph_lookups": 0, "warm": True}